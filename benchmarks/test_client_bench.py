@@ -0,0 +1,77 @@
+"""Performance benchmarks for the probe engines.
+
+Run with ``pytest benchmarks/``. Compare runs
+with ``--benchmark-autosave`` and ``--benchmark-compare`` to catch
+regressions. Budgets for the per-probe overhead and memory are checked
+by ``test_overhead.py``, which runs with ``-m perf``.
+"""
+
+import functools
+import io
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import httpx
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from hping.bench import LocalServer, _probe
+from hping.client import hping, response_result
+from hping.output import TextFormatter
+from hping.stats import Stats
+
+PROBES = 200
+
+
+@pytest.fixture(scope="module", params=["http1", "h2"])
+def server(request: pytest.FixtureRequest) -> Iterator[LocalServer]:
+    with LocalServer(request.param) as local_server:
+        yield local_server
+
+
+def _run(server: LocalServer, concurrency: int) -> Stats:
+    stats = Stats()
+    _probe(server.url, PROBES, concurrency, server.protocol, stats)
+    assert stats.snapshot().received == PROBES
+    return stats
+
+
+def test_sync_probe_rate(benchmark: BenchmarkFixture, server: LocalServer) -> None:
+    benchmark.extra_info["probes"] = PROBES
+    benchmark.pedantic(_run, args=(server, 1), rounds=5, warmup_rounds=1)
+
+
+def test_async_probe_rate(benchmark: BenchmarkFixture, server: LocalServer) -> None:
+    benchmark.extra_info["probes"] = PROBES
+    benchmark.pedantic(_run, args=(server, 10), rounds=5, warmup_rounds=1)
+
+
+def test_result_overhead(benchmark: BenchmarkFixture) -> None:
+    response = httpx.Response(200, extensions={"http_version": b"HTTP/1.1"})
+    stats = Stats()
+    formatter = TextFormatter()
+
+    def handle() -> None:
+        result = response_result("http://example.com", 1, response, 1024, 1_234_567)
+        formatter.format(result)
+        stats.record(result)
+
+    benchmark(handle)
+
+
+def test_engine_overhead(benchmark: BenchmarkFixture) -> None:
+    # An in-memory transport leaves only hping's own per-probe work
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="ok"))
+    client_class = functools.partial(httpx.Client, transport=transport)
+
+    def run() -> None:
+        stats = Stats()
+        with (
+            patch("hping.client.httpx.Client", client_class),
+            patch("sys.stdout", new_callable=io.StringIO),
+        ):
+            hping("http://example.com/", 0, PROBES, stats=stats)
+        assert stats.snapshot().received == PROBES
+
+    benchmark.extra_info["probes"] = PROBES
+    benchmark.pedantic(run, rounds=5, warmup_rounds=1)
@@ -0,0 +1,64 @@
+"""Per-probe CPU and memory budgets for the probe engines.
+
+These checks depend on the speed and load of the machine, so they are
+marked ``perf`` and left out of the default run. Run them with
+``pytest benchmarks/ -m perf``.
+"""
+
+import functools
+import io
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from hping.bench import run_bench
+from hping.client import hping
+from hping.stats import Stats
+
+pytestmark = pytest.mark.perf
+
+PROBES = 500
+
+# CPU microseconds hping itself may spend per probe, best of a few runs.
+# It takes about 160 us on a laptop; the budget leaves room for slow CI
+# machines while still failing on per-probe work that does not belong on
+# the hot path, such as building a client or parsing the URL every time.
+OVERHEAD_BUDGET_US = 1_000
+
+# Memory every further probe may cost, scaled to 1M probes
+MAX_MEMORY_PER_MILLION = 64 << 20
+
+
+def _overhead_us() -> float:
+    # An in-memory transport leaves only hping's own per-probe work
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="ok"))
+    stats = Stats()
+    with (
+        patch(
+            "hping.client.httpx.Client",
+            functools.partial(httpx.Client, transport=transport),
+        ),
+        patch("sys.stdout", new_callable=io.StringIO),
+    ):
+        start = time.thread_time_ns()
+        hping("http://example.com/", 0, PROBES, stats=stats)
+        elapsed_ns = time.thread_time_ns() - start
+    assert stats.snapshot().received == PROBES
+    return elapsed_ns / PROBES / 1000
+
+
+def test_engine_overhead_budget() -> None:
+    best = min(_overhead_us() for _ in range(3))
+
+    assert best < OVERHEAD_BUDGET_US
+
+
+@pytest.mark.parametrize("protocol", ["http1", "h2"])
+def test_memory_per_million_probes(protocol: str) -> None:
+    result = run_bench(protocol, count=1000, concurrency=1)
+
+    assert result.received == result.requests
+    assert result.memory_per_million is not None
+    assert result.memory_per_million < MAX_MEMORY_PER_MILLION
@@ -0,0 +1,150 @@
+# hping/adaptive.py
+
+from typing import Optional
+
+from .clock import NS_PER_SECOND, Clock, default_clock
+from .output import ProbeResult
+
+# Without a slow threshold, responses this many times slower than the
+# smoothed round trip time count as a latency spike
+SPIKE_FACTOR = 4.0
+
+# Weight of the newest round trip time in the smoothed round trip time
+_SMOOTHING = 0.1
+
+# Responses needed before the smoothed round trip time is trusted
+_WARMUP = 10
+
+# Status codes of an overloaded server besides 5xx
+_OVERLOAD_STATUSES = (429,)
+
+
+class AdaptiveRate:
+    """Additive-increase/multiplicative-decrease (AIMD) control of a rate.
+
+    The rate starts at ``min_rate``. After every ``window`` seconds without
+    a failed or slow response it grows by ``increase``, up to ``max_rate``.
+    A failed or slow response multiplies it by ``decrease`` right away, at
+    most once per window, so the responses to requests that were already
+    sent at the old rate do not cut it again.
+
+    A request failed if it raised an error or got a 5xx or 429 status. It
+    is slow if it took longer than ``slow_threshold`` seconds or,
+    without a threshold, SPIKE_FACTOR times the smoothed round trip time.
+    """
+
+    __slots__ = (
+        "min_rate",
+        "max_rate",
+        "increase",
+        "decrease",
+        "slow_threshold_ns",
+        "window_ns",
+        "clock",
+        "rate",
+        "_smoothed",
+        "_samples",
+        "_window_start",
+        "_last_cut",
+    )
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease: float = 0.5,
+        slow_threshold: Optional[float] = None,
+        window: float = 1.0,
+        clock: Clock = default_clock,
+    ) -> None:
+        """Create a controller.
+
+        Args:
+            max_rate: Rate in requests per second to ramp up to
+            min_rate: Rate to start at and never go below (default is 1% of
+                max_rate)
+            increase: Requests per second added per healthy window (default
+                is 10% of max_rate)
+            decrease: Factor the rate is multiplied with on a failure
+            slow_threshold: Optional round trip time in seconds above which
+                a response counts as slow
+            window: Seconds between rate increases
+            clock: Monotonic nanosecond clock
+
+        Raises:
+            ValueError: If an option is invalid
+        """
+        if max_rate <= 0:
+            raise ValueError("Rate must be greater than 0")
+        if min_rate is None:
+            min_rate = max_rate / 100
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("Minimum rate must be greater than 0 and at most the rate")
+        if not 0 < decrease < 1:
+            raise ValueError("Decrease factor must be between 0 and 1")
+        if slow_threshold is not None and slow_threshold <= 0:
+            raise ValueError("Slow threshold must be greater than 0")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase if increase is not None else max_rate / 10
+        self.decrease = decrease
+        self.slow_threshold_ns = (
+            round(slow_threshold * NS_PER_SECOND)
+            if slow_threshold is not None
+            else None
+        )
+        self.window_ns = round(window * NS_PER_SECOND)
+        self.clock = clock
+        self.rate = min_rate
+        self._smoothed = 0.0
+        self._samples = 0
+        self._window_start: Optional[int] = None
+        self._last_cut: Optional[int] = None
+
+    @property
+    def period(self) -> float:
+        """Return the current time between requests in seconds."""
+        return 1 / self.rate
+
+    def _is_slow(self, elapsed_ns: int) -> bool:
+        """Check a round trip time and add it to the smoothed one."""
+        if self.slow_threshold_ns is not None:
+            return elapsed_ns > self.slow_threshold_ns
+        slow = self._samples >= _WARMUP and elapsed_ns > SPIKE_FACTOR * self._smoothed
+        if self._samples:
+            self._smoothed += _SMOOTHING * (elapsed_ns - self._smoothed)
+        else:
+            self._smoothed = elapsed_ns
+        self._samples += 1
+        return slow
+
+    def observe(self, result: ProbeResult) -> bool:
+        """Update the rate with the outcome of one request.
+
+        Args:
+            result: The probe result
+
+        Returns:
+            Whether the rate changed
+        """
+        now = self.clock()
+        if self._window_start is None:
+            self._window_start = now
+        previous = self.rate
+
+        failed = result.error is not None or (
+            result.status is not None
+            and (result.status >= 500 or result.status in _OVERLOAD_STATUSES)
+        )
+        if failed or self._is_slow(result.elapsed_ns):
+            # A new healthy window starts after the last bad response
+            self._window_start = now
+            if self._last_cut is None or now - self._last_cut >= self.window_ns:
+                self._last_cut = now
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+        elif now - self._window_start >= self.window_ns:
+            self._window_start = now
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+        return self.rate != previous
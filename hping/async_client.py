@@ -0,0 +1,1122 @@
+# hping/async_client.py
+
+import asyncio
+import contextlib
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from .adaptive import AdaptiveRate
+from .body import BodyReader, validate_hash_algorithm
+from .client import (
+    RequestData,
+    check_response,
+    error_result,
+    pool_limits,
+    prepare_request,
+    request_template,
+    response_result,
+)
+from .clock import NS_PER_SECOND, Clock, default_clock
+from .output import Output, ProbeResult, create_output
+from .phases import PhaseTimer, atrace_current
+from .resolver import DnsCache, url_origin
+from .stats import Stats, format_comparison, summary_hooks, summary_sections
+
+if TYPE_CHECKING:
+    from .expect import Expectations
+    from .results import ResultsLog
+    from .scenario import Scenario
+
+# Protocol variants of a comparison run
+COMPARE_VARIANTS = ("http1", "h2", "h2-mux")
+
+
+@dataclass
+class _ProbeConfig:
+    """Request settings shared by all probes of a run."""
+
+    method: str
+    headers: Dict[str, str]
+    data: RequestData
+    output: Output
+    clock: Clock = default_clock
+    stream: bool = False
+    hash_algorithm: Optional[str] = None
+    seq_start: int = 1
+    seq_step: int = 1
+    # Request sent for every probe, by target URL and pinned address
+    templates: Dict[Tuple[str, Optional[str]], httpx.Request] = field(
+        default_factory=dict
+    )
+    # Protocol variant the results are labeled with in comparison runs
+    variant: Optional[str] = None
+    # DNS cache that resolves host names instead of the connection pool
+    resolver: Optional[DnsCache] = None
+    # Scenario step the results are labeled with
+    step: Optional[str] = None
+    # Checks a response must pass to count as received
+    expect: Optional["Expectations"] = None
+
+
+# Requests of each iteration of a scenario run, as URL, request settings and
+# statistics of every step
+_Plan = List[List[Tuple[str, _ProbeConfig, Stats]]]
+
+
+def _make_config(
+    concurrency: int,
+    rate: Optional[float],
+    method: str,
+    headers: Optional[List[str]],
+    data: RequestData,
+    http2: bool,
+    timing: bool,
+    clock: Clock,
+    stream: bool,
+    hash_algorithm: Optional[str],
+    output_format: str,
+    label_errors: bool = False,
+    output: Optional[Output] = None,
+    seq_start: int = 1,
+    seq_step: int = 1,
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional[DnsCache] = None,
+    expect: Optional["Expectations"] = None,
+) -> _ProbeConfig:
+    """Validate the options of a run and build its probe settings."""
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    if rate is not None and rate <= 0:
+        raise ValueError("Rate must be greater than 0")
+    validate_hash_algorithm(hash_algorithm)
+    method, parsed_headers = prepare_request(method, headers, data)
+    if output is None:
+        output = create_output(
+            output_format,
+            http2,
+            timing,
+            label_errors,
+            clock=clock,
+            results_log=results_log,
+        )
+    return _ProbeConfig(
+        method,
+        parsed_headers,
+        data,
+        output,
+        clock,
+        stream,
+        hash_algorithm,
+        seq_start,
+        seq_step,
+        resolver=resolver,
+        expect=expect,
+    )
+
+
+def _make_controller(
+    adaptive: bool,
+    rate: Optional[float],
+    interval: float,
+    min_rate: Optional[float],
+    slow_threshold: Optional[float],
+    clock: Clock,
+) -> Optional[AdaptiveRate]:
+    """Build the rate controller of one target, if the run is adaptive.
+
+    Raises:
+        ValueError: If an adaptive option is invalid
+    """
+    if not adaptive:
+        return None
+    if rate is None:
+        if interval <= 0:
+            raise ValueError("Adaptive rate needs a rate or an interval above 0")
+        rate = 1 / interval
+    return AdaptiveRate(rate, min_rate, slow_threshold=slow_threshold, clock=clock)
+
+
+async def _probe(
+    client: httpx.AsyncClient,
+    url: str,
+    seq: int,
+    config: _ProbeConfig,
+    stats: Stats,
+    intended_time: Optional[int] = None,
+    adaptive: Optional[AdaptiveRate] = None,
+    address: Optional[str] = None,
+) -> ProbeResult:
+    """Send a single request and record its outcome.
+
+    When ``intended_time`` is given the latency is measured from the moment
+    the request was scheduled to be sent rather than from the moment it was
+    actually sent, so delays caused by a backlog are not hidden.
+
+    With a resolver in ``config`` the host name is looked up before the
+    request is timed and the request goes to its first address, unless it
+    is pinned to ``address``.
+
+    Args:
+        client: The shared async client
+        url: The target URL
+        seq: Sequence number of the request
+        config: Request settings of the run
+        stats: Statistics to update
+        intended_time: Scheduled send time in ns on the run's clock
+        adaptive: Optional controller of the target's request rate
+        address: Optional IP address the request is pinned to
+
+    Returns:
+        The probe result
+    """
+    clock = config.clock
+    lookup_error: Optional[Exception] = None
+    if address is None and config.resolver is not None:
+        try:
+            address = (await config.resolver.alookup(*url_origin(url)))[0]
+        except httpx.ConnectError as e:
+            lookup_error = e
+    send_time = clock()
+    start_time = send_time if intended_time is None else intended_time
+
+    timer = PhaseTimer(clock)
+    timer.activate()
+    try:
+        if lookup_error is not None:
+            raise lookup_error
+        key = (url, address)
+        request = config.templates.get(key)
+        if request is None or client.cookies:
+            request = config.templates[key] = request_template(
+                client,
+                config.method,
+                url,
+                config.headers,
+                config.data,
+                atrace_current,
+                address,
+            )
+        body_check = None
+        if config.stream:
+            if config.expect is not None:
+                body_check = config.expect.body_check()
+            reader = BodyReader(clock, config.hash_algorithm, body_check)
+            response = await client.send(request, stream=True)
+            try:
+                await reader.aread(response)
+            finally:
+                await response.aclose()
+            result = response_result(
+                url, seq, response, reader.size, clock() - start_time
+            )
+            if reader.first_byte_at is not None:
+                result.first_byte_ns = reader.first_byte_at - start_time
+            result.digest = reader.digest
+        else:
+            response = await client.send(request)
+            elapsed_ns = clock() - start_time
+            size = len(response.content) if config.method != "HEAD" else 0
+            result = response_result(url, seq, response, size, elapsed_ns)
+        if config.expect is not None:
+            check_response(result, response, config.expect, body_check)
+        result.phases = timer.durations
+        result.reused = not timer.new_connection
+
+    except Exception as e:
+        result = error_result(url, seq, clock() - start_time, e)
+
+    if intended_time is not None:
+        result.lag_ns = send_time - intended_time
+    if adaptive is not None and adaptive.observe(result):
+        result.rate = adaptive.rate
+    result.variant = config.variant
+    result.address = address
+    result.step = config.step
+
+    config.output.emit(result)
+    stats.record(result)
+    return result
+
+
+async def _run_steps(
+    client: httpx.AsyncClient,
+    steps: List[Tuple[str, _ProbeConfig, Stats]],
+    seq: int,
+    intended_time: Optional[int] = None,
+) -> None:
+    """Send the requests of one scenario iteration one after the other.
+
+    Each step records into its own statistics. Only the first
+    request is measured from the scheduled time; the iteration stops at the
+    first request that fails or gets a 4xx or 5xx status, as the steps
+    after it usually depend on it.
+
+    Args:
+        client: The shared async client
+        steps: URL, request settings and statistics of every step
+        seq: Sequence number of the iteration
+        intended_time: Scheduled send time in ns on the run's clock
+    """
+    for url, config, stats in steps:
+        stats.record_transmitted()
+        result = await _probe(client, url, seq, config, stats, intended_time)
+        if result.error is not None or (result.status or 0) >= 400:
+            break
+        intended_time = None
+
+
+async def _adaptive_send_time(
+    adaptive: AdaptiveRate, previous: int, clock: Clock
+) -> int:
+    """Wait until the next request of an adaptive schedule is due.
+
+    The next request is due one period of the current rate after the
+    previous one. The rate is read again at least once per controller
+    window, so a change also applies to a wait that already started; if
+    that makes the request overdue it is sent right away without counting
+    the wait as send lag. A schedule that fell further behind resumes from
+    now instead of sending a burst of held back requests to the target it
+    just backed off from.
+
+    Args:
+        adaptive: Controller of the target's request rate
+        previous: Time the previous request was due in ns
+        clock: Monotonic nanosecond clock of the run
+
+    Returns:
+        Time the request is due in ns
+    """
+    rate = adaptive.rate
+    while True:
+        period_ns = round(adaptive.period * NS_PER_SECOND)
+        due = previous + period_ns
+        now = clock()
+        if due <= now:
+            if adaptive.rate != rate or now - due >= period_ns:
+                return now
+            return due
+        await asyncio.sleep(min(due - now, adaptive.window_ns) / NS_PER_SECOND)
+
+
+async def _run_target(
+    client: httpx.AsyncClient,
+    url: str,
+    interval: float,
+    count: Optional[int],
+    concurrency: int,
+    rate: Optional[float],
+    config: _ProbeConfig,
+    stats: Stats,
+    start_delay: float = 0.0,
+    adaptive: Optional[AdaptiveRate] = None,
+    address: Optional[str] = None,
+    plan: Optional[_Plan] = None,
+) -> None:
+    """Probe one URL until ``count`` requests were sent.
+
+    With a ``plan`` every request is replaced by an iteration of a
+    scenario, which takes the iterations of the plan in turn.
+
+    Args:
+        client: The shared async client
+        url: The target URL to ping, or the name of the scenario
+        interval: Time in seconds between request starts
+        count: Optional limit on number of requests
+        concurrency: Maximum number of requests in flight
+        rate: Optional fixed request rate in requests per second
+        config: Request settings of the run
+        stats: Statistics of this target
+        start_delay: Time in seconds to wait before the first request
+        adaptive: Optional controller that sets the request rate instead
+            of ``rate``
+        address: Optional IP address all requests are pinned to
+        plan: Optional scenario iterations to send instead of requests to
+            ``url``
+    """
+    in_flight = asyncio.Semaphore(concurrency)
+    tasks: Set["asyncio.Task[Any]"] = set()
+
+    def _done(task: "asyncio.Task[Any]") -> None:
+        tasks.discard(task)
+        in_flight.release()
+
+    if start_delay > 0:
+        await asyncio.sleep(start_delay)
+
+    clock = config.clock
+    seq = 0
+    schedule_start = clock()
+    intended_time: Optional[int] = None
+    if adaptive is not None:
+        stats.set_rate(adaptive.rate)
+    try:
+        while count is None or seq < count:
+            seq += 1
+            if adaptive is not None:
+                if intended_time is None:
+                    intended_time = schedule_start
+                else:
+                    config.output.idle(round(adaptive.period * NS_PER_SECOND))
+                    intended_time = await _adaptive_send_time(
+                        adaptive, intended_time, clock
+                    )
+            elif rate is not None:
+                # Absolute timeline, so lateness never shifts later sends
+                intended_time = schedule_start + round((seq - 1) * NS_PER_SECOND / rate)
+            if intended_time is not None:
+                delay = intended_time - clock()
+                if delay > 0:
+                    config.output.idle(delay)
+                    await asyncio.sleep(delay / NS_PER_SECOND)
+
+            await in_flight.acquire()
+
+            probe_seq = config.seq_start + (seq - 1) * config.seq_step
+            task: "asyncio.Task[Any]"
+            if plan is None:
+                stats.record_transmitted()
+                task = asyncio.create_task(
+                    _probe(
+                        client,
+                        url,
+                        probe_seq,
+                        config,
+                        stats,
+                        intended_time,
+                        adaptive,
+                        address,
+                    )
+                )
+            else:
+                task = asyncio.create_task(
+                    _run_steps(
+                        client,
+                        plan[(seq - 1) % len(plan)],
+                        probe_seq,
+                        intended_time,
+                    )
+                )
+            tasks.add(task)
+            task.add_done_callback(_done)
+
+            if intended_time is None and (count is None or seq < count):
+                config.output.idle(round(interval * NS_PER_SECOND))
+                await asyncio.sleep(interval)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def async_hping(
+    url: str,
+    interval: float,
+    count: Optional[int] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    method: str = "GET",
+    timeout: float = 10.0,
+    headers: Optional[List[str]] = None,
+    data: RequestData = None,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    http2: bool = False,
+    http1: bool = True,
+    max_connections: Optional[int] = None,
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+    stats: Optional[Stats] = None,
+    timing: bool = False,
+    clock: Clock = default_clock,
+    stream: bool = False,
+    hash_algorithm: Optional[str] = None,
+    output_format: str = "text",
+    output: Optional[Output] = None,
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional[DnsCache] = None,
+    expect: Optional["Expectations"] = None,
+    seq_start: int = 1,
+    seq_step: int = 1,
+    adaptive: bool = False,
+    min_rate: Optional[float] = None,
+    slow_threshold: Optional[float] = None,
+) -> None:
+    """Send HTTP requests to a URL keeping up to N requests in flight.
+
+    A new request is started every ``interval`` seconds as long as fewer
+    than ``concurrency`` requests are outstanding, so a slow response no
+    longer delays the requests that follow it.
+
+    With ``rate`` set, requests are instead scheduled on a fixed timeline of
+    ``rate`` requests per second that does not depend on response times
+    (open-loop). Latency is then reported from the scheduled send time,
+    which corrects for coordinated omission.
+
+    With ``adaptive`` set, an AIMD controller
+    (:class:`hping.adaptive.AdaptiveRate`) sets the rate of that timeline:
+    it starts low, ramps up to ``rate`` (or one request per ``interval``)
+    while responses are healthy and backs off on errors and latency spikes.
+
+    Args:
+        url: The target URL to ping
+        interval: Time in seconds between request starts
+        count: Optional limit on number of requests
+        concurrency: Maximum number of requests in flight
+        rate: Optional fixed request rate in requests per second
+        method: HTTP method to use
+        timeout: Request timeout in seconds
+        headers: List of custom headers in "Name: Value" format
+        data: Request body data or a memory-mapped file body
+        follow_redirects: Whether to follow redirects
+        max_redirects: Maximum number of redirects to follow
+        http2: Whether to force HTTP/2 usage
+        http1: Whether to allow HTTP/1.1; without it plain http:// URLs use
+            HTTP/2 with prior knowledge
+        max_connections: Maximum number of open connections (default is
+            concurrency)
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to open a new connection for
+            every request, to measure cold connection latency
+        stats: Statistics to update
+        timing: Whether to print the per-phase timings of each request
+        clock: Monotonic nanosecond clock used for all timing
+        stream: Whether to read bodies in chunks instead of buffering them
+        hash_algorithm: Optional hashlib algorithm to hash streamed bodies with
+        output_format: Output format, one of "text", "json" or "csv"
+        output: Output to emit results to instead of one for output_format
+        results_log: Optional binary log every result is also appended to
+        resolver: Optional DNS cache to resolve host names with
+        expect: Optional checks a response must pass to count as received
+        seq_start: Sequence number of the first request
+        seq_step: Difference between consecutive sequence numbers, so runs
+            sharded over several processes get distinct numbers
+        adaptive: Whether to adapt the request rate to errors and latency
+        min_rate: Lowest adaptive rate in requests per second (default is
+            1% of the target rate)
+        slow_threshold: Round trip time in seconds above which the adaptive
+            rate backs off (default is a spike against the smoothed round
+            trip time)
+    """
+    if stats is None:
+        stats = Stats()
+
+    config = _make_config(
+        concurrency,
+        rate,
+        method,
+        headers,
+        data,
+        http2,
+        timing,
+        clock,
+        stream,
+        hash_algorithm,
+        output_format,
+        output=output,
+        results_log=results_log,
+        resolver=resolver,
+        expect=expect,
+        seq_start=seq_start,
+        seq_step=seq_step,
+    )
+    controller = _make_controller(
+        adaptive, rate, interval, min_rate, slow_threshold, clock
+    )
+
+    summary_hooks.append(config.output.close)
+    try:
+        async with httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            max_redirects=max_redirects,
+            http1=http1,
+            http2=http2,
+            limits=pool_limits(
+                max_connections or concurrency,
+                keepalive_expiry,
+                new_connection_per_request,
+            ),
+        ) as client:
+            await _run_target(
+                client,
+                url,
+                interval,
+                count,
+                concurrency,
+                rate,
+                config,
+                stats,
+                adaptive=controller,
+            )
+    finally:
+        config.output.close()
+        summary_hooks.remove(config.output.close)
+
+
+async def _address_targets(
+    urls: List[str], resolver: DnsCache
+) -> List[Tuple[str, str, Optional[str]]]:
+    """Turn URLs into one target per address their host names resolve to.
+
+    Args:
+        urls: The target URLs
+        resolver: DNS cache to resolve the host names with
+
+    Returns:
+        List of target name, URL and pinned address tuples
+
+    Raises:
+        httpx.ConnectError: If a host name cannot be resolved
+    """
+    pinned: List[Tuple[str, str, Optional[str]]] = []
+    for url in urls:
+        for address in await resolver.alookup(*url_origin(url)):
+            pinned.append((f"{url} ({address})", url, address))
+    return pinned
+
+
+async def async_hping_multi(
+    urls: List[str],
+    interval: float,
+    count: Optional[int] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    method: str = "GET",
+    timeout: float = 10.0,
+    headers: Optional[List[str]] = None,
+    data: RequestData = None,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    http2: bool = False,
+    http1: bool = True,
+    max_connections: Optional[int] = None,
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+    stats: Optional[Stats] = None,
+    timing: bool = False,
+    clock: Clock = default_clock,
+    stream: bool = False,
+    hash_algorithm: Optional[str] = None,
+    output_format: str = "text",
+    output: Optional[Output] = None,
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional[DnsCache] = None,
+    expect: Optional["Expectations"] = None,
+    seq_start: int = 1,
+    seq_step: int = 1,
+    adaptive: bool = False,
+    min_rate: Optional[float] = None,
+    slow_threshold: Optional[float] = None,
+    all_addresses: bool = False,
+) -> None:
+    """Probe many URLs from a single event loop and connection pool.
+
+    Every target runs its own schedule as in :func:`async_hping`, with its
+    own adaptive rate controller if enabled, and records into its own
+    statistics under ``stats.targets[url]``. First requests
+    are spread evenly over one interval so targets do not fire in lockstep.
+
+    With ``all_addresses`` every IP address a host name resolves to becomes
+    a target of its own, named ``"URL (ADDRESS)"``, so a single bad backend
+    behind round-robin DNS stands out in the per-target statistics.
+
+    Args:
+        urls: The target URLs to ping
+        interval: Time in seconds between request starts per target
+        count: Optional limit on number of requests per target
+        concurrency: Maximum number of requests in flight per target
+        rate: Optional fixed request rate per target in requests per second
+        method: HTTP method to use
+        timeout: Request timeout in seconds
+        headers: List of custom headers in "Name: Value" format
+        data: Request body data or a memory-mapped file body
+        follow_redirects: Whether to follow redirects
+        max_redirects: Maximum number of redirects to follow
+        http2: Whether to force HTTP/2 usage
+        http1: Whether to allow HTTP/1.1; without it plain http:// URLs use
+            HTTP/2 with prior knowledge
+        max_connections: Maximum number of open connections (default is
+            concurrency per target)
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to open a new connection for
+            every request, to measure cold connection latency
+        stats: Statistics to update
+        timing: Whether to print the per-phase timings of each request
+        clock: Monotonic nanosecond clock used for all timing
+        stream: Whether to read bodies in chunks instead of buffering them
+        hash_algorithm: Optional hashlib algorithm to hash streamed bodies with
+        output_format: Output format, one of "text", "json" or "csv"
+        output: Output to emit results to instead of one for output_format
+        results_log: Optional binary log every result is also appended to
+        resolver: Optional DNS cache to resolve host names with
+        expect: Optional checks a response must pass to count as received
+        seq_start: Sequence number of the first request
+        seq_step: Difference between consecutive sequence numbers, so runs
+            sharded over several processes get distinct numbers
+        adaptive: Whether to adapt the request rate to errors and latency
+        min_rate: Lowest adaptive rate in requests per second (default is
+            1% of the target rate)
+        slow_threshold: Round trip time in seconds above which the adaptive
+            rate backs off (default is a spike against the smoothed round
+            trip time)
+        all_addresses: Whether to probe every resolved address of each URL
+            separately
+
+    Raises:
+        httpx.ConnectError: If ``all_addresses`` is set and a host name
+            cannot be resolved
+    """
+    if stats is None:
+        stats = Stats()
+
+    config = _make_config(
+        concurrency,
+        rate,
+        method,
+        headers,
+        data,
+        http2,
+        timing,
+        clock,
+        stream,
+        hash_algorithm,
+        output_format,
+        label_errors=True,
+        output=output,
+        results_log=results_log,
+        resolver=resolver,
+        expect=expect,
+        seq_start=seq_start,
+        seq_step=seq_step,
+    )
+
+    urls = list(dict.fromkeys(urls))
+    if all_addresses:
+        pinned = await _address_targets(urls, resolver or DnsCache(clock=clock))
+    else:
+        pinned = [(url, url, None) for url in urls]
+    for name, _, _ in pinned:
+        stats.target(name)
+    controllers = {
+        name: _make_controller(
+            adaptive, rate, interval, min_rate, slow_threshold, clock
+        )
+        for name, _, _ in pinned
+    }
+
+    period = 1 / rate if rate is not None else interval
+    pool_size = len(pinned) * concurrency
+
+    summary_hooks.append(config.output.close)
+    try:
+        async with httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            max_redirects=max_redirects,
+            http1=http1,
+            http2=http2,
+            limits=pool_limits(
+                max_connections or pool_size,
+                keepalive_expiry,
+                new_connection_per_request,
+            ),
+        ) as client:
+            await asyncio.gather(
+                *(
+                    _run_target(
+                        client,
+                        url,
+                        interval,
+                        count,
+                        concurrency,
+                        rate,
+                        config,
+                        stats.target(name),
+                        start_delay=period * index / len(pinned),
+                        adaptive=controllers[name],
+                        address=address,
+                    )
+                    for index, (name, url, address) in enumerate(pinned)
+                )
+            )
+    finally:
+        config.output.close()
+        summary_hooks.remove(config.output.close)
+
+
+async def async_hping_compare(
+    url: str,
+    interval: float,
+    count: Optional[int] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    variants: Sequence[str] = COMPARE_VARIANTS,
+    method: str = "GET",
+    timeout: float = 10.0,
+    headers: Optional[List[str]] = None,
+    data: RequestData = None,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+    stats: Optional[Stats] = None,
+    timing: bool = False,
+    clock: Clock = default_clock,
+    stream: bool = False,
+    hash_algorithm: Optional[str] = None,
+    output_format: str = "text",
+    output: Optional[Output] = None,
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional[DnsCache] = None,
+    expect: Optional["Expectations"] = None,
+) -> None:
+    """Probe one URL over HTTP/1.1 and HTTP/2 side by side.
+
+    Every protocol variant runs the schedule of :func:`async_hping` at the
+    same time, with its own clients, and records into its own statistics
+    under ``stats.targets[variant]``:
+
+    - "http1": HTTP/1.1 with up to ``concurrency`` requests in flight, one
+      per connection
+    - "h2": HTTP/2 with one stream per connection, sent from
+      ``concurrency`` clients with one request in flight each
+    - "h2-mux": HTTP/2 with up to ``concurrency`` streams multiplexed on a
+      single connection
+
+    HTTP/2 is used with prior knowledge on plain http:// URLs and must be
+    negotiated on https:// URLs. Results are labeled with their variant.
+
+    Args:
+        url: The target URL to ping
+        interval: Time in seconds between request starts per variant
+        count: Optional limit on number of requests per variant
+        concurrency: Maximum number of requests in flight per variant
+        rate: Optional fixed request rate per variant in requests per second
+        variants: Variants to compare, a subset of COMPARE_VARIANTS
+        method: HTTP method to use
+        timeout: Request timeout in seconds
+        headers: List of custom headers in "Name: Value" format
+        data: Request body data or a memory-mapped file body
+        follow_redirects: Whether to follow redirects
+        max_redirects: Maximum number of redirects to follow
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to open a new connection for
+            every request, to measure cold connection latency
+        stats: Statistics to update
+        timing: Whether to print the per-phase timings of each request
+        clock: Monotonic nanosecond clock used for all timing
+        stream: Whether to read bodies in chunks instead of buffering them
+        hash_algorithm: Optional hashlib algorithm to hash streamed bodies with
+        output_format: Output format, one of "text", "json" or "csv"
+        output: Output to emit results to instead of one for output_format
+        results_log: Optional binary log every result is also appended to
+        resolver: Optional DNS cache to resolve host names with
+        expect: Optional checks a response must pass to count as received
+
+    Raises:
+        ValueError: If an option is invalid
+    """
+    unknown = [variant for variant in variants if variant not in COMPARE_VARIANTS]
+    if unknown:
+        raise ValueError(f"Unknown protocol variant '{unknown[0]}'")
+    if stats is None:
+        stats = Stats()
+
+    config = _make_config(
+        concurrency,
+        rate,
+        method,
+        headers,
+        data,
+        True,
+        timing,
+        clock,
+        stream,
+        hash_algorithm,
+        output_format,
+        output=output,
+        results_log=results_log,
+        resolver=resolver,
+        expect=expect,
+    )
+    period = 1 / rate if rate is not None else interval
+
+    def _client(max_connections: int, http2: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            max_redirects=max_redirects,
+            http1=not http2,
+            http2=http2,
+            limits=pool_limits(
+                max_connections, keepalive_expiry, new_connection_per_request
+            ),
+        )
+
+    summary_hooks.append(config.output.close)
+    summary_sections.append(format_comparison)
+    try:
+        async with contextlib.AsyncExitStack() as clients:
+            runs = []
+            for index, variant in enumerate(variants):
+                target = stats.target(variant)
+                variant_config = replace(config, variant=variant, templates={})
+                start_delay = period * index / len(variants)
+                if variant != "h2":
+                    client = await clients.enter_async_context(
+                        _client(
+                            1 if variant == "h2-mux" else concurrency,
+                            http2=variant == "h2-mux",
+                        )
+                    )
+                    runs.append(
+                        _run_target(
+                            client,
+                            url,
+                            interval,
+                            count,
+                            concurrency,
+                            rate,
+                            variant_config,
+                            target,
+                            start_delay=start_delay,
+                        )
+                    )
+                    continue
+                # A client per stream, each sending every concurrency-th request
+                for shard in range(concurrency):
+                    client = await clients.enter_async_context(_client(1, http2=True))
+                    shard_count = None
+                    if count is not None:
+                        shard_count = count // concurrency + (
+                            shard < count % concurrency
+                        )
+                    runs.append(
+                        _run_target(
+                            client,
+                            url,
+                            interval * concurrency,
+                            shard_count,
+                            1,
+                            rate / concurrency if rate is not None else None,
+                            replace(
+                                variant_config,
+                                seq_start=shard + 1,
+                                seq_step=concurrency,
+                            ),
+                            target,
+                            start_delay=start_delay + period * shard,
+                        )
+                    )
+            await asyncio.gather(*runs)
+    finally:
+        config.output.close()
+        summary_hooks.remove(config.output.close)
+        summary_sections.remove(format_comparison)
+
+
+async def async_hping_scenario(
+    scenario: "Scenario",
+    interval: float,
+    count: Optional[int] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    timeout: float = 10.0,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    http2: bool = False,
+    http1: bool = True,
+    max_connections: Optional[int] = None,
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+    stats: Optional[Stats] = None,
+    timing: bool = False,
+    clock: Clock = default_clock,
+    stream: bool = False,
+    hash_algorithm: Optional[str] = None,
+    output_format: str = "text",
+    output: Optional[Output] = None,
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional[DnsCache] = None,
+    expect: Optional["Expectations"] = None,
+) -> None:
+    """Send the requests of a scenario on the schedule of :func:`async_hping`.
+
+    The steps are compiled into request settings once, before the first
+    request. Every scheduled request is replaced by one iteration of the
+    scenario (see :class:`hping.scenario.Scenario`), which holds one of the
+    ``concurrency`` slots until all of its steps are done. Each step records
+    into its own statistics under ``stats.targets[name]``, and the
+    summary compares the steps side by side.
+
+    Args:
+        scenario: The scenario to run
+        interval: Time in seconds between iteration starts
+        count: Optional limit on number of iterations
+        concurrency: Maximum number of iterations in flight
+        rate: Optional fixed iteration rate in iterations per second
+        timeout: Request timeout in seconds
+        follow_redirects: Whether to follow redirects
+        max_redirects: Maximum number of redirects to follow
+        http2: Whether to force HTTP/2 usage
+        http1: Whether to allow HTTP/1.1; without it plain http:// URLs use
+            HTTP/2 with prior knowledge
+        max_connections: Maximum number of open connections (default is
+            concurrency)
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to open a new connection for
+            every request, to measure cold connection latency
+        stats: Statistics to update
+        timing: Whether to print the per-phase timings of each request
+        clock: Monotonic nanosecond clock used for all timing
+        stream: Whether to read bodies in chunks instead of buffering them
+        hash_algorithm: Optional hashlib algorithm to hash streamed bodies with
+        output_format: Output format, one of "text", "json" or "csv"
+        output: Output to emit results to instead of one for output_format
+        results_log: Optional binary log every result is also appended to
+        resolver: Optional DNS cache to resolve host names with
+        expect: Optional checks a response must pass to count as received
+    """
+    if stats is None:
+        stats = Stats()
+
+    configs: Dict[str, _ProbeConfig] = {}
+    for step in scenario.steps:
+        config = _make_config(
+            concurrency,
+            rate,
+            step.method,
+            step.headers,
+            step.data,
+            http2,
+            timing,
+            clock,
+            stream,
+            hash_algorithm,
+            output_format,
+            label_errors=True,
+            output=output,
+            results_log=results_log,
+            resolver=resolver,
+            expect=expect,
+        )
+        config.step = step.name
+        # All steps share the output created for the first one
+        output = config.output
+        configs[step.name] = config
+    targets = {step.name: stats.target(step.name) for step in scenario.steps}
+    plan = [
+        [(step.url, configs[step.name], targets[step.name]) for step in iteration]
+        for iteration in scenario.schedule()
+    ]
+
+    first = configs[scenario.steps[0].name]
+    output = first.output
+    summary_hooks.append(output.close)
+    summary_sections.append(format_comparison)
+    try:
+        async with httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            max_redirects=max_redirects,
+            http1=http1,
+            http2=http2,
+            limits=pool_limits(
+                max_connections or concurrency,
+                keepalive_expiry,
+                new_connection_per_request,
+            ),
+        ) as client:
+            await _run_target(
+                client,
+                scenario.path,
+                interval,
+                count,
+                concurrency,
+                rate,
+                first,
+                stats,
+                plan=plan,
+            )
+    finally:
+        output.close()
+        summary_hooks.remove(output.close)
+        summary_sections.remove(format_comparison)
+
+
+def hping_concurrent(
+    url: str,
+    interval: float,
+    count: Optional[int] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    **kwargs: Any,
+) -> None:
+    """Run :func:`async_hping` on a fresh event loop.
+
+    Args:
+        url: The target URL to ping
+        interval: Time in seconds between request starts
+        count: Optional limit on number of requests
+        concurrency: Maximum number of requests in flight
+        rate: Optional fixed request rate in requests per second
+        **kwargs: Further options passed to :func:`async_hping`
+    """
+    asyncio.run(
+        async_hping(url, interval, count, concurrency=concurrency, rate=rate, **kwargs)
+    )
+
+
+def hping_compare(
+    url: str,
+    interval: float,
+    count: Optional[int] = None,
+    **kwargs: Any,
+) -> None:
+    """Run :func:`async_hping_compare` on a fresh event loop.
+
+    Args:
+        url: The target URL to ping
+        interval: Time in seconds between request starts per variant
+        count: Optional limit on number of requests per variant
+        **kwargs: Further options passed to :func:`async_hping_compare`
+    """
+    asyncio.run(async_hping_compare(url, interval, count, **kwargs))
+
+
+def hping_scenario(
+    scenario: "Scenario",
+    interval: float,
+    count: Optional[int] = None,
+    **kwargs: Any,
+) -> None:
+    """Run :func:`async_hping_scenario` on a fresh event loop.
+
+    Args:
+        scenario: The scenario to run
+        interval: Time in seconds between iteration starts
+        count: Optional limit on number of iterations
+        **kwargs: Further options passed to :func:`async_hping_scenario`
+    """
+    asyncio.run(async_hping_scenario(scenario, interval, count, **kwargs))
+
+
+def hping_multi(
+    urls: List[str],
+    interval: float,
+    count: Optional[int] = None,
+    **kwargs: Any,
+) -> None:
+    """Run :func:`async_hping_multi` on a fresh event loop.
+
+    Args:
+        urls: The target URLs to ping
+        interval: Time in seconds between request starts per target
+        count: Optional limit on number of requests per target
+        **kwargs: Further options passed to :func:`async_hping_multi`
+    """
+    asyncio.run(async_hping_multi(urls, interval, count, **kwargs))
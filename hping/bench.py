@@ -0,0 +1,363 @@
+# hping/bench.py
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import socketserver
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .async_client import async_hping
+from .client import hping
+from .clock import NS_PER_MS, NS_PER_SECOND
+from .stats import Stats
+
+BENCH_PROTOCOLS = ("http1", "h2")
+
+
+class _Http1Handler(BaseHTTPRequestHandler):
+    """Answer every request with a fixed body over a keep-alive connection."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b""
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _H2Handler(socketserver.BaseRequestHandler):
+    """Answer every request with a fixed body over cleartext HTTP/2."""
+
+    body = b""
+
+    def handle(self) -> None:
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding=None)
+        )
+        connection.initiate_connection()
+        self.request.sendall(connection.data_to_send())
+        pending: Dict[int, bytes] = {}
+
+        while True:
+            data = self.request.recv(65535)
+            if not data:
+                return
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    connection.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    connection.send_headers(
+                        event.stream_id,
+                        [
+                            (b":status", b"200"),
+                            (b"content-length", b"%d" % len(self.body)),
+                        ],
+                    )
+                    pending[event.stream_id] = self.body
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            self._send_pending(connection, pending)
+            self.request.sendall(connection.data_to_send())
+
+    @staticmethod
+    def _send_pending(connection: Any, pending: Dict[int, bytes]) -> None:
+        """Send as much of the queued bodies as flow control allows."""
+        for stream_id in list(pending):
+            body = pending[stream_id]
+            while body:
+                size = min(
+                    connection.local_flow_control_window(stream_id),
+                    connection.max_outbound_frame_size,
+                    len(body),
+                )
+                if size <= 0:
+                    break
+                connection.send_data(stream_id, body[:size])
+                body = body[size:]
+            if body:
+                pending[stream_id] = body
+            else:
+                connection.end_stream(stream_id)
+                del pending[stream_id]
+
+
+class _H2Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalServer:
+    """In-process HTTP server to benchmark against.
+
+    ``http1`` serves HTTP/1.1 with keep-alive, ``h2`` serves HTTP/2 without
+    TLS (prior knowledge). Every request gets a 200 response with a body of
+    ``body_size`` bytes.
+    """
+
+    def __init__(self, protocol: str = "http1", body_size: int = 1024) -> None:
+        """Start the server on a free local port.
+
+        Args:
+            protocol: One of "http1" or "h2"
+            body_size: Size of every response body in bytes
+
+        Raises:
+            ValueError: If the protocol is not supported
+        """
+        body = b"x" * body_size
+        self._server: socketserver.TCPServer
+        if protocol == "http1":
+            handler = type("Handler", (_Http1Handler,), {"body": body})
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            self._server = server
+        elif protocol == "h2":
+            handler = type("Handler", (_H2Handler,), {"body": body})
+            self._server = _H2Server(("127.0.0.1", 0), handler)
+        else:
+            raise ValueError(f"Unsupported benchmark protocol '{protocol}'")
+        self.protocol = protocol
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        """Return the URL of the server."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def close(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalServer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+@dataclass
+class BenchResult:
+    """Measurements of one benchmark run."""
+
+    protocol: str
+    requests: int
+    received: int
+    elapsed_ns: int
+    cpu_ns: int
+    rtt_p50_ns: int
+    rtt_p99_ns: int
+    memory_per_probe: Optional[float] = None
+
+    @property
+    def rate(self) -> float:
+        """Return the achieved request rate in requests per second."""
+        return (
+            self.requests * NS_PER_SECOND / self.elapsed_ns if self.elapsed_ns else 0.0
+        )
+
+    @property
+    def overhead_ns(self) -> float:
+        """Return the client CPU time per request in nanoseconds."""
+        return self.cpu_ns / self.requests if self.requests else 0.0
+
+    @property
+    def memory_per_million(self) -> Optional[float]:
+        """Return the memory growth per 1M probes in bytes."""
+        if self.memory_per_probe is None:
+            return None
+        return self.memory_per_probe * 1_000_000
+
+
+def _probe(url: str, count: int, concurrency: int, protocol: str, stats: Stats) -> None:
+    """Send ``count`` requests as fast as hping can, discarding the output."""
+    options: Dict[str, Any] = dict(stats=stats)
+    if protocol == "h2":
+        options.update(http2=True, http1=False)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if concurrency > 1:
+            asyncio.run(async_hping(url, 0, count, concurrency=concurrency, **options))
+        else:
+            hping(url, 0, count, **options)
+
+
+def _retained_memory(url: str, count: int, concurrency: int, protocol: str) -> int:
+    """Return the memory still held after ``count`` probes, stats included."""
+    stats = Stats()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        threads = threading.active_count()
+        _probe(url, count, concurrency, protocol, stats)
+        # Let the server threads of the closed connections finish first
+        deadline = time.monotonic() + 1.0
+        while threading.active_count() > threads and time.monotonic() < deadline:
+            time.sleep(0.01)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def run_bench(
+    protocol: str = "http1",
+    count: int = 5000,
+    concurrency: int = 50,
+    body_size: int = 1024,
+    memory: bool = True,
+) -> BenchResult:
+    """Measure how fast hping can probe a local server.
+
+    The run uses the same engines as the CLI: the sync client for a
+    concurrency of 1, the async client otherwise. Client overhead is the CPU
+    time of the probing thread only, so the in-process server does not count
+    towards it. Memory growth per probe is measured in two further runs of
+    different length under tracemalloc.
+
+    Args:
+        protocol: One of "http1" or "h2"
+        count: Number of requests per run
+        concurrency: Maximum number of requests in flight
+        body_size: Size of every response body in bytes
+        memory: Whether to also measure the memory growth
+
+    Returns:
+        The measurements
+    """
+    with LocalServer(protocol, body_size) as server:
+        # Warm up imports, the connection and the server threads
+        _probe(server.url, min(count, 100), concurrency, protocol, Stats())
+
+        stats = Stats()
+        start_cpu = time.thread_time_ns()
+        start = time.perf_counter_ns()
+        _probe(server.url, count, concurrency, protocol, stats)
+        elapsed_ns = time.perf_counter_ns() - start
+        cpu_ns = time.thread_time_ns() - start_cpu
+
+        snapshot = stats.snapshot()
+        result = BenchResult(
+            protocol=protocol,
+            requests=snapshot.transmitted,
+            received=snapshot.received,
+            elapsed_ns=elapsed_ns,
+            cpu_ns=cpu_ns,
+            rtt_p50_ns=snapshot.rtt.percentile(50),
+            rtt_p99_ns=snapshot.rtt.percentile(99),
+        )
+
+        if memory:
+            # The growth between a short and a long run is what every
+            # further probe costs, without one-off caches and buffers
+            short = max(1, count // 5)
+            if count > short:
+                growth = _retained_memory(
+                    server.url, count, concurrency, protocol
+                ) - _retained_memory(server.url, short, concurrency, protocol)
+                result.memory_per_probe = max(0, growth) / (count - short)
+
+    return result
+
+
+def format_result(result: BenchResult) -> str:
+    """Format a benchmark result as one line.
+
+    Args:
+        result: The measurements
+
+    Returns:
+        The formatted line
+    """
+    line = (
+        f"{result.protocol}: {result.requests} requests in "
+        f"{result.elapsed_ns / NS_PER_SECOND:.2f} s, {result.rate:.0f} req/s, "
+        f"client CPU {result.overhead_ns / 1000:.1f} us/request, "
+        f"rtt p50/p99 = {result.rtt_p50_ns / NS_PER_MS:.3f}/"
+        f"{result.rtt_p99_ns / NS_PER_MS:.3f} ms"
+    )
+    if result.received != result.requests:
+        line += f", {result.requests - result.received} failed"
+    memory = result.memory_per_million
+    if memory is not None:
+        line += f", memory {memory / (1 << 20):.1f} MiB per 1M probes"
+    return line
+
+
+def bench_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of the ``hping bench`` subcommand.
+
+    Args:
+        argv: Command line arguments after "bench"
+    """
+    parser = argparse.ArgumentParser(
+        prog="hping bench",
+        description="Measure how many probes per second hping can drive "
+        "against a local in-process server",
+    )
+    parser.add_argument(
+        "--protocol",
+        choices=BENCH_PROTOCOLS + ("all",),
+        default="all",
+        help="Protocol of the local server. Default: all",
+    )
+    parser.add_argument(
+        "-c",
+        "--count",
+        type=int,
+        default=5000,
+        help="Number of requests per run. Default: 5000",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="Maximum number of requests in flight; 1 uses the sync client. "
+        "Default: 50",
+    )
+    parser.add_argument(
+        "--body-size",
+        type=int,
+        default=1024,
+        help="Response body size in bytes. Default: 1024",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip the memory measurement runs",
+    )
+    args = parser.parse_args(argv)
+
+    if args.count < 1 or args.concurrency < 1:
+        parser.error("--count and --concurrency must be at least 1")
+
+    protocols = BENCH_PROTOCOLS if args.protocol == "all" else (args.protocol,)
+    for protocol in protocols:
+        result = run_bench(
+            protocol,
+            count=args.count,
+            concurrency=args.concurrency,
+            body_size=args.body_size,
+            memory=not args.no_memory,
+        )
+        print(format_result(result))
@@ -0,0 +1,94 @@
+# hping/body.py
+
+import hashlib
+from typing import TYPE_CHECKING, Optional
+
+from .clock import Clock, default_clock
+
+if TYPE_CHECKING:
+    import httpx
+
+    from .expect import BodyCheck
+
+
+def validate_hash_algorithm(algorithm: Optional[str]) -> None:
+    """Check that a body hash algorithm is available.
+
+    Args:
+        algorithm: Name of a hashlib algorithm, or None for no hashing
+
+    Raises:
+        ValueError: If the algorithm is not available
+    """
+    if algorithm is not None and algorithm.lower() not in hashlib.algorithms_available:
+        raise ValueError(f"Unsupported hash algorithm '{algorithm}'")
+
+
+class BodyReader:
+    """Consume a streamed response body chunk by chunk.
+
+    The body is never held in memory as a whole: each chunk is counted,
+    optionally fed to a hash and to the checks of --expect-body and
+    --expect-sha256, and then discarded. The time of the first
+    chunk is kept to tell time to first byte from time to last byte.
+    """
+
+    __slots__ = ("size", "first_byte_at", "check", "_clock", "_hasher")
+
+    def __init__(
+        self,
+        clock: Clock = default_clock,
+        hash_algorithm: Optional[str] = None,
+        check: Optional["BodyCheck"] = None,
+    ) -> None:
+        """Create a reader for one response.
+
+        Args:
+            clock: Monotonic nanosecond clock to timestamp the first chunk
+            hash_algorithm: Optional hashlib algorithm to hash the body with
+            check: Optional checks to feed the body to
+        """
+        self.size = 0
+        self.first_byte_at: Optional[int] = None
+        self.check = check
+        self._clock = clock
+        self._hasher = hashlib.new(hash_algorithm) if hash_algorithm else None
+
+    def feed(self, chunk: bytes) -> None:
+        """Process one chunk of the body.
+
+        Args:
+            chunk: The received bytes
+        """
+        if self.first_byte_at is None:
+            self.first_byte_at = self._clock()
+        self.size += len(chunk)
+        if self._hasher is not None:
+            self._hasher.update(chunk)
+        if self.check is not None:
+            self.check.feed(chunk)
+
+    def read(self, response: "httpx.Response") -> None:
+        """Consume the body of a streamed response from a sync client.
+
+        Args:
+            response: Response opened with ``Client.stream``
+        """
+        for chunk in response.iter_bytes():
+            self.feed(chunk)
+
+    async def aread(self, response: "httpx.Response") -> None:
+        """Consume the body of a streamed response from an async client.
+
+        Args:
+            response: Response opened with ``AsyncClient.stream``
+        """
+        async for chunk in response.aiter_bytes():
+            self.feed(chunk)
+
+    @property
+    def digest(self) -> Optional[str]:
+        """Return the body hash as "algorithm=hexdigest", if hashing."""
+        if self._hasher is None:
+            return None
+        return f"{self._hasher.name}={self._hasher.hexdigest()}"
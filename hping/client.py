@@ -1,50 +1,68 @@
 # hping/client.py
 
 import json
+import socket
+import ssl
 import time
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
 import httpx
 
+from .body import BodyReader, validate_hash_algorithm
+from .clock import NS_PER_SECOND, Clock, default_clock
+from .output import ProbeResult, create_output
+from .payload import FileData
+from .phases import PhaseTimer, trace_current
+from .stats import Stats, summary_hooks
 
-def hping(
-    url: str,
-    interval: float,
-    count: Optional[int] = None,
-    method: str = "GET",
-    timeout: float = 10.0,
+if TYPE_CHECKING:
+    from .expect import BodyCheck, Expectations
+    from .resolver import DnsCache
+    from .results import ResultsLog
+
+SUPPORTED_METHODS = ["GET", "POST", "PUT", "DELETE", "HEAD", "PATCH"]
+
+# Connection limit of the sync client unless --max-connections is given
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Request body: inline data or a memory-mapped file
+RequestData = Union[str, FileData, None]
+
+
+def prepare_request(
+    method: str,
     headers: Optional[List[str]] = None,
-    data: Optional[str] = None,
-    follow_redirects: bool = True,
-    max_redirects: int = 5,
-    http2: bool = False,
-    stats: Optional[Dict[str, Any]] = None,
-) -> None:
-    """Send HTTP requests to a URL at regular intervals.
+    data: RequestData = None,
+) -> Tuple[str, Dict[str, str]]:
+    """Validate the HTTP method and build the request headers.
+
+    File bodies are sent with a Content-Length header rather than chunked,
+    and only their first and last bytes are looked at to detect JSON.
 
     Args:
-        url: The target URL to ping
-        interval: Time in seconds between requests
-        count: Optional limit on number of requests
         method: HTTP method to use
-        timeout: Request timeout in seconds
         headers: List of custom headers in "Name: Value" format
-        data: Request body data
-        follow_redirects: Whether to follow redirects
-        max_redirects: Maximum number of redirects to follow
-        http2: Whether to force HTTP/2 usage
-        stats: Statistics dictionary to update
+        data: Request body data or a memory-mapped file body
+
+    Returns:
+        Tuple of the normalized method and the parsed headers
+
+    Raises:
+        ValueError: If the HTTP method is not supported
     """
     from .headers import parse_headers
 
-    if stats is None:
-        stats = {"transmitted": 0, "received": 0, "rtt_times": []}
-
     # Parse and validate headers
     parsed_headers = parse_headers(headers)
 
     # Auto-detect JSON data and set Content-Type
-    if data:
+    if isinstance(data, FileData):
+        names = {name.lower() for name in parsed_headers}
+        if "content-length" not in names:
+            parsed_headers["Content-Length"] = str(len(data))
+        if "content-type" not in names and data.looks_like_json():
+            parsed_headers["Content-Type"] = "application/json"
+    elif data:
         try:
             json.loads(data)
             if (
@@ -57,75 +75,359 @@ def hping(
 
     # Validate HTTP method
     method = method.upper()
-    if method not in ["GET", "POST", "PUT", "DELETE", "HEAD", "PATCH"]:
+    if method not in SUPPORTED_METHODS:
         print(f"Error: Unsupported HTTP method '{method}'")
         raise ValueError(f"Unsupported HTTP method '{method}'")
 
+    return method, parsed_headers
+
+
+def pool_limits(
+    max_connections: Optional[int],
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+) -> httpx.Limits:
+    """Build the connection pool limits of a client.
+
+    Every connection may be kept alive, so a warmed up pool is never
+    trimmed. Without keep-alive each request opens a new connection.
+
+    Args:
+        max_connections: Maximum number of open connections
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to close every connection after
+            its response
+
+    Returns:
+        The pool limits
+    """
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=0 if new_connection_per_request else max_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+def request_template(
+    client: Union[httpx.Client, httpx.AsyncClient],
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    data: RequestData,
+    trace: Callable[..., Any],
+    address: Optional[str] = None,
+) -> httpx.Request:
+    """Build the request that is sent for every probe of a target.
+
+    Building a request parses the URL and merges headers, cookies and
+    timeouts, which costs more than sending it. Probes therefore send the
+    same request object again and again. Its ``trace`` callback must find
+    the timer of the current probe itself (see
+    :func:`hping.phases.trace_current`). Cookies are merged at build time,
+    so callers build a fresh request while the client holds any. File
+    bodies are sent straight from their memory mapping.
+
+    With an ``address`` the request is sent to that IP address instead of
+    resolving the URL's host name. The Host header and the TLS server name
+    still name the host, so virtual hosting and certificate checks work as
+    before.
+
+    Args:
+        client: The client that sends the request
+        method: HTTP method to use
+        url: The target URL
+        headers: Request headers
+        data: Request body data
+        trace: httpcore trace callback
+        address: Optional IP address to connect to
+
+    Returns:
+        The request
+    """
+    content: Any = data
+    if isinstance(data, FileData) and isinstance(client, httpx.AsyncClient):
+        content = data.async_chunks()
+    target = httpx.URL(url)
+    extensions: Dict[str, Any] = {"trace": trace}
+    if address is not None:
+        if not any(name.lower() == "host" for name in headers):
+            headers = {"Host": target.netloc.decode("ascii"), **headers}
+        if target.scheme == "https":
+            extensions["sni_hostname"] = target.host
+        target = target.copy_with(host=address)
+    return client.build_request(
+        method, target, headers=headers, content=content, extensions=extensions
+    )
+
+
+def classify_error(error: Exception) -> str:
+    """Return the error class of an exception raised by a request.
+
+    Connection errors are told apart by the OS or TLS error that caused
+    them, which httpx keeps in the exception's chain.
+
+    Args:
+        error: The raised exception
+
+    Returns:
+        One of "timeout", "too_many_redirects", "dns", "connect_refused",
+        "tls", "request_error" or "unexpected"
+    """
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.TooManyRedirects):
+        return "too_many_redirects"
+    if not isinstance(error, httpx.RequestError):
+        return "unexpected"
+    cause: Optional[BaseException] = error
+    seen = set()
+    while cause is not None and id(cause) not in seen:
+        seen.add(id(cause))
+        if isinstance(cause, socket.gaierror):
+            return "dns"
+        if isinstance(cause, ConnectionRefusedError):
+            return "connect_refused"
+        if isinstance(cause, ssl.SSLError):
+            return "tls"
+        cause = cause.__cause__ or cause.__context__
+    return "request_error"
+
+
+def response_result(
+    url: str,
+    seq: int,
+    response: httpx.Response,
+    size: int,
+    elapsed_ns: int,
+) -> ProbeResult:
+    """Build the result of a request that received a response.
+
+    Args:
+        url: The target URL
+        seq: Sequence number of the request
+        response: The received response
+        size: Response body size in bytes
+        elapsed_ns: Round trip time in nanoseconds
+
+    Returns:
+        The probe result
+    """
+    # httpx reports e.g. "HTTP/1.1", but keep bare versions working too
+    protocol = response.http_version
+    if not protocol.startswith("HTTP/"):
+        protocol = f"HTTP/{protocol}"
+    return ProbeResult(
+        seq=seq,
+        url=url,
+        elapsed_ns=elapsed_ns,
+        status=response.status_code,
+        size=size,
+        protocol=protocol,
+        redirects=len(response.history) if response.history else 0,
+    )
+
+
+def check_response(
+    result: ProbeResult,
+    response: httpx.Response,
+    expect: "Expectations",
+    body: Optional["BodyCheck"] = None,
+) -> None:
+    """Turn the result of a response that fails a check into an error.
+
+    The result keeps its status and timings, but is recorded as an
+    "assertion" error with the failed check as its message.
+
+    Args:
+        result: The probe result of the response
+        response: The received response
+        expect: Checks the response must pass
+        body: Checks the streamed body was fed to, if streamed
+    """
+    failure = expect.failure(response, body)
+    if failure is not None:
+        result.error = "assertion"
+        result.message = failure
+
+
+def error_result(url: str, seq: int, elapsed_ns: int, error: Exception) -> ProbeResult:
+    """Build the result of a request that failed.
+
+    Args:
+        url: The target URL
+        seq: Sequence number of the request
+        elapsed_ns: Time until the failure in nanoseconds
+        error: The raised exception
+
+    Returns:
+        The probe result
+    """
+    error_class = classify_error(error)
+    message = "" if error_class in ("timeout", "too_many_redirects") else str(error)
+    return ProbeResult(
+        seq=seq, url=url, elapsed_ns=elapsed_ns, error=error_class, message=message
+    )
+
+
+def hping(
+    url: str,
+    interval: float,
+    count: Optional[int] = None,
+    method: str = "GET",
+    timeout: float = 10.0,
+    headers: Optional[List[str]] = None,
+    data: RequestData = None,
+    follow_redirects: bool = True,
+    max_redirects: int = 5,
+    http2: bool = False,
+    http1: bool = True,
+    max_connections: Optional[int] = None,
+    keepalive_expiry: float = 5.0,
+    new_connection_per_request: bool = False,
+    stats: Optional[Stats] = None,
+    timing: bool = False,
+    clock: Clock = default_clock,
+    stream: bool = False,
+    hash_algorithm: Optional[str] = None,
+    output_format: str = "text",
+    results_log: Optional["ResultsLog"] = None,
+    resolver: Optional["DnsCache"] = None,
+    expect: Optional["Expectations"] = None,
+) -> None:
+    """Send HTTP requests to a URL at regular intervals.
+
+    With a ``resolver`` the host name is resolved by hping itself before
+    the request is timed, so DNS lookups do not add to the round trip time,
+    and the request is sent to the first of its addresses.
+
+    Args:
+        url: The target URL to ping
+        interval: Time in seconds between requests
+        count: Optional limit on number of requests
+        method: HTTP method to use
+        timeout: Request timeout in seconds
+        headers: List of custom headers in "Name: Value" format
+        data: Request body data or a memory-mapped file body
+        follow_redirects: Whether to follow redirects
+        max_redirects: Maximum number of redirects to follow
+        http2: Whether to force HTTP/2 usage
+        http1: Whether to allow HTTP/1.1; without it plain http:// URLs use
+            HTTP/2 with prior knowledge
+        max_connections: Maximum number of open connections (default is
+            DEFAULT_MAX_CONNECTIONS)
+        keepalive_expiry: Seconds an idle connection is kept open
+        new_connection_per_request: Whether to open a new connection for
+            every request, to measure cold connection latency
+        stats: Statistics to update
+        timing: Whether to print the per-phase timings of each request
+        clock: Monotonic nanosecond clock used for all timing
+        stream: Whether to read the body in chunks instead of buffering it
+        hash_algorithm: Optional hashlib algorithm to hash streamed bodies with
+        output_format: Output format, one of "text", "json" or "csv"
+        results_log: Optional binary log every result is also appended to
+        resolver: Optional DNS cache to resolve the host name with
+        expect: Optional checks a response must pass to count as received
+    """
+    if stats is None:
+        stats = Stats()
+
+    method, parsed_headers = prepare_request(method, headers, data)
+    validate_hash_algorithm(hash_algorithm)
+    output = create_output(
+        output_format, http2, timing, clock=clock, results_log=results_log
+    )
+
     # Create httpx client with appropriate settings
     client = httpx.Client(
         timeout=timeout,
         follow_redirects=follow_redirects,
         max_redirects=max_redirects,
+        http1=http1,
         http2=http2,
+        limits=pool_limits(
+            max_connections or DEFAULT_MAX_CONNECTIONS,
+            keepalive_expiry,
+            new_connection_per_request,
+        ),
     )
 
+    summary_hooks.append(output.close)
+    template: Optional[httpx.Request] = None
+    template_address: Optional[str] = None
+    origin = None
+    if resolver is not None:
+        from .resolver import url_origin
+
+        origin = url_origin(url)
     seq = 0
     try:
         while count is None or seq < count:
             seq += 1
-            stats["transmitted"] += 1
-            start_time = time.time()
+            stats.record_transmitted()
+            address: Optional[str] = None
+            lookup_error: Optional[Exception] = None
+            if resolver is not None and origin is not None:
+                try:
+                    address = resolver.lookup(*origin)[0]
+                except httpx.ConnectError as e:
+                    lookup_error = e
+            timer = PhaseTimer(clock)
+            timer.activate()
+            start_time = clock()
 
             try:
-                response = client.request(
-                    method=method,
-                    url=url,
-                    headers=parsed_headers,
-                    content=data,
-                )
-                elapsed_time = (time.time() - start_time) * 1000  # Convert to ms
-                size = len(response.content) if method != "HEAD" else 0
-                status = response.status_code
-                protocol = f"HTTP/{response.http_version}"
-
-                # Format output with additional info
-                output_parts = [
-                    f"{size} bytes from {url}",
-                    f"http_seq={seq}",
-                    f"status={status}",
-                    f"time={elapsed_time:.2f} ms",
-                ]
-
-                if http2:
-                    output_parts.append(f"protocol={protocol}")
-
-                # Add redirect info if redirects occurred
-                if hasattr(response, "history") and response.history:
-                    output_parts.append(f"redirects={len(response.history)}")
-
-                print(" ".join(output_parts))
-
-                stats["received"] += 1
-                stats["rtt_times"].append(elapsed_time)
-
-            except httpx.TimeoutException:
-                elapsed_time = (time.time() - start_time) * 1000  # Convert to ms
-                print(f"Request timeout: http_seq={seq} time={elapsed_time:.2f} ms")
-            except httpx.TooManyRedirects:
-                elapsed_time = (time.time() - start_time) * 1000  # Convert to ms
-                print(f"Too many redirects: http_seq={seq} time={elapsed_time:.2f} ms")
-            except httpx.RequestError as e:
-                elapsed_time = (time.time() - start_time) * 1000  # Convert to ms
-                print(
-                    f"Request failed: http_seq={seq} time={elapsed_time:.2f} ms - {e}"
-                )
+                if lookup_error is not None:
+                    raise lookup_error
+                if template is None or client.cookies or address != template_address:
+                    template = request_template(
+                        client,
+                        method,
+                        url,
+                        parsed_headers,
+                        data,
+                        trace_current,
+                        address,
+                    )
+                    template_address = address
+                body_check = None
+                if stream:
+                    if expect is not None:
+                        body_check = expect.body_check()
+                    reader = BodyReader(clock, hash_algorithm, body_check)
+                    response = client.send(template, stream=True)
+                    try:
+                        reader.read(response)
+                    finally:
+                        response.close()
+                    result = response_result(
+                        url, seq, response, reader.size, clock() - start_time
+                    )
+                    if reader.first_byte_at is not None:
+                        result.first_byte_ns = reader.first_byte_at - start_time
+                    result.digest = reader.digest
+                else:
+                    response = client.send(template)
+                    elapsed_ns = clock() - start_time
+                    size = len(response.content) if method != "HEAD" else 0
+                    result = response_result(url, seq, response, size, elapsed_ns)
+                if expect is not None:
+                    check_response(result, response, expect, body_check)
+                result.phases = timer.durations
+                result.reused = not timer.new_connection
+
             except Exception as e:
-                elapsed_time = (time.time() - start_time) * 1000  # Convert to ms
-                print(
-                    f"Unexpected error: http_seq={seq} time={elapsed_time:.2f} ms - {e}"
-                )
+                result = error_result(url, seq, clock() - start_time, e)
+
+            result.address = address
+            output.emit(result)
+            stats.record(result)
 
-            time.sleep(interval)
+            # Nothing to wait for after the last request of a counted run
+            if count is None or seq < count:
+                output.idle(round(interval * NS_PER_SECOND))
+                time.sleep(interval)
 
     finally:
+        output.close()
+        summary_hooks.remove(output.close)
         client.close()
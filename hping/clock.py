@@ -0,0 +1,14 @@
+# hping/clock.py
+
+import time
+from typing import Callable
+
+# A clock returns a monotonic timestamp in integer nanoseconds
+Clock = Callable[[], int]
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_MS = 1_000_000
+
+# Default clock for all timing: monotonic, high resolution and never
+# affected by wall-clock adjustments such as NTP slews
+default_clock: Clock = time.perf_counter_ns
@@ -0,0 +1,240 @@
+# hping/expect.py
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Pattern, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+# Longest body match a regular expression may find across chunk boundaries
+MAX_MATCH_SIZE = 16 * 1024
+
+# Bytes that make a body pattern more than a plain substring
+_SPECIAL = frozenset(b".^$*+?{}[]\\|()")
+
+# Unescaped $, \Z, \b, \B and lookarounds look past the bytes they match,
+# so at a chunk boundary they would see the end of the chunk as the end of
+# the body, or miss context that was already trimmed
+_LOOKS_AROUND = re.compile(rb"(?<!\\)(?:\\\\)*(?:\$|\\[ZbB]|\(\?<?[=!])")
+
+
+def parse_status(spec: str) -> List[Tuple[int, int]]:
+    """Parse an expected status such as ``200``, ``2xx`` or ``200-204``.
+
+    Several statuses may be given separated by commas.
+
+    Args:
+        spec: The expected statuses
+
+    Returns:
+        Lowest and highest status of each range
+
+    Raises:
+        ValueError: If a status is malformed
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip().lower()
+        low, dash, high = part.partition("-")
+        if len(part) == 3 and part[0].isdigit() and part[1:] == "xx":
+            ranges.append((int(part[0]) * 100, int(part[0]) * 100 + 99))
+        elif low.isdigit() and (high.isdigit() or not dash):
+            ranges.append((int(low), int(high or low)))
+        else:
+            raise ValueError(f"Invalid --expect-status '{spec}'")
+    return ranges
+
+
+class BodyCheck:
+    """Check one response body chunk by chunk.
+
+    Patterns are searched in each chunk together with the end of the
+    previous ones, so a match may span chunks while only a bounded tail of
+    the body is kept: the pattern's own length for plain substrings and
+    MAX_MATCH_SIZE bytes for regular expressions. Patterns that look past
+    their match, such as ``}$``, are searched once in the final tail when
+    the body is complete. The hash is updated with every chunk.
+    """
+
+    __slots__ = (
+        "_pending",
+        "_at_end",
+        "_window",
+        "_tail",
+        "_trimmed",
+        "_hasher",
+        "_sha256",
+    )
+
+    def __init__(self, patterns: List[Pattern[bytes]], sha256: Optional[str]) -> None:
+        """Create the checks of one response.
+
+        Args:
+            patterns: Patterns the body must match
+            sha256: Expected SHA-256 hex digest of the body, if any
+        """
+        self._pending = [p for p in patterns if not _LOOKS_AROUND.search(p.pattern)]
+        self._at_end = [p for p in patterns if _LOOKS_AROUND.search(p.pattern)]
+        self._window = max(
+            (
+                (
+                    MAX_MATCH_SIZE
+                    if _SPECIAL.intersection(pattern.pattern)
+                    else len(pattern.pattern)
+                )
+                for pattern in patterns
+            ),
+            default=0,
+        )
+        self._tail = b""
+        # Whether the tail no longer starts at the start of the body
+        self._trimmed = False
+        self._hasher = hashlib.sha256() if sha256 is not None else None
+        self._sha256 = sha256
+
+    def feed(self, chunk: bytes) -> None:
+        """Process one chunk of the body.
+
+        Args:
+            chunk: The received bytes
+        """
+        if self._hasher is not None:
+            self._hasher.update(chunk)
+        if not self._pending and not self._at_end:
+            return
+        data = self._tail + chunk if self._tail else chunk
+        # The first byte of a trimmed tail only keeps ^ and \A from matching
+        start = 1 if self._trimmed else 0
+        self._pending = [
+            pattern for pattern in self._pending if not pattern.search(data, start)
+        ]
+        if not self._pending and not self._at_end:
+            self._tail = b""
+        elif len(data) > self._window:
+            self._tail = data[-self._window :]
+            self._trimmed = True
+        else:
+            self._tail = data
+
+    def failure(self) -> Optional[str]:
+        """Return why the body failed its checks, or None if it passed."""
+        # The body is complete, so the tail now ends where the body does
+        start = 1 if self._trimmed else 0
+        failed = self._pending + [
+            pattern for pattern in self._at_end if not pattern.search(self._tail, start)
+        ]
+        if failed:
+            pattern = failed[0].pattern.decode("utf-8", "replace")
+            return f"body does not match '{pattern}'"
+        if self._hasher is not None and self._hasher.hexdigest() != self._sha256:
+            return f"body sha256 is {self._hasher.hexdigest()}"
+        return None
+
+
+@dataclass
+class Expectations:
+    """Checks a response must pass to count as received.
+
+    A response that fails one is recorded as an "assertion" error, so it
+    counts as lost like a request that got no response at all.
+    """
+
+    # Expected status ranges and the specs they were parsed from
+    statuses: List[Tuple[int, int]] = field(default_factory=list)
+    status_spec: str = ""
+    # Header names and optional patterns their values must match
+    headers: List[Tuple[str, Optional[Pattern[str]]]] = field(default_factory=list)
+    body: List[Pattern[bytes]] = field(default_factory=list)
+    sha256: Optional[str] = None
+
+    @property
+    def needs_body(self) -> bool:
+        """Return whether the body is checked as well as the headers."""
+        return bool(self.body) or self.sha256 is not None
+
+    def body_check(self) -> Optional[BodyCheck]:
+        """Return the body checks of a new response, if the body is checked."""
+        if not self.needs_body:
+            return None
+        return BodyCheck(self.body, self.sha256)
+
+    def failure(
+        self, response: "httpx.Response", body: Optional[BodyCheck] = None
+    ) -> Optional[str]:
+        """Return why a response failed its checks, or None if it passed.
+
+        Args:
+            response: The received response
+            body: Checks the streamed body was fed to; without them the
+                buffered body of the response is checked
+
+        Returns:
+            The first failed check
+        """
+        status = response.status_code
+        if self.statuses and not any(
+            low <= status <= high for low, high in self.statuses
+        ):
+            return f"status {status} is not {self.status_spec}"
+        for name, pattern in self.headers:
+            value = response.headers.get(name)
+            if value is None:
+                return f"header {name} is missing"
+            if pattern is not None and not pattern.search(value):
+                return f"header {name} '{value}' does not match '{pattern.pattern}'"
+        if not self.needs_body:
+            return None
+        if body is None:
+            body = BodyCheck(self.body, self.sha256)
+            body.feed(response.content)
+        return body.failure()
+
+
+def parse_expectations(
+    statuses: Optional[List[str]] = None,
+    headers: Optional[List[str]] = None,
+    bodies: Optional[List[str]] = None,
+    sha256: Optional[str] = None,
+) -> Optional[Expectations]:
+    """Build the checks of the --expect-* options.
+
+    Args:
+        statuses: Expected statuses, see :func:`parse_status`
+        headers: Header names, or "Name: REGEX" to also match the value
+        bodies: Regular expressions the body must match
+        sha256: Expected SHA-256 hex digest of the body
+
+    Returns:
+        The checks, or None if nothing is checked
+
+    Raises:
+        ValueError: If an option is malformed
+    """
+    if not (statuses or headers or bodies or sha256):
+        return None
+    expectations = Expectations()
+    for spec in statuses or []:
+        expectations.statuses.extend(parse_status(spec))
+    expectations.status_spec = ",".join(statuses or [])
+    for spec in headers or []:
+        name, colon, value = spec.partition(":")
+        name = name.strip()
+        if not name:
+            raise ValueError(f"Invalid --expect-header '{spec}'")
+        try:
+            pattern = re.compile(value.strip()) if colon else None
+        except re.error as e:
+            raise ValueError(f"Invalid --expect-header pattern '{value.strip()}': {e}")
+        expectations.headers.append((name, pattern))
+    for spec in bodies or []:
+        try:
+            expectations.body.append(re.compile(spec.encode("utf-8")))
+        except re.error as e:
+            raise ValueError(f"Invalid --expect-body pattern '{spec}': {e}")
+    if sha256 is not None:
+        if not re.fullmatch(r"[0-9a-fA-F]{64}", sha256):
+            raise ValueError(f"Invalid --expect-sha256 '{sha256}'")
+        expectations.sha256 = sha256.lower()
+    return expectations
@@ -2,17 +2,76 @@
 
 import argparse
 import sys
+from typing import TYPE_CHECKING, Dict, List
 
-from .client import hping
-from .stats import setup_signal_handler, stats
+from .adaptive import AdaptiveRate
+from .body import validate_hash_algorithm
+from .expect import parse_expectations
+from .output import OUTPUT_FORMATS
+from .payload import FileData
+from .report import start_reporter
+from .stats import format_comparison, setup_signal_handler, stats
+
+# httpx and the probe engines take most of the startup time, so they are
+# only imported once the arguments are known to need them. --help and
+# argument errors never load them.
+if TYPE_CHECKING:
+    from .client import RequestData
+    from .resolver import Origin
+
+# In-flight limit used with --rate unless --concurrency is given
+DEFAULT_RATE_CONCURRENCY = 100
+
+
+def read_targets(path: str) -> List[str]:
+    """Read target URLs from a file.
+
+    Args:
+        path: Path to a file with one URL per line; blank lines and lines
+            starting with "#" are ignored
+
+    Returns:
+        List of URLs in file order
+    """
+    with open(path, encoding="utf-8") as targets_file:
+        return [
+            line.strip()
+            for line in targets_file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
 
 
 def main() -> None:
     """Main CLI entry point."""
-    setup_signal_handler()
+    if sys.argv[1:2] == ["bench"]:
+        from .bench import bench_main
+
+        bench_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["analyze"]:
+        from .results import analyze_main
+
+        analyze_main(sys.argv[2:])
+        return
 
     parser = argparse.ArgumentParser(description="HTTP Ping CLI Tool")
-    parser.add_argument("url", type=str, help="URL to ping")
+    parser.add_argument(
+        "url", type=str, nargs="*", help="URL to ping. Several URLs can be given"
+    )
+    parser.add_argument(
+        "--targets-file",
+        type=str,
+        default=None,
+        help="File with one URL per line to ping in addition to the given URLs",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="TOML file with a sequence or weighted mix of requests to send "
+        "instead of a URL",
+    )
     parser.add_argument(
         "-i",
         "--interval",
@@ -58,6 +117,14 @@ def main() -> None:
         help="Request body data. Auto-detects JSON format",
     )
 
+    parser.add_argument(
+        "--data-file",
+        type=str,
+        metavar="PATH",
+        help="Send the contents of a file as the request body. The file is "
+        "memory-mapped, not read into memory. Auto-detects JSON format",
+    )
+
     # Redirect Control
     parser.add_argument(
         "--no-follow-redirects",
@@ -79,24 +146,621 @@ def main() -> None:
         help="Force HTTP/2 usage",
     )
 
+    # Protocol comparison
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Probe the URL over HTTP/1.1, HTTP/2 with one stream per "
+        "connection and HTTP/2 with all streams on one connection at the same "
+        "time and compare their round trip times",
+    )
+
+    # DNS resolution
+    parser.add_argument(
+        "--dns-ttl",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Resolve host names in hping and reuse the addresses for N "
+        "seconds, so DNS lookups do not add to the round trip times. "
+        "Default: 60 with --resolve or --all-addresses",
+    )
+
+    parser.add_argument(
+        "--resolve",
+        action="append",
+        default=None,
+        metavar="HOST:PORT:ADDR",
+        help="Connect to ADDR (or a comma separated list of addresses) "
+        "instead of resolving HOST for requests to PORT, like curl's "
+        "--resolve. Can be given several times",
+    )
+
+    parser.add_argument(
+        "--all-addresses",
+        action="store_true",
+        help="Probe every address the host names resolve to in parallel, "
+        "with statistics per address",
+    )
+
+    # Per-phase timings
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Show connect, TLS, send, time to first byte and download "
+        "times for each request",
+    )
+
+    # Streaming
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read response bodies in chunks without buffering them and show "
+        "the time to the first body byte",
+    )
+
+    parser.add_argument(
+        "--hash",
+        type=str,
+        default=None,
+        metavar="ALGORITHM",
+        help="Hash streamed response bodies with the given algorithm "
+        "(e.g. sha256). Implies --stream",
+    )
+
+    # Response checks
+    parser.add_argument(
+        "--expect-status",
+        action="append",
+        default=None,
+        metavar="STATUS",
+        help="Count a response as received only if its status matches, e.g. "
+        "200, 2xx, 200-204 or a comma separated list. Can be given several times",
+    )
+
+    parser.add_argument(
+        "--expect-header",
+        action="append",
+        default=None,
+        metavar="NAME[: REGEX]",
+        help="Count a response as received only if it has the header, and its "
+        "value matches REGEX if given. Can be given several times",
+    )
+
+    parser.add_argument(
+        "--expect-body",
+        action="append",
+        default=None,
+        metavar="REGEX",
+        help="Count a response as received only if its body matches REGEX. "
+        "Checked chunk by chunk; implies --stream. Can be given several times",
+    )
+
+    parser.add_argument(
+        "--expect-sha256",
+        type=str,
+        default=None,
+        metavar="HEX",
+        help="Count a response as received only if the SHA-256 of its body "
+        "is HEX. Implies --stream",
+    )
+
+    # Output format
+    parser.add_argument(
+        "-o",
+        "--output",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        help="Output format: one line of text, a JSON object (JSON Lines) or "
+        "a CSV row per request. Default: text",
+    )
+
+    parser.add_argument(
+        "--results-file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Append every result to a compact binary file for 'hping analyze PATH'",
+    )
+
+    # Concurrency
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Maximum number of requests in flight. "
+        f"Default: 1, or {DEFAULT_RATE_CONCURRENCY} with --rate",
+    )
+
+    # Fixed-rate scheduling
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Send requests at a fixed rate (requests per second) regardless "
+        "of response times. Latency is measured from the scheduled send time",
+    )
+
+    # Connection pool
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=None,
+        help="Maximum number of open connections. "
+        "Default: 100, or the concurrency for concurrent runs",
+    )
+
+    parser.add_argument(
+        "--keepalive-expiry",
+        type=float,
+        default=5.0,
+        help="Seconds an idle connection is kept open for reuse. Default: 5.0",
+    )
+
+    parser.add_argument(
+        "--new-connection-per-request",
+        action="store_true",
+        help="Open a new connection for every request to measure cold "
+        "connection latency",
+    )
+
+    # Adaptive rate control
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt the request rate to the target's health: start at "
+        "--min-rate, ramp up towards --rate (or one request per interval) "
+        "while responses are healthy and halve the rate on errors or "
+        "latency spikes",
+    )
+
+    parser.add_argument(
+        "--min-rate",
+        type=float,
+        default=None,
+        help="Lowest request rate of --adaptive in requests per second. "
+        "Default: 1%% of the target rate",
+    )
+
+    parser.add_argument(
+        "--slow-threshold",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Round trip time above which --adaptive backs off. Default: "
+        "4 times the smoothed round trip time",
+    )
+
+    # Worker processes
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to spread the requests over, for rates a "
+        "single process cannot reach. Default: 1",
+    )
+
+    # Periodic reports
+    parser.add_argument(
+        "--report-every",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Print the request rate, error percentage and rtt percentiles "
+        "of the last --report-window seconds every N seconds",
+    )
+
+    parser.add_argument(
+        "--report-window",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="Length of the rolling window of --report-every. Default: 60.0",
+    )
+
+    # Prometheus exporter
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="Serve counters and a latency histogram in Prometheus format on "
+        "http://ADDRESS:PORT/metrics while pinging",
+    )
+
+    parser.add_argument(
+        "--metrics-address",
+        type=str,
+        default="",
+        metavar="ADDRESS",
+        help="Address the metrics endpoint listens on. Default: all interfaces",
+    )
+
     args = parser.parse_args()
 
+    # Dumps and reports go to stderr to keep machine-readable output parseable
+    info_stream = sys.stdout if args.output == "text" else sys.stderr
+    setup_signal_handler(info_stream)
+
+    urls = list(args.url)
+    if args.targets_file:
+        try:
+            urls.extend(read_targets(args.targets_file))
+        except OSError as e:
+            print(f"Error: Cannot read targets file: {e}")
+            sys.exit(1)
+    if not urls and args.scenario is None:
+        parser.error("at least one URL, --targets-file or --scenario is required")
+
     # Validate HTTP method
     method = args.method.upper()
     if method not in ["GET", "POST", "PUT", "DELETE", "HEAD", "PATCH"]:
         print(f"Error: Unsupported HTTP method '{method}'")
         sys.exit(1)
 
-    hping(
-        args.url,
-        args.interval,
-        args.count,
-        method=method,
-        timeout=args.timeout,
-        headers=args.header,
-        data=args.data,
-        follow_redirects=not args.no_follow_redirects,
-        max_redirects=args.max_redirects,
-        http2=args.http2,
-        stats=stats,
+    try:
+        validate_hash_algorithm(args.hash)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    try:
+        expect = parse_expectations(
+            args.expect_status,
+            args.expect_header,
+            args.expect_body,
+            args.expect_sha256,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    stream = (
+        args.stream
+        or args.hash is not None
+        or (expect is not None and expect.needs_body)
     )
+
+    data: "RequestData" = args.data
+    if args.data_file is not None:
+        if args.data is not None:
+            print("Error: --data and --data-file cannot be combined")
+            sys.exit(1)
+        try:
+            data = FileData(args.data_file)
+        except OSError as e:
+            print(f"Error: Cannot read data file: {e}")
+            sys.exit(1)
+
+    rate_based = args.rate is not None or args.adaptive
+    concurrency = args.concurrency
+    if concurrency is None:
+        concurrency = DEFAULT_RATE_CONCURRENCY if rate_based else 1
+    if concurrency < 1:
+        print("Error: --concurrency must be at least 1")
+        sys.exit(1)
+
+    if args.rate is not None and args.rate <= 0:
+        print("Error: --rate must be greater than 0")
+        sys.exit(1)
+
+    if args.min_rate is not None or args.slow_threshold is not None:
+        if not args.adaptive:
+            print("Error: --min-rate and --slow-threshold require --adaptive")
+            sys.exit(1)
+    if args.adaptive:
+        if args.rate is None and args.interval <= 0:
+            print("Error: --adaptive requires --rate or an interval above 0")
+            sys.exit(1)
+        try:
+            AdaptiveRate(
+                args.rate if args.rate is not None else 1 / args.interval,
+                args.min_rate,
+                slow_threshold=args.slow_threshold,
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        adaptive_options = dict(
+            adaptive=True, min_rate=args.min_rate, slow_threshold=args.slow_threshold
+        )
+    else:
+        adaptive_options = {}
+
+    if args.compare:
+        if len(urls) > 1:
+            print("Error: --compare takes a single URL")
+            sys.exit(1)
+        if (
+            args.http2
+            or args.adaptive
+            or args.workers > 1
+            or args.max_connections is not None
+            or args.all_addresses
+        ):
+            print(
+                "Error: --compare cannot be combined with --http2, --adaptive, "
+                "--workers, --max-connections or --all-addresses"
+            )
+            sys.exit(1)
+
+    if args.scenario is not None and (
+        urls or args.compare or args.all_addresses or args.adaptive or args.workers > 1
+    ):
+        print(
+            "Error: --scenario cannot be combined with URLs, --compare, "
+            "--all-addresses, --adaptive or --workers"
+        )
+        sys.exit(1)
+
+    if args.max_connections is not None and args.max_connections < 1:
+        print("Error: --max-connections must be at least 1")
+        sys.exit(1)
+
+    if args.keepalive_expiry < 0:
+        print("Error: --keepalive-expiry must not be negative")
+        sys.exit(1)
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1")
+        sys.exit(1)
+
+    if args.report_every is not None and args.report_every <= 0:
+        print("Error: --report-every must be greater than 0")
+        sys.exit(1)
+
+    if args.report_window <= 0:
+        print("Error: --report-window must be greater than 0")
+        sys.exit(1)
+
+    resolver = None
+    if args.dns_ttl is not None or args.resolve or args.all_addresses:
+        from .resolver import DEFAULT_DNS_TTL, DnsCache, parse_resolve, url_origin
+
+        overrides: Dict["Origin", List[str]] = {}
+        try:
+            for spec in args.resolve or []:
+                origin, addresses = parse_resolve(spec)
+                overrides[origin] = addresses
+            resolver = DnsCache(
+                args.dns_ttl if args.dns_ttl is not None else DEFAULT_DNS_TTL,
+                overrides,
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if args.all_addresses:
+            import httpx
+
+            # Fail before probing rather than with no targets at all
+            for url in urls:
+                try:
+                    resolver.lookup(*url_origin(url))
+                except httpx.ConnectError as e:
+                    print(f"Error: {e}")
+                    sys.exit(1)
+
+    scenario = None
+    if args.scenario is not None:
+        from .scenario import load_scenario
+
+        try:
+            scenario = load_scenario(args.scenario, args.header)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot load scenario: {e}")
+            sys.exit(1)
+
+    results_log = None
+    if args.results_file is not None:
+        from .results import ResultsLog
+
+        try:
+            results_log = ResultsLog(args.results_file)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot open results file: {e}")
+            sys.exit(1)
+
+    try:
+        if args.metrics_port is not None:
+            from .metrics import start_metrics_server
+
+            try:
+                start_metrics_server(args.metrics_port, stats, args.metrics_address)
+            except OSError as e:
+                print(f"Error: Cannot start metrics server: {e}")
+                sys.exit(1)
+
+        if args.report_every is not None:
+            start_reporter(stats, args.report_every, args.report_window, info_stream)
+
+        if args.workers > 1:
+            from .workers import run_workers
+
+            try:
+                run_workers(
+                    urls,
+                    args.interval,
+                    args.count,
+                    workers=args.workers,
+                    concurrency=concurrency,
+                    rate=args.rate,
+                    method=method,
+                    timeout=args.timeout,
+                    headers=args.header,
+                    data=data,
+                    follow_redirects=not args.no_follow_redirects,
+                    max_redirects=args.max_redirects,
+                    http2=args.http2,
+                    max_connections=args.max_connections,
+                    keepalive_expiry=args.keepalive_expiry,
+                    new_connection_per_request=args.new_connection_per_request,
+                    stats=stats,
+                    timing=args.timing,
+                    stream=stream,
+                    hash_algorithm=args.hash,
+                    output_format=args.output,
+                    results_log=results_log,
+                    resolver=resolver,
+                    expect=expect,
+                    all_addresses=args.all_addresses,
+                    **adaptive_options,
+                )
+            except RuntimeError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            return
+
+        if scenario is not None:
+            from .async_client import hping_scenario
+
+            try:
+                hping_scenario(
+                    scenario,
+                    args.interval,
+                    args.count,
+                    concurrency=concurrency,
+                    rate=args.rate,
+                    timeout=args.timeout,
+                    follow_redirects=not args.no_follow_redirects,
+                    max_redirects=args.max_redirects,
+                    http2=args.http2,
+                    max_connections=args.max_connections,
+                    keepalive_expiry=args.keepalive_expiry,
+                    new_connection_per_request=args.new_connection_per_request,
+                    stats=stats,
+                    timing=args.timing,
+                    stream=stream,
+                    hash_algorithm=args.hash,
+                    output_format=args.output,
+                    results_log=results_log,
+                    resolver=resolver,
+                    expect=expect,
+                )
+            finally:
+                scenario.close()
+            steps = format_comparison(stats.snapshot())
+            if steps:
+                info_stream.write(f"\n{steps}\n")
+            return
+
+        if args.compare:
+            from .async_client import hping_compare
+
+            hping_compare(
+                urls[0],
+                args.interval,
+                args.count,
+                concurrency=concurrency,
+                rate=args.rate,
+                method=method,
+                timeout=args.timeout,
+                headers=args.header,
+                data=data,
+                follow_redirects=not args.no_follow_redirects,
+                max_redirects=args.max_redirects,
+                keepalive_expiry=args.keepalive_expiry,
+                new_connection_per_request=args.new_connection_per_request,
+                stats=stats,
+                timing=args.timing,
+                stream=stream,
+                hash_algorithm=args.hash,
+                output_format=args.output,
+                results_log=results_log,
+                resolver=resolver,
+                expect=expect,
+            )
+            comparison = format_comparison(stats.snapshot())
+            if comparison:
+                info_stream.write(f"\n{comparison}\n")
+            return
+
+        if len(urls) > 1 or args.all_addresses:
+            from .async_client import hping_multi
+
+            hping_multi(
+                urls,
+                args.interval,
+                args.count,
+                concurrency=concurrency,
+                rate=args.rate,
+                method=method,
+                timeout=args.timeout,
+                headers=args.header,
+                data=data,
+                follow_redirects=not args.no_follow_redirects,
+                max_redirects=args.max_redirects,
+                http2=args.http2,
+                max_connections=args.max_connections,
+                keepalive_expiry=args.keepalive_expiry,
+                new_connection_per_request=args.new_connection_per_request,
+                stats=stats,
+                timing=args.timing,
+                stream=stream,
+                hash_algorithm=args.hash,
+                output_format=args.output,
+                results_log=results_log,
+                resolver=resolver,
+                expect=expect,
+                all_addresses=args.all_addresses,
+                **adaptive_options,
+            )
+            return
+
+        if concurrency > 1 or rate_based:
+            from .async_client import hping_concurrent
+
+            hping_concurrent(
+                urls[0],
+                args.interval,
+                args.count,
+                concurrency=concurrency,
+                rate=args.rate,
+                method=method,
+                timeout=args.timeout,
+                headers=args.header,
+                data=data,
+                follow_redirects=not args.no_follow_redirects,
+                max_redirects=args.max_redirects,
+                http2=args.http2,
+                max_connections=args.max_connections,
+                keepalive_expiry=args.keepalive_expiry,
+                new_connection_per_request=args.new_connection_per_request,
+                stats=stats,
+                timing=args.timing,
+                stream=stream,
+                hash_algorithm=args.hash,
+                output_format=args.output,
+                results_log=results_log,
+                resolver=resolver,
+                expect=expect,
+                **adaptive_options,
+            )
+            return
+
+        from .client import hping
+
+        hping(
+            urls[0],
+            args.interval,
+            args.count,
+            method=method,
+            timeout=args.timeout,
+            headers=args.header,
+            data=data,
+            follow_redirects=not args.no_follow_redirects,
+            max_redirects=args.max_redirects,
+            http2=args.http2,
+            max_connections=args.max_connections,
+            keepalive_expiry=args.keepalive_expiry,
+            new_connection_per_request=args.new_connection_per_request,
+            stats=stats,
+            timing=args.timing,
+            stream=stream,
+            hash_algorithm=args.hash,
+            output_format=args.output,
+            results_log=results_log,
+            resolver=resolver,
+            expect=expect,
+        )
+    finally:
+        # Write the records still buffered, also after Ctrl+C
+        if results_log is not None:
+            results_log.close()
@@ -0,0 +1,168 @@
+# hping/metrics.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .clock import NS_PER_SECOND
+from .stats import Stats, StatsSnapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds of the exported latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+# Exported metric families with their type and help text
+_FAMILIES = {
+    "hping_requests_total": ("counter", "Requests sent"),
+    "hping_responses_total": ("counter", "Requests that received a response"),
+    "hping_errors_total": ("counter", "Failed requests by error class"),
+    "hping_failures_total": (
+        "counter",
+        "Failed requests and 4xx and 5xx responses by failure class",
+    ),
+    "hping_rtt_seconds": ("histogram", "Round trip time of answered requests"),
+    "hping_adaptive_rate": (
+        "gauge",
+        "Request rate set by the adaptive controller in requests per second",
+    ),
+}
+
+
+def _labels(**labels: Optional[str]) -> str:
+    """Format Prometheus labels, skipping those without a value."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels.items() if value]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _target_metrics(
+    stats: StatsSnapshot, target: Optional[str], lines: Dict[str, List[str]]
+) -> None:
+    """Add the samples of the statistics of a run or target to the families.
+
+    Args:
+        stats: Statistics of a run or target
+        target: Target URL label, or None for single-target runs
+        lines: Sample lines by metric family name
+    """
+    labels = _labels(target=target)
+    lines["hping_requests_total"].append(
+        f"hping_requests_total{labels} {stats.transmitted}"
+    )
+    lines["hping_responses_total"].append(
+        f"hping_responses_total{labels} {stats.received}"
+    )
+    for error_class, errors in sorted(stats.errors.items()):
+        error_labels = _labels(target=target, **{"class": error_class})
+        lines["hping_errors_total"].append(f"hping_errors_total{error_labels} {errors}")
+    for failure, histogram in sorted(stats.failures.items()):
+        failure_labels = _labels(target=target, **{"class": failure})
+        lines["hping_failures_total"].append(
+            f"hping_failures_total{failure_labels} {histogram.count}"
+        )
+
+    rtt = stats.rtt
+    bounds = [round(bound * NS_PER_SECOND) for bound in LATENCY_BUCKETS]
+    cumulative = rtt.cumulative_counts(bounds)
+    total = rtt.cumulative_counts([rtt.max_value])[0]
+    samples = lines["hping_rtt_seconds"]
+    for bound, count in zip(LATENCY_BUCKETS, cumulative):
+        bucket_labels = _labels(target=target, le=f"{bound:g}")
+        samples.append(f"hping_rtt_seconds_bucket{bucket_labels} {count}")
+    samples.append(
+        f"hping_rtt_seconds_bucket{_labels(target=target, le='+Inf')} {total}"
+    )
+    samples.append(f"hping_rtt_seconds_sum{labels} {rtt.total / NS_PER_SECOND}")
+    samples.append(f"hping_rtt_seconds_count{labels} {total}")
+
+    if stats.rate is not None:
+        lines["hping_adaptive_rate"].append(f"hping_adaptive_rate{labels} {stats.rate}")
+
+
+def render_metrics(stats: StatsSnapshot) -> str:
+    """Render statistics in the Prometheus text exposition format.
+
+    Multi-target runs export one series per target with a ``target`` label.
+
+    Args:
+        stats: Statistics of the run
+
+    Returns:
+        The exposition text
+    """
+    lines: Dict[str, List[str]] = {name: [] for name in _FAMILIES}
+    targets = stats.targets
+    if targets:
+        for url, target in targets.items():
+            _target_metrics(target, url, lines)
+    else:
+        _target_metrics(stats, None, lines)
+
+    output = []
+    for name, (metric_type, description) in _FAMILIES.items():
+        output.append(f"# HELP {name} {description}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(lines[name])
+    return "\n".join(output) + "\n"
+
+
+def start_metrics_server(
+    port: int, stats: Stats, address: str = ""
+) -> ThreadingHTTPServer:
+    """Serve the statistics on /metrics from a background thread.
+
+    Scrapes only read the counters and histograms, so probing is never
+    blocked by them.
+
+    Args:
+        port: TCP port to listen on (0 picks a free port)
+        stats: Statistics to export
+        address: Address to listen on (default is all interfaces)
+
+    Returns:
+        The running server; call ``shutdown()`` to stop it
+
+    Raises:
+        OSError: If the port cannot be bound
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics(stats.snapshot()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # Keep scrapes out of the ping output
+
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,407 @@
+# hping/output.py
+
+import csv
+import io
+import json
+import sys
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional
+
+from .clock import NS_PER_MS, NS_PER_SECOND, Clock, default_clock
+from .phases import PHASES, format_phases
+
+if TYPE_CHECKING:
+    from .results import ResultsLog
+
+OUTPUT_FORMATS = ("text", "json", "csv")
+
+# Text output label of each error class
+_ERROR_LABELS = {
+    "timeout": "Request timeout",
+    "too_many_redirects": "Too many redirects",
+    "dns": "DNS lookup failed",
+    "connect_refused": "Connection refused",
+    "tls": "TLS handshake failed",
+    "request_error": "Request failed",
+    "unexpected": "Unexpected error",
+    "assertion": "Assertion failed",
+}
+
+CSV_FIELDS = (
+    "seq",
+    "url",
+    "status",
+    "time_ms",
+    "bytes",
+    "protocol",
+    "redirects",
+    "error",
+    "first_byte_ms",
+    "lag_ms",
+    "reused",
+    "rate",
+    "variant",
+    "address",
+    "step",
+)
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of a single request."""
+
+    seq: int
+    url: str
+    elapsed_ns: int
+    status: Optional[int] = None
+    size: int = 0
+    protocol: Optional[str] = None
+    redirects: int = 0
+    error: Optional[str] = None
+    message: str = ""
+    first_byte_ns: Optional[int] = None
+    lag_ns: Optional[int] = None
+    digest: Optional[str] = None
+    phases: Dict[str, int] = field(default_factory=dict)
+    reused: Optional[bool] = None
+    # New request rate when this result made the adaptive controller act
+    rate: Optional[float] = None
+    # Protocol variant of a comparison run, e.g. "h2-mux"
+    variant: Optional[str] = None
+    # IP address the request was sent to when hping resolved the host
+    address: Optional[str] = None
+    # Name of the scenario step the request belongs to
+    step: Optional[str] = None
+
+
+def _ms(value: Optional[int]) -> Optional[float]:
+    """Convert nanoseconds to milliseconds rounded to microseconds."""
+    return None if value is None else round(value / NS_PER_MS, 3)
+
+
+class OutputWriter:
+    """Batch output lines and write them in as few calls as possible.
+
+    Lines are flushed together once ``flush_interval`` seconds have passed
+    since the previous flush or ``max_lines`` are waiting. At low rates
+    every line is therefore written right away, while high rates are not
+    slowed down by one write and flush per line. Writes alone cannot flush
+    while nothing is written, so the engines call :meth:`idle` before they
+    wait between probes.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        flush_interval: float = 1.0,
+        max_lines: int = 1024,
+        clock: Clock = default_clock,
+    ) -> None:
+        """Create a writer.
+
+        Args:
+            stream: Text stream to write to (default is stdout)
+            flush_interval: Maximum time in seconds lines are held back
+            max_lines: Maximum number of lines held back
+            clock: Monotonic nanosecond clock
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self.flush_interval_ns = round(flush_interval * NS_PER_SECOND)
+        self.max_lines = max_lines
+        self.clock = clock
+        self._lines: List[str] = []
+        self._last_flush: Optional[int] = None
+
+    def write(self, line: str) -> None:
+        """Queue one line and flush if it is due.
+
+        Args:
+            line: Line without a trailing newline
+        """
+        self._lines.append(line)
+        now = self.clock()
+        if (
+            self._last_flush is None
+            or len(self._lines) >= self.max_lines
+            or now - self._last_flush >= self.flush_interval_ns
+        ):
+            self.flush(now)
+
+    def flush(self, now: Optional[int] = None) -> None:
+        """Write all queued lines.
+
+        Args:
+            now: Current time on the writer's clock, if already known
+        """
+        if self._lines:
+            self.stream.write("\n".join(self._lines) + "\n")
+            self._lines.clear()
+            self.stream.flush()
+        self._last_flush = self.clock() if now is None else now
+
+    def idle(self, delay_ns: int) -> None:
+        """Flush now if a wait would hold queued lines back too long.
+
+        Args:
+            delay_ns: Time in ns the caller is about to wait for
+        """
+        if not self._lines or self._last_flush is None:
+            return
+        now = self.clock()
+        if now + delay_ns - self._last_flush >= self.flush_interval_ns:
+            self.flush(now)
+
+
+class Formatter(ABC):
+    """Turn probe results into output lines."""
+
+    def header(self) -> Optional[str]:
+        """Return a line to write before the first result, if any."""
+        return None
+
+    @abstractmethod
+    def format(self, result: ProbeResult) -> str:
+        """Return the output line for a result."""
+
+
+class TextFormatter(Formatter):
+    """Human readable ping-style lines."""
+
+    def __init__(
+        self,
+        show_protocol: bool = False,
+        show_phases: bool = False,
+        label_errors: bool = False,
+    ) -> None:
+        """Create a formatter.
+
+        Args:
+            show_protocol: Whether to show the negotiated HTTP version
+            show_phases: Whether to show per-phase timings
+            label_errors: Whether error lines name the target URL
+        """
+        self.show_protocol = show_protocol
+        self.show_phases = show_phases
+        self.label_errors = label_errors
+
+    def format(self, result: ProbeResult) -> str:
+        """Return the output line for a result."""
+        elapsed_time = result.elapsed_ns / NS_PER_MS
+        if result.error is not None:
+            label = _ERROR_LABELS.get(result.error, "Request failed")
+            target = f" from {result.url}" if self.label_errors else ""
+            detail = f" - {result.message}" if result.message else ""
+            line = f"{label}{target}: http_seq={result.seq} time={elapsed_time:.2f} ms"
+            line += detail
+        else:
+            line = (
+                f"{result.size} bytes from {result.url} http_seq={result.seq} "
+                f"status={result.status} time={elapsed_time:.2f} ms"
+            )
+
+            if self.show_protocol:
+                line += f" protocol={result.protocol}"
+
+            # Add redirect info if redirects occurred
+            if result.redirects:
+                line += f" redirects={result.redirects}"
+
+            if result.first_byte_ns is not None:
+                line += f" first_byte={result.first_byte_ns / NS_PER_MS:.2f} ms"
+            if result.digest:
+                line += f" {result.digest}"
+            if self.show_phases and result.phases:
+                line += f" {format_phases(result.phases)}"
+            if result.reused is not None:
+                line += " conn=reused" if result.reused else " conn=new"
+
+        if result.step is not None:
+            line += f" step={result.step}"
+        if result.address is not None:
+            line += f" address={result.address}"
+        if result.variant is not None:
+            line += f" variant={result.variant}"
+        if result.lag_ns is not None:
+            line += f" lag={result.lag_ns / NS_PER_MS:.2f} ms"
+        if result.rate is not None:
+            line += f" rate={result.rate:.2f}/s"
+        return line
+
+
+class JsonFormatter(Formatter):
+    """One JSON object per line (JSON Lines)."""
+
+    def format(self, result: ProbeResult) -> str:
+        """Return the output line for a result."""
+        record: Dict[str, Any] = {
+            "seq": result.seq,
+            "url": result.url,
+            "status": result.status,
+            "time_ms": _ms(result.elapsed_ns),
+            "bytes": result.size,
+            "protocol": result.protocol,
+            "redirects": result.redirects,
+            "error": result.error,
+            "reused": result.reused,
+        }
+        if result.message:
+            record["message"] = result.message
+        if result.first_byte_ns is not None:
+            record["first_byte_ms"] = _ms(result.first_byte_ns)
+        if result.lag_ns is not None:
+            record["lag_ms"] = _ms(result.lag_ns)
+        if result.rate is not None:
+            record["rate"] = round(result.rate, 3)
+        if result.variant is not None:
+            record["variant"] = result.variant
+        if result.address is not None:
+            record["address"] = result.address
+        if result.step is not None:
+            record["step"] = result.step
+        if result.digest:
+            algorithm, _, digest = result.digest.partition("=")
+            record["hash"] = {"algorithm": algorithm, "digest": digest}
+        if result.phases:
+            record["phases_ms"] = {
+                phase: _ms(result.phases[phase])
+                for phase in PHASES
+                if phase in result.phases
+            }
+        return json.dumps(record, separators=(",", ":"))
+
+
+class CsvFormatter(Formatter):
+    """Comma separated values with a header row."""
+
+    def __init__(self) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="")
+
+    def _row(self, values: Any) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue()
+
+    def header(self) -> Optional[str]:
+        """Return the header row."""
+        return self._row(CSV_FIELDS)
+
+    def format(self, result: ProbeResult) -> str:
+        """Return the output line for a result."""
+        return self._row(
+            (
+                result.seq,
+                result.url,
+                result.status,
+                _ms(result.elapsed_ns),
+                result.size,
+                result.protocol,
+                result.redirects,
+                result.error,
+                _ms(result.first_byte_ns),
+                _ms(result.lag_ns),
+                result.reused,
+                None if result.rate is None else round(result.rate, 3),
+                result.variant,
+                result.address,
+                result.step,
+            )
+        )
+
+
+class Output:
+    """Formatter and writer pair that probe results are emitted to."""
+
+    def __init__(
+        self,
+        formatter: Formatter,
+        writer: OutputWriter,
+        header: bool = True,
+        results_log: Optional["ResultsLog"] = None,
+    ) -> None:
+        """Create an output and write the formatter's header.
+
+        Args:
+            formatter: Formatter for the results
+            writer: Writer for the formatted lines
+            header: Whether to write the formatter's header
+            results_log: Optional binary log every result is also appended to
+        """
+        self.formatter = formatter
+        self.writer = writer
+        self.results_log = results_log
+        line = formatter.header() if header else None
+        if line is not None:
+            writer.write(line)
+
+    def emit(self, result: ProbeResult) -> None:
+        """Format and write one result.
+
+        Args:
+            result: The probe result
+        """
+        self.writer.write(self.formatter.format(result))
+        if self.results_log is not None:
+            self.results_log.write(result)
+
+    def idle(self, delay_ns: int) -> None:
+        """Flush lines that a wait would hold back too long.
+
+        Args:
+            delay_ns: Time in ns the caller is about to wait for
+        """
+        self.writer.idle(delay_ns)
+
+    def close(self) -> None:
+        """Write any lines and records that are still queued."""
+        self.writer.flush()
+        if self.results_log is not None:
+            self.results_log.flush()
+
+
+def create_output(
+    output_format: str = "text",
+    show_protocol: bool = False,
+    show_phases: bool = False,
+    label_errors: bool = False,
+    stream: Optional[IO[str]] = None,
+    clock: Clock = default_clock,
+    header: bool = True,
+    results_log: Optional["ResultsLog"] = None,
+) -> Output:
+    """Create the output for a run.
+
+    Text output is written line by line as before. JSON and CSV output is
+    meant for collectors and is written in batches.
+
+    Args:
+        output_format: One of "text", "json" or "csv"
+        show_protocol: Whether text lines show the negotiated HTTP version
+        show_phases: Whether text lines show per-phase timings
+        label_errors: Whether text error lines name the target URL
+        stream: Text stream to write to (default is stdout)
+        clock: Monotonic nanosecond clock
+        header: Whether to write the header row of formats that have one
+        results_log: Optional binary log every result is also appended to
+
+    Returns:
+        The output
+
+    Raises:
+        ValueError: If the output format is not supported
+    """
+    formatter: Formatter
+    if output_format == "text":
+        formatter = TextFormatter(show_protocol, show_phases, label_errors)
+        writer = OutputWriter(stream, flush_interval=0, clock=clock)
+    elif output_format == "json":
+        formatter = JsonFormatter()
+        writer = OutputWriter(stream, clock=clock)
+    elif output_format == "csv":
+        formatter = CsvFormatter()
+        writer = OutputWriter(stream, clock=clock)
+    else:
+        raise ValueError(f"Unsupported output format '{output_format}'")
+    return Output(formatter, writer, header, results_log)
@@ -0,0 +1,101 @@
+# hping/payload.py
+
+import mmap
+import os
+from typing import AsyncIterator, Iterator, Tuple
+
+# Bytes handed to the transport per write
+CHUNK_SIZE = 64 * 1024
+
+# Leading and trailing bytes inspected to detect a JSON body
+_SNIFF_SIZE = 64
+
+_WHITESPACE = b" \t\r\n"
+
+
+class FileData:
+    """Request body read from a memory-mapped file.
+
+    The file is mapped once and every request sends slices of the mapping,
+    so the body is never copied into a Python string or bytes object and
+    large payloads cost no memory per probe. The object can be iterated any
+    number of times, which lets a prebuilt request be sent again and again.
+    Pickling reopens the file, so it can be passed to worker processes.
+    """
+
+    __slots__ = ("path", "size", "chunk_size", "_map", "_view")
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE) -> None:
+        """Map a file into memory.
+
+        Args:
+            path: Path of the file to send
+            chunk_size: Bytes handed to the transport per write
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        with open(path, "rb") as file:
+            self.size = os.fstat(file.fileno()).st_size
+            # Empty files cannot be mapped
+            self._map = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.size
+                else None
+            )
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b"")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[memoryview]:
+        view = self._view
+        for offset in range(0, self.size, self.chunk_size):
+            yield view[offset : offset + self.chunk_size]
+
+    def __reduce__(self) -> Tuple[type, Tuple[str, int]]:
+        return (FileData, (self.path, self.chunk_size))
+
+    def async_chunks(self) -> "AsyncFileData":
+        """Return a view of the body for async clients."""
+        return AsyncFileData(self)
+
+    def looks_like_json(self) -> bool:
+        """Guess whether the file holds a JSON object or array.
+
+        Only the first and last non-blank bytes are looked at, so the check
+        costs the same for any file size.
+
+        Returns:
+            True if the body starts with "{" or "[" and ends with the
+            matching bracket
+        """
+        head = bytes(self._view[:_SNIFF_SIZE]).lstrip(_WHITESPACE)
+        tail = bytes(self._view[-_SNIFF_SIZE:]).rstrip(_WHITESPACE)
+        if not head or not tail:
+            return False
+        return (head[:1], tail[-1:]) in ((b"{", b"}"), (b"[", b"]"))
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+
+
+class AsyncFileData:
+    """Async iterable over the chunks of a :class:`FileData` body."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: FileData) -> None:
+        self.data = data
+
+    def __len__(self) -> int:
+        return self.data.size
+
+    async def __aiter__(self) -> AsyncIterator[memoryview]:
+        for chunk in self.data:
+            yield chunk
@@ -0,0 +1,134 @@
+# hping/phases.py
+
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from .clock import Clock, default_clock
+
+# Phases in the order they happen during a request
+PHASES = ("connect", "tls", "send", "ttfb", "download")
+
+# httpcore trace event (without its "connection."/"http11."/"http2." prefix)
+# that starts and ends each phase. DNS resolution happens inside
+# connect_tcp, so it is part of the connect phase.
+_PHASE_EVENTS = {
+    "connect": ("connect_tcp.started", "connect_tcp.complete"),
+    "tls": ("start_tls.started", "start_tls.complete"),
+    "send": ("send_request_headers.started", "send_request_body.complete"),
+    "ttfb": ("send_request_body.complete", "receive_response_headers.complete"),
+    "download": (
+        "receive_response_body.started",
+        "receive_response_body.complete",
+    ),
+}
+
+_STARTS = {start: phase for phase, (start, _) in _PHASE_EVENTS.items()}
+_ENDS = {end: phase for phase, (_, end) in _PHASE_EVENTS.items()}
+
+# Timer of the request being sent in the current thread or task
+_current_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar(
+    "hping_phase_timer", default=None
+)
+
+
+class PhaseTimer:
+    """Collect per-phase durations of a request from httpcore trace events.
+
+    Pass :meth:`trace` (sync clients) or :meth:`atrace` (async clients) as
+    the ``trace`` request extension. Durations are accumulated in
+    nanoseconds, so the phases of all redirect hops add up.
+    ``new_connection`` tells whether the request had to open a connection
+    instead of reusing one from the pool.
+    """
+
+    __slots__ = ("durations", "new_connection", "_clock", "_started")
+
+    def __init__(self, clock: Clock = default_clock) -> None:
+        """Create a timer without any recorded phases.
+
+        Args:
+            clock: Monotonic nanosecond clock to timestamp events with
+        """
+        self.durations: Dict[str, int] = {}
+        self.new_connection = False
+        self._clock = clock
+        self._started: Dict[str, int] = {}
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """Record a trace event.
+
+        Args:
+            event_name: Event name such as "http11.send_request_headers.started"
+            info: Event details (unused)
+        """
+        now = self._clock()
+        event = event_name.split(".", 1)[-1]
+
+        phase = _ENDS.get(event)
+        if phase is not None and phase in self._started:
+            elapsed = now - self._started.pop(phase)
+            self.durations[phase] = self.durations.get(phase, 0) + elapsed
+
+        phase = _STARTS.get(event)
+        if phase is not None:
+            self._started[phase] = now
+            if phase == "connect":
+                self.new_connection = True
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """Record a trace event from an async client.
+
+        Args:
+            event_name: Event name such as "http11.send_request_headers.started"
+            info: Event details (unused)
+        """
+        self.trace(event_name, info)
+
+    def activate(self) -> None:
+        """Make this the timer that :func:`trace_current` records to.
+
+        The timer stays active for the current thread or asyncio task, so
+        concurrent requests each record to their own timer.
+        """
+        _current_timer.set(self)
+
+
+def trace_current(event_name: str, info: Dict[str, Any]) -> None:
+    """Record a trace event with the active :class:`PhaseTimer`, if any.
+
+    Unlike :meth:`PhaseTimer.trace` this does not depend on a timer
+    instance, so it can be set once on a request that is sent many times.
+
+    Args:
+        event_name: Event name such as "http11.send_request_headers.started"
+        info: Event details (unused)
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.trace(event_name, info)
+
+
+async def atrace_current(event_name: str, info: Dict[str, Any]) -> None:
+    """Async variant of :func:`trace_current` for async clients.
+
+    Args:
+        event_name: Event name such as "http11.send_request_headers.started"
+        info: Event details (unused)
+    """
+    trace_current(event_name, info)
+
+
+def format_phases(durations: Dict[str, int]) -> str:
+    """Format phase durations for an output line.
+
+    Args:
+        durations: Phase durations in nanoseconds
+
+    Returns:
+        Space separated "phase=X ms" parts for the phases that occurred
+    """
+    return " ".join(
+        f"{phase}={durations[phase] / 1e6:.2f} ms"
+        for phase in PHASES
+        if phase in durations
+    )
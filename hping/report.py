@@ -0,0 +1,191 @@
+# hping/report.py
+
+import sys
+import threading
+from collections import deque
+from typing import IO, Deque, NamedTuple, Optional
+
+from .clock import NS_PER_MS, NS_PER_SECOND, Clock, default_clock
+from .stats import (
+    SUMMARY_PERCENTILES,
+    LatencyHistogram,
+    Stats,
+    StatsSnapshot,
+    reset_hooks,
+    reset_lock,
+)
+
+
+class _Slice(NamedTuple):
+    """Requests completed between two updates of a rolling window."""
+
+    end: int
+    transmitted: int
+    received: int
+    errors: int
+    rtt: LatencyHistogram
+
+
+class RollingWindow:
+    """Statistics of the last ``window`` seconds of a run.
+
+    The window is fed with the cumulative statistics of the run. Every
+    update turns the difference to the previous update into a slice, adds
+    it to running totals and subtracts the slices that fell out of the
+    window, so an update costs the same no matter how long the run is and
+    probing itself is not slowed down at all.
+    """
+
+    def __init__(self, stats: StatsSnapshot, window: float, now: int) -> None:
+        """Start an empty window.
+
+        Args:
+            stats: Statistics of the run
+            window: Length of the window in seconds
+            now: Current time in ns
+        """
+        self.window_ns = round(window * NS_PER_SECOND)
+        self._slices: Deque[_Slice] = deque()
+        self.reset(now)
+        self._previous = self._cumulative(stats, now)
+
+    def reset(self, now: int) -> None:
+        """Empty the window, as the statistics of the run start from zero.
+
+        Args:
+            now: Current time in ns
+        """
+        self.start = now
+        self.transmitted = 0
+        self.received = 0
+        self.errors = 0
+        self.rtt = LatencyHistogram()
+        self._slices.clear()
+        self._previous = _Slice(now, 0, 0, 0, LatencyHistogram())
+
+    @staticmethod
+    def _cumulative(stats: StatsSnapshot, now: int) -> _Slice:
+        """Return the totals of a run so far."""
+        total = stats.total()
+        return _Slice(
+            now,
+            total.transmitted,
+            total.received,
+            sum(total.errors.values()),
+            total.rtt.copy(),
+        )
+
+    def update(self, stats: StatsSnapshot, now: int) -> None:
+        """Add everything recorded since the previous update.
+
+        Args:
+            stats: Statistics of the run
+            now: Current time in ns
+        """
+        current = self._cumulative(stats, now)
+        previous = self._previous
+        rtt = current.rtt.copy()
+        rtt.subtract(previous.rtt)
+        piece = _Slice(
+            now,
+            current.transmitted - previous.transmitted,
+            current.received - previous.received,
+            current.errors - previous.errors,
+            rtt,
+        )
+        self._previous = current
+        self._slices.append(piece)
+        self._add(piece, 1)
+
+        while self._slices and self._slices[0].end <= now - self.window_ns:
+            expired = self._slices.popleft()
+            self._add(expired, -1)
+            self.start = expired.end
+
+    def _add(self, piece: _Slice, sign: int) -> None:
+        """Add a slice to the totals, or remove it with a sign of -1."""
+        self.transmitted += sign * piece.transmitted
+        self.received += sign * piece.received
+        self.errors += sign * piece.errors
+        if sign > 0:
+            self.rtt.merge(piece.rtt)
+        else:
+            self.rtt.subtract(piece.rtt)
+
+    def format(self, now: int) -> str:
+        """Format the window as one line.
+
+        Args:
+            now: Current time in ns
+
+        Returns:
+            The line with the window length, request rate, error percentage
+            and round trip time percentiles
+        """
+        elapsed = (now - self.start) / NS_PER_SECOND
+        completed = self.received + self.errors
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        error_percent = self.errors / completed * 100 if completed else 0.0
+        line = (
+            f"last {elapsed:.0f}s: {self.transmitted} transmitted, "
+            f"{self.received} received, {rate:.2f} req/s, "
+            f"{error_percent:.1f}% errors"
+        )
+        if self.rtt.count:
+            labels = "/".join(f"p{p:g}" for p in SUMMARY_PERCENTILES)
+            values = "/".join(
+                f"{self.rtt.percentile(p) / NS_PER_MS:.3f}" for p in SUMMARY_PERCENTILES
+            )
+            line += f", rtt {labels} = {values} ms"
+        return line
+
+
+def start_reporter(
+    stats: Stats,
+    interval: float,
+    window: float = 60.0,
+    stream: Optional[IO[str]] = None,
+    clock: Clock = default_clock,
+) -> threading.Event:
+    """Print rolling-window statistics from a background thread.
+
+    Every ``interval`` seconds the window is updated from a consistent
+    snapshot of the statistics and printed. Resetting the statistics
+    (SIGUSR2) also empties the window.
+
+    Args:
+        stats: Statistics of the run
+        interval: Seconds between reports
+        window: Length of the window in seconds
+        stream: Text stream to print to (default is stdout)
+        clock: Monotonic nanosecond clock
+
+    Returns:
+        Event that stops the reports when set
+    """
+    stop = threading.Event()
+
+    def _reset() -> None:
+        # Called with the reset lock held
+        rolling.reset(clock())
+
+    def _report() -> None:
+        try:
+            while not stop.wait(interval):
+                now = clock()
+                with reset_lock:
+                    rolling.update(stats.snapshot(), now)
+                    line = rolling.format(now)
+                output = stream if stream is not None else sys.stdout
+                output.write(line + "\n")
+                output.flush()
+        finally:
+            reset_hooks.remove(_reset)
+
+    with reset_lock:
+        rolling = RollingWindow(stats.snapshot(), window, clock())
+        reset_hooks.append(_reset)
+
+    thread = threading.Thread(target=_report, daemon=True)
+    thread.start()
+    return stop
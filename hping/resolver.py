@@ -0,0 +1,241 @@
+# hping/resolver.py
+
+import asyncio
+import ipaddress
+import socket
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .clock import NS_PER_SECOND, Clock, default_clock
+
+# Seconds resolved addresses are kept unless --dns-ttl is given
+DEFAULT_DNS_TTL = 60.0
+
+# Host name and port a set of addresses belongs to
+Origin = Tuple[str, int]
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def url_origin(url: str) -> Origin:
+    """Return the host name and port a URL connects to.
+
+    Args:
+        url: The URL
+
+    Returns:
+        Tuple of the lowercase host name and the port, which defaults to
+        the scheme's port
+    """
+    parsed = httpx.URL(url)
+    port = parsed.port or _DEFAULT_PORTS.get(parsed.scheme, 80)
+    return parsed.host.lower(), port
+
+
+def parse_resolve(spec: str) -> Tuple[Origin, List[str]]:
+    """Parse a curl-style ``host:port:addr[,addr]...`` override.
+
+    IPv6 addresses may be written in brackets.
+
+    Args:
+        spec: The override
+
+    Returns:
+        Tuple of the host name and port, and the addresses to use for them
+
+    Raises:
+        ValueError: If the override is malformed
+    """
+    host, _, rest = spec.partition(":")
+    port, _, addresses = rest.partition(":")
+    if not host or not port.isdigit() or not addresses:
+        raise ValueError(f"Invalid --resolve '{spec}', expected host:port:addr")
+    parsed = []
+    for address in addresses.split(","):
+        address = address.strip()
+        if address.startswith("[") and address.endswith("]"):
+            address = address[1:-1]
+        try:
+            ipaddress.ip_address(address)
+        except ValueError:
+            raise ValueError(f"Invalid address '{address}' in --resolve '{spec}'")
+        parsed.append(address)
+    return (host.lower(), int(port)), parsed
+
+
+class DnsCache:
+    """Resolve host names once and reuse the addresses for ``ttl`` seconds.
+
+    The system resolver does not report the time to live of its answers,
+    so every entry is kept for the same configured time. An expired entry
+    is resolved again on its next lookup; if that fails, the previous
+    addresses are used for another time to live, so a resolver hiccup does
+    not turn into failed probes. Overrides never expire, and IP
+    addresses are returned as they are.
+    """
+
+    __slots__ = ("ttl_ns", "clock", "overrides", "getaddrinfo", "_entries", "_pending")
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DNS_TTL,
+        overrides: Optional[Dict[Origin, List[str]]] = None,
+        clock: Clock = default_clock,
+        getaddrinfo: Callable[..., List[Any]] = socket.getaddrinfo,
+    ) -> None:
+        """Create an empty cache.
+
+        Args:
+            ttl: Seconds resolved addresses are reused
+            overrides: Fixed addresses by host name and port, as set with
+                --resolve
+            clock: Monotonic nanosecond clock
+            getaddrinfo: Resolver function with the signature of
+                :func:`socket.getaddrinfo`
+
+        Raises:
+            ValueError: If the time to live is not greater than 0
+        """
+        if ttl <= 0:
+            raise ValueError("DNS cache time to live must be greater than 0")
+        self.ttl_ns = round(ttl * NS_PER_SECOND)
+        self.clock = clock
+        self.overrides = dict(overrides or {})
+        self.getaddrinfo = getaddrinfo
+        # Expiry time and addresses by host name and port
+        self._entries: Dict[Origin, Tuple[int, List[str]]] = {}
+        # Resolutions in progress, so concurrent async lookups share one
+        self._pending: Dict[Origin, "asyncio.Future[List[str]]"] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes start with the entries resolved so far
+        return {
+            name: getattr(self, name) for name in self.__slots__ if name != "_pending"
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._pending = {}
+
+    def _fixed(self, origin: Origin) -> Optional[List[str]]:
+        """Return the addresses of an override or IP address host, if any."""
+        fixed = self.overrides.get(origin)
+        if fixed is not None:
+            return fixed
+        try:
+            ipaddress.ip_address(origin[0])
+        except ValueError:
+            return None
+        return [origin[0]]
+
+    def _cached(self, origin: Origin) -> Optional[List[str]]:
+        """Return the addresses of an unexpired entry, if any."""
+        entry = self._entries.get(origin)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1]
+        return None
+
+    def _resolve(self, origin: Origin) -> List[str]:
+        """Ask the system resolver for the addresses of a host.
+
+        Raises:
+            httpx.ConnectError: If the host cannot be resolved
+        """
+        host, port = origin
+        try:
+            infos = self.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise httpx.ConnectError(f"Cannot resolve {host}: {e}")
+        # A and AAAA records in resolver order, without duplicates
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise httpx.ConnectError(f"Cannot resolve {host}: no addresses")
+        return addresses
+
+    def _store(self, origin: Origin, addresses: List[str]) -> List[str]:
+        """Cache freshly resolved addresses.
+
+        Entries that expired more than a time to live ago are evicted at
+        the same time, so the cache does not grow with every host a redirect
+        ever pointed to while recently expired ones remain as a fallback.
+        """
+        now = self.clock()
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if entry[0] > now - self.ttl_ns
+        }
+        self._entries[origin] = (now + self.ttl_ns, addresses)
+        return addresses
+
+    def _stale(self, origin: Origin, error: httpx.ConnectError) -> List[str]:
+        """Keep using the expired addresses of a host that failed to resolve.
+
+        They are cached for another time to live, so the resolver is not
+        asked again on every probe while it is failing.
+
+        Raises:
+            httpx.ConnectError: If the host was never resolved before
+        """
+        entry = self._entries.get(origin)
+        if entry is None:
+            raise error
+        return self._store(origin, entry[1])
+
+    def lookup(self, host: str, port: int) -> List[str]:
+        """Return the addresses of a host, resolving them if needed.
+
+        Args:
+            host: Lowercase host name
+            port: Port to connect to
+
+        Returns:
+            The addresses, IPv4 and IPv6 in the resolver's order
+
+        Raises:
+            httpx.ConnectError: If the host cannot be resolved and was never
+                resolved before
+        """
+        origin = (host, port)
+        addresses = self._fixed(origin) or self._cached(origin)
+        if addresses is not None:
+            return addresses
+        try:
+            return self._store(origin, self._resolve(origin))
+        except httpx.ConnectError as e:
+            return self._stale(origin, e)
+
+    async def alookup(self, host: str, port: int) -> List[str]:
+        """Return the addresses of a host without blocking the event loop.
+
+        The system resolver runs in the loop's default executor, once for
+        all lookups of a host that arrive while it is being resolved.
+
+        Args:
+            host: Lowercase host name
+            port: Port to connect to
+
+        Returns:
+            The addresses, IPv4 and IPv6 in the resolver's order
+
+        Raises:
+            httpx.ConnectError: If the host cannot be resolved and was never
+                resolved before
+        """
+        origin = (host, port)
+        addresses = self._fixed(origin) or self._cached(origin)
+        if addresses is not None:
+            return addresses
+        pending = self._pending.get(origin)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(None, self._resolve, origin)
+            self._pending[origin] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(origin, None))
+        try:
+            # A cancelled probe must not cancel the lookup of the others
+            return self._store(origin, await asyncio.shield(pending))
+        except httpx.ConnectError as e:
+            return self._stale(origin, e)
@@ -0,0 +1,452 @@
+# hping/results.py
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import compress, repeat
+from operator import floordiv, le, not_
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .clock import NS_PER_MS, NS_PER_SECOND
+from .output import ProbeResult
+from .stats import LatencyHistogram, format_latency
+
+# File header: magic, format version and record size in bytes
+MAGIC = b"HPINGLOG"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+
+# Record: wall clock time in ns, seq, status (0 without a response), round
+# trip time in ns, body size in bytes and error code (0 without an error)
+_RECORD = struct.Struct("<6q")
+_FIELDS = 6
+_TIMESTAMP, _SEQ, _STATUS, _ELAPSED, _SIZE, _ERROR = range(_FIELDS)
+
+# Error code of each error class
+ERROR_CODES = {
+    "timeout": 1,
+    "too_many_redirects": 2,
+    "request_error": 3,
+    "unexpected": 4,
+    "assertion": 5,
+    "dns": 6,
+    "connect_refused": 7,
+    "tls": 8,
+}
+_ERROR_CLASSES = {code: error for error, code in ERROR_CODES.items()}
+
+# Records written per system call
+BUFFER_RECORDS = 1024
+
+# Records aggregated at a time by analyze()
+_CHUNK_RECORDS = 1 << 20
+
+
+def _check_header(header: bytes, path: str) -> None:
+    """Raise ValueError unless a header belongs to a supported results file."""
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{path} is not an hping results file")
+    magic, version, record_size = _HEADER.unpack(header[: _HEADER.size])
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an hping results file")
+    if version != FORMAT_VERSION or record_size != _RECORD.size:
+        raise ValueError(f"{path} has unsupported results format version {version}")
+
+
+class ResultsLog:
+    """Append-only binary log of probe results.
+
+    Every result becomes one fixed-size record of six little-endian 64-bit
+    integers. Records are buffered and appended with a single write of
+    whole records, so several worker processes can append to the same file
+    without interleaving. Pickling reopens the file, so the log can be
+    passed to worker processes.
+    """
+
+    __slots__ = ("path", "buffer_records", "wall_clock", "_fd", "_buffer")
+
+    def __init__(
+        self,
+        path: str,
+        buffer_records: int = BUFFER_RECORDS,
+        wall_clock: Callable[[], int] = time.time_ns,
+    ) -> None:
+        """Open a results file for appending, creating it if needed.
+
+        Args:
+            path: Path of the results file
+            buffer_records: Records held back before they are written
+            wall_clock: Clock of the record timestamps in ns since the epoch
+
+        Raises:
+            OSError: If the file cannot be opened
+            ValueError: If the file exists but is not a results file
+        """
+        self.path = path
+        self.buffer_records = buffer_records
+        self.wall_clock = wall_clock
+        self._buffer = bytearray()
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.write(self._fd, _HEADER.pack(MAGIC, FORMAT_VERSION, _RECORD.size))
+            else:
+                with open(path, "rb") as existing:
+                    _check_header(existing.read(_HEADER.size), path)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def __reduce__(self) -> Tuple[type, Tuple[str, int, Callable[[], int]]]:
+        return (ResultsLog, (self.path, self.buffer_records, self.wall_clock))
+
+    def write(self, result: ProbeResult) -> None:
+        """Append the record of one result.
+
+        Args:
+            result: The probe result
+        """
+        self._buffer += _RECORD.pack(
+            self.wall_clock(),
+            result.seq,
+            result.status or 0,
+            result.elapsed_ns,
+            result.size,
+            (
+                0
+                if result.error is None
+                else ERROR_CODES.get(result.error, ERROR_CODES["unexpected"])
+            ),
+        )
+        if len(self._buffer) >= self.buffer_records * _RECORD.size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered records."""
+        if self._buffer and self._fd >= 0:
+            os.write(self._fd, self._buffer)
+            self._buffer.clear()
+
+    def close(self) -> None:
+        """Write all buffered records and close the file."""
+        self.flush()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+@contextmanager
+def map_results(path: str) -> Iterator[memoryview]:
+    """Memory-map a results file.
+
+    Args:
+        path: Path of the results file
+
+    Yields:
+        The 64-bit integers of all complete records, six per record; a
+        record cut short by a crash is left out
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a results file
+    """
+    with open(path, "rb") as file:
+        _check_header(file.read(_HEADER.size), path)
+        size = os.fstat(file.fileno()).st_size
+        records = (size - _HEADER.size) // _RECORD.size
+        if not records:
+            yield memoryview(array("q"))
+            return
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    end = _HEADER.size + records * _RECORD.size
+    data = memoryview(mapping)
+    view = data[_HEADER.size : end].cast("q")
+    try:
+        yield view
+    finally:
+        view.release()
+        data.release()
+        try:
+            mapping.close()
+        except BufferError:
+            # The traceback of an error still references slices of the
+            # mapping; it is unmapped once they are freed
+            pass
+
+
+def _native(values: memoryview) -> memoryview:
+    """Return little-endian record integers in native byte order."""
+    if sys.byteorder == "little":
+        return values
+    swapped = array("q", values)
+    swapped.byteswap()
+    return memoryview(swapped)
+
+
+@dataclass
+class Analysis:
+    """Aggregated contents of a results file."""
+
+    bucket_ns: int
+    records: int = 0
+    start_ns: Optional[int] = None
+    end_ns: Optional[int] = None
+    size: int = 0
+    # Round trip times of the requests that got a response
+    rtt: LatencyHistogram = field(default_factory=LatencyHistogram)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    # Completed requests and errors by bucket start time in ns
+    buckets: Dict[int, int] = field(default_factory=dict)
+    bucket_errors: Dict[int, int] = field(default_factory=dict)
+
+
+class _Aggregator:
+    """Running totals of :func:`analyze` over chunks of records."""
+
+    def __init__(self, bucket_ns: int) -> None:
+        self.analysis = Analysis(bucket_ns)
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.buckets: Counter = Counter()
+        self.bucket_errors: Counter = Counter()
+
+    def add(self, chunk: memoryview) -> None:
+        """Aggregate a chunk of record integers column by column."""
+        analysis = self.analysis
+        bucket_ns = analysis.bucket_ns
+        timestamps = chunk[_TIMESTAMP::_FIELDS]
+        error = chunk[_ERROR::_FIELDS]
+
+        # Records of a single process are in time order, so the range and
+        # the time buckets can be found without looking at every timestamp
+        in_order = all(map(le, timestamps, timestamps[1:]))
+        if in_order:
+            first, last = timestamps[0], timestamps[-1]
+        else:
+            first, last = min(timestamps), max(timestamps)
+        if analysis.start_ns is None or first < analysis.start_ns:
+            analysis.start_ns = first
+        if analysis.end_ns is None or last > analysis.end_ns:
+            analysis.end_ns = last
+        analysis.records += len(timestamps)
+        analysis.size += sum(chunk[_SIZE::_FIELDS])
+
+        first_key, last_key = first // bucket_ns, last // bucket_ns
+        if in_order and last_key - first_key < len(timestamps):
+            low = 0
+            for key in range(first_key, last_key + 1):
+                high = bisect_left(timestamps, (key + 1) * bucket_ns, low)
+                if high > low:
+                    self.buckets[key] += high - low
+                low = high
+        else:
+            self.buckets.update(map(floordiv, timestamps, repeat(bucket_ns)))
+
+        # Failed requests have an error code and a status of 0
+        self.statuses.update(chunk[_STATUS::_FIELDS])
+        elapsed = chunk[_ELAPSED::_FIELDS]
+        if any(error):
+            self.errors.update(compress(error, error))
+            self.bucket_errors.update(
+                map(floordiv, compress(timestamps, error), repeat(bucket_ns))
+            )
+            analysis.rtt.record_many(list(compress(elapsed, map(not_, error))))
+        else:
+            analysis.rtt.record_many(elapsed)
+
+    def finish(self) -> Analysis:
+        """Return the analysis of all chunks added."""
+        analysis = self.analysis
+        bucket_ns = analysis.bucket_ns
+        del self.statuses[0]
+        analysis.statuses = dict(sorted(self.statuses.items()))
+        analysis.errors = {
+            _ERROR_CLASSES.get(code, f"code {code}"): self.errors[code]
+            for code in sorted(self.errors)
+        }
+        analysis.buckets = {
+            key * bucket_ns: self.buckets[key] for key in sorted(self.buckets)
+        }
+        analysis.bucket_errors = {
+            key * bucket_ns: self.bucket_errors[key]
+            for key in sorted(self.bucket_errors)
+        }
+        return analysis
+
+
+def analyze(
+    path: str, bucket: float = 60.0, chunk_records: int = _CHUNK_RECORDS
+) -> Analysis:
+    """Aggregate a results file.
+
+    The file is memory-mapped and aggregated a chunk at a time, column by
+    column with C-level builtins, so hundreds of millions of records are
+    read without loading the file and memory use does not depend on its
+    size.
+
+    Args:
+        path: Path of the results file
+        bucket: Length of the time buckets of the request rate in seconds
+        chunk_records: Records aggregated at a time
+
+    Returns:
+        The aggregated results
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a results file or bucket is not
+            above 0
+    """
+    bucket_ns = round(bucket * NS_PER_SECOND)
+    if bucket_ns <= 0:
+        raise ValueError("Bucket length must be greater than 0")
+    aggregator = _Aggregator(bucket_ns)
+    with map_results(path) as values:
+        step = chunk_records * _FIELDS
+        for offset in range(0, len(values), step):
+            aggregator.add(_native(values[offset : offset + step]))
+    return aggregator.finish()
+
+
+def _timestamp(ns: int) -> str:
+    """Format a wall clock time in ns as UTC ISO 8601."""
+    moment = datetime.fromtimestamp(ns / NS_PER_SECOND, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def format_analysis(path: str, analysis: Analysis) -> str:
+    """Format an analysis.
+
+    Args:
+        path: Path of the analyzed file
+        analysis: The aggregated results
+
+    Returns:
+        The summary lines followed by one line per time bucket
+    """
+    lines = [f"--- {path} ---"]
+    if not analysis.records or analysis.start_ns is None or analysis.end_ns is None:
+        lines.append("0 requests")
+        return "\n".join(lines)
+
+    failed = sum(analysis.errors.values())
+    lines.append(
+        f"{analysis.records} requests from {_timestamp(analysis.start_ns)} to "
+        f"{_timestamp(analysis.end_ns)}, {analysis.records - failed} responses, "
+        f"{failed} errors ({failed / analysis.records * 100:.1f}%), "
+        f"{analysis.size} bytes"
+    )
+    rtt = format_latency(analysis.rtt)
+    if rtt:
+        lines.append(rtt)
+    if analysis.statuses:
+        lines.append(
+            "status "
+            + ", ".join(f"{status}={n}" for status, n in analysis.statuses.items())
+        )
+    if analysis.errors:
+        lines.append(
+            "errors "
+            + ", ".join(f"{error}={n}" for error, n in analysis.errors.items())
+        )
+
+    seconds = analysis.bucket_ns / NS_PER_SECOND
+    lines.append(f"rate per {seconds:g}s:")
+    for start, completed in analysis.buckets.items():
+        lines.append(
+            f"{_timestamp(start)} {completed} requests, "
+            f"{completed / seconds:.2f} req/s, "
+            f"{analysis.bucket_errors.get(start, 0)} errors"
+        )
+    return "\n".join(lines)
+
+
+def replay(path: str, stream: Optional[IO[str]] = None) -> None:
+    """Write every record of a results file as a CSV row.
+
+    Args:
+        path: Path of the results file
+        stream: Text stream to write to (default is stdout)
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a results file
+    """
+    output = stream if stream is not None else sys.stdout
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(("timestamp_ns", "seq", "status", "time_ms", "bytes", "error"))
+    with map_results(path) as values:
+        step = _CHUNK_RECORDS * _FIELDS
+        for offset in range(0, len(values), step):
+            _write_records(writer, _native(values[offset : offset + step]))
+
+
+def _write_records(writer: Any, chunk: memoryview) -> None:
+    """Write a chunk of record integers as CSV rows."""
+    columns = [chunk[column::_FIELDS] for column in range(_FIELDS)]
+    for record in zip(*columns):
+        writer.writerow(
+            (
+                record[_TIMESTAMP],
+                record[_SEQ],
+                record[_STATUS] or None,
+                round(record[_ELAPSED] / NS_PER_MS, 3),
+                record[_SIZE],
+                _ERROR_CLASSES.get(record[_ERROR]) if record[_ERROR] else None,
+            )
+        )
+
+
+def analyze_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of the ``hping analyze`` subcommand.
+
+    Args:
+        argv: Command line arguments after "analyze"
+    """
+    parser = argparse.ArgumentParser(
+        prog="hping analyze",
+        description="Summarize a results file written with --results-file",
+    )
+    parser.add_argument("file", type=str, help="Results file to analyze")
+    parser.add_argument(
+        "--bucket",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="Length of the time buckets of the request rate. Default: 60.0",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Print every record as a CSV row instead of the summary",
+    )
+    args = parser.parse_args(argv)
+
+    if args.bucket <= 0:
+        parser.error("--bucket must be greater than 0")
+
+    try:
+        if args.replay:
+            replay(args.file)
+        else:
+            print(format_analysis(args.file, analyze(args.file, args.bucket)))
+    except BrokenPipeError:
+        # The reader, such as head, has exited. Point stdout at devnull so
+        # flushing it at exit does not fail again, and stop quietly.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
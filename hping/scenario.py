@@ -0,0 +1,234 @@
+# hping/scenario.py
+
+import os
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from math import gcd
+from string import Template
+from typing import Any, List, Mapping, Optional
+
+import httpx
+
+from .client import SUPPORTED_METHODS, RequestData
+from .payload import FileData
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+# How the steps of a scenario are turned into iterations
+SCENARIO_MODES = ("sequence", "weighted")
+
+_SCENARIO_KEYS = {"mode", "base_url", "headers", "steps"}
+_STEP_KEYS = {"name", "method", "url", "headers", "body", "body_file", "weight"}
+
+
+@dataclass
+class Step:
+    """One request of a scenario."""
+
+    name: str
+    url: str
+    method: str = "GET"
+    # Headers in "Name: Value" format, like --header
+    headers: List[str] = field(default_factory=list)
+    data: RequestData = None
+    weight: int = 1
+
+
+@dataclass
+class Scenario:
+    """Requests a run sends instead of a single URL.
+
+    In ``sequence`` mode every iteration sends all steps one after the
+    other, e.g. a login followed by the requests that need its cookie. In
+    ``weighted`` mode every iteration sends one step, picked so that each
+    step gets its share of the iterations by weight.
+    """
+
+    path: str
+    steps: List[Step]
+    mode: str = "sequence"
+
+    def schedule(self) -> List[List[Step]]:
+        """Return the steps of each iteration of one cycle.
+
+        Iterations repeat the cycle. Weighted cycles use smooth weighted
+        round-robin, so every step gets exactly its share of each cycle and
+        heavy steps are spread out instead of being sent in bursts.
+
+        Returns:
+            One list of steps per iteration
+        """
+        if self.mode == "sequence":
+            return [list(self.steps)]
+        divisor = 0
+        for step in self.steps:
+            divisor = gcd(divisor, step.weight)
+        weights = [step.weight // divisor for step in self.steps]
+        total = sum(weights)
+        current = [0] * len(weights)
+        cycle = []
+        for _ in range(total):
+            for index, weight in enumerate(weights):
+                current[index] += weight
+            chosen = max(range(len(current)), key=current.__getitem__)
+            current[chosen] -= total
+            cycle.append([self.steps[chosen]])
+        return cycle
+
+    def close(self) -> None:
+        """Close the files of file bodies."""
+        for step in self.steps:
+            if isinstance(step.data, FileData):
+                step.data.close()
+
+
+def _expand(value: Any, what: str, variables: Mapping[str, str]) -> str:
+    """Fill ``${NAME}`` placeholders of a string from the variables.
+
+    Raises:
+        ValueError: If the value is not a string or names an unknown variable
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"{what} must be a string")
+    try:
+        return Template(value).substitute(variables)
+    except KeyError as e:
+        raise ValueError(f"Undefined variable {e} in {what}")
+    except ValueError as e:
+        raise ValueError(f"Invalid placeholder in {what}: {e}")
+
+
+def _headers(value: Any, what: str, variables: Mapping[str, str]) -> List[str]:
+    """Turn a table of headers into "Name: Value" strings."""
+    if not isinstance(value, dict):
+        raise ValueError(f"{what} must be a table")
+    return [
+        f"{name}: {_expand(header, f'{what} {name}', variables)}"
+        for name, header in value.items()
+    ]
+
+
+def _step(
+    raw: Any,
+    index: int,
+    base_url: Optional[str],
+    directory: str,
+    variables: Mapping[str, str],
+) -> Step:
+    """Build and validate one step of a scenario file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"Step {index} must be a table")
+    unknown = set(raw) - _STEP_KEYS
+    if unknown:
+        raise ValueError(f"Unknown keys in step {index}: {', '.join(sorted(unknown))}")
+    if "url" not in raw:
+        raise ValueError(f"Step {index} has no url")
+    name = raw.get("name", raw["url"])
+    what = f"step '{name}'"
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Step {index} needs a name")
+
+    url = _expand(raw["url"], f"url of {what}", variables)
+    if base_url is not None:
+        url = str(httpx.URL(base_url).join(url))
+    if httpx.URL(url).scheme not in ("http", "https"):
+        raise ValueError(f"url of {what} must be absolute unless base_url is set")
+
+    method = raw.get("method", "GET")
+    if not isinstance(method, str) or method.upper() not in SUPPORTED_METHODS:
+        raise ValueError(f"Unsupported HTTP method '{method}' in {what}")
+
+    weight = raw.get("weight", 1)
+    if isinstance(weight, bool) or not isinstance(weight, int) or weight < 1:
+        raise ValueError(f"weight of {what} must be a whole number of at least 1")
+
+    data: RequestData = None
+    if "body" in raw and "body_file" in raw:
+        raise ValueError(f"{what} cannot have both body and body_file")
+    if "body" in raw:
+        data = _expand(raw["body"], f"body of {what}", variables)
+    elif "body_file" in raw:
+        body_file = _expand(raw["body_file"], f"body_file of {what}", variables)
+        data = FileData(os.path.join(directory, body_file))
+
+    return Step(
+        name=name,
+        url=url,
+        method=method.upper(),
+        headers=_headers(raw.get("headers", {}), f"headers of {what}", variables),
+        data=data,
+        weight=weight,
+    )
+
+
+def load_scenario(
+    path: str,
+    headers: Optional[List[str]] = None,
+    variables: Optional[Mapping[str, str]] = None,
+) -> Scenario:
+    """Load and compile a TOML scenario file.
+
+    The file has an optional ``mode`` ("sequence" or "weighted"), an
+    optional ``base_url`` that relative step URLs are joined with, an
+    optional ``headers`` table sent with every step and one ``[[steps]]``
+    table per request with a ``url`` and optional ``name``, ``method``,
+    ``headers``, ``body`` or ``body_file`` and ``weight``. ``${NAME}``
+    placeholders in URLs, header values and bodies are filled in from the
+    environment once, when the file is loaded. Body files are relative to
+    the scenario file.
+
+    Args:
+        path: Path of the scenario file
+        headers: Headers in "Name: Value" format sent with every step
+            before the scenario's own
+        variables: Values of the placeholders (default is the environment)
+
+    Returns:
+        The scenario
+
+    Raises:
+        OSError: If the file or a body file cannot be read
+        ValueError: If the file is not a valid scenario
+    """
+    if variables is None:
+        variables = os.environ
+    with open(path, "rb") as f:
+        try:
+            raw = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"Invalid TOML: {e}")
+
+    unknown = set(raw) - _SCENARIO_KEYS
+    if unknown:
+        raise ValueError(f"Unknown keys: {', '.join(sorted(unknown))}")
+    mode = raw.get("mode", "sequence")
+    if mode not in SCENARIO_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SCENARIO_MODES)}")
+    base_url = raw.get("base_url")
+    if base_url is not None:
+        base_url = _expand(base_url, "base_url", variables)
+    shared = list(headers or []) + _headers(
+        raw.get("headers", {}), "headers", variables
+    )
+    raw_steps = raw.get("steps")
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise ValueError("A scenario needs at least one [[steps]] table")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    steps: List[Step] = []
+    try:
+        for index, raw_step in enumerate(raw_steps, 1):
+            step = _step(raw_step, index, base_url, directory, variables)
+            step.headers = shared + step.headers
+            steps.append(step)
+        name, uses = Counter(step.name for step in steps).most_common(1)[0]
+        if uses > 1:
+            raise ValueError(f"Step name '{name}' is used more than once")
+    except (OSError, ValueError):
+        Scenario(path, steps).close()
+        raise
+    return Scenario(path, steps, mode)
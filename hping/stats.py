@@ -1,36 +1,994 @@
 # hping/stats.py
 
+import math
+import queue
 import signal
 import sys
-from typing import Any, Dict
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import repeat
+from operator import rshift
+from typing import IO, Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .clock import NS_PER_MS
+from .output import ProbeResult
+from .phases import PHASES
+
+# Percentiles shown in the summary
+SUMMARY_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Constant-memory histogram of non-negative integer values.
+
+    Values are stored in log-linear buckets in the style of HdrHistogram:
+    every power-of-two range is split into ``2 ** sub_bucket_bits`` equal
+    buckets, so each bucket is at most ``1 / 2 ** sub_bucket_bits`` of the
+    values it holds wide. Recording is O(1) and memory does not grow with
+    the number of recorded values. The bucket array is only allocated up to
+    the largest value seen, so idle histograms stay small. Count, sum, min
+    and max are tracked exactly.
+    """
+
+    __slots__ = (
+        "sub_bucket_bits",
+        "sub_bucket_count",
+        "max_value",
+        "counts",
+        "count",
+        "total",
+        "min",
+        "max",
+    )
+
+    def __init__(self, sub_bucket_bits: int = 6, max_value: int = 1 << 44) -> None:
+        """Create an empty histogram.
+
+        Args:
+            sub_bucket_bits: Number of bits of precision per power of two
+            max_value: Largest value tracked precisely; larger values are
+                counted in the last bucket (default is about 4.9 hours in ns)
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.max_value = max_value
+        self.counts = array("Q")
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        """Return the bucket index for a value."""
+        shift = value.bit_length() - self.sub_bucket_bits - 1
+        if shift <= 0:
+            return value
+        return shift * self.sub_bucket_count + (value >> shift)
+
+    def _bucket_bounds(self, index: int) -> Tuple[int, int]:
+        """Return the lowest and highest value that map to a bucket."""
+        shift = index // self.sub_bucket_count - 1
+        if shift <= 0:
+            return index, index
+        lowest = (index - shift * self.sub_bucket_count) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+    def record(self, value: int) -> None:
+        """Record a single value.
+
+        Args:
+            value: Non-negative integer value to record
+        """
+        if value < 0:
+            value = 0
+        index = self._index(min(value, self.max_value))
+        counts = self.counts
+        if index >= len(counts):
+            counts.frombytes(bytes(8 * (index + 1 - len(counts))))
+        counts[index] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def record_many(self, values: Sequence[int]) -> None:
+        """Record a batch of values.
+
+        Much faster than calling :meth:`record` for each value, as the
+        values are grouped with C-level builtins. Every value is first
+        shifted right by the bucket precision of the smallest one, which
+        never moves it out of its bucket but leaves few distinct keys.
+
+        Args:
+            values: Non-negative integer values, e.g. a memoryview column
+        """
+        if not len(values):
+            return
+        low = min(values)
+        if low < 0:
+            values = [max(value, 0) for value in values]
+            low = 0
+        high = max(values)
+        keys = values
+        if high > self.max_value:
+            keys = [min(value, self.max_value) for value in values]
+        shift = max(0, min(low, self.max_value).bit_length() - self.sub_bucket_bits - 1)
+        groups = Counter(map(rshift, keys, repeat(shift)) if shift else keys)
+
+        counts = self.counts
+        for key, key_count in groups.items():
+            index = self._index(key << shift)
+            if index >= len(counts):
+                counts.frombytes(bytes(8 * (index + 1 - len(counts))))
+            counts[index] += key_count
+        if self.count == 0 or low < self.min:
+            self.min = low
+        if high > self.max:
+            self.max = high
+        self.count += len(values)
+        self.total += sum(values)
+
+    @property
+    def mean(self) -> float:
+        """Return the exact mean of the recorded values."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """Return the value at the given percentile.
+
+        The result is the midpoint of the bucket that holds the value with
+        the requested nearest rank, clamped to the recorded min and max.
+
+        Args:
+            percentile: Percentile between 0 and 100
+
+        Returns:
+            The estimated value, or 0 if nothing was recorded
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            if seen >= rank:
+                lowest, highest = self._bucket_bounds(index)
+                value = (lowest + highest) // 2
+                return max(self.min, min(value, self.max))
+        return self.max
+
+    def cumulative_counts(self, bounds: Sequence[int]) -> List[int]:
+        """Return the number of values at or below each bound.
+
+        Values are counted by bucket, so a bound that falls inside a bucket
+        counts the whole bucket. The result is exact for bucket-aligned
+        bounds and otherwise within the bucket error.
+
+        Args:
+            bounds: Bounds in ascending order
+
+        Returns:
+            Cumulative count for each bound
+        """
+        counts = self.counts[:]
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            last = min(self._index(min(bound, self.max_value)), len(counts) - 1)
+            while index <= last:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add all values recorded in another histogram to this one.
+
+        Args:
+            other: Histogram with the same bucket layout
+        """
+        if (
+            other.sub_bucket_bits != self.sub_bucket_bits
+            or other.max_value != self.max_value
+        ):
+            raise ValueError("Cannot merge histograms with different layouts")
+        if other.count == 0:
+            return
+        counts = self.counts
+        if len(other.counts) > len(counts):
+            counts.frombytes(bytes(8 * (len(other.counts) - len(counts))))
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def subtract(self, other: "LatencyHistogram") -> None:
+        """Remove the values recorded in another histogram from this one.
+
+        ``other`` must only hold values that were also recorded here, such
+        as an earlier copy of this histogram. Min and max are afterwards
+        only known to bucket precision.
+
+        Args:
+            other: Histogram with the same bucket layout
+        """
+        if (
+            other.sub_bucket_bits != self.sub_bucket_bits
+            or other.max_value != self.max_value
+        ):
+            raise ValueError("Cannot subtract histograms with different layouts")
+        if other.count == 0:
+            return
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] -= bucket_count
+        self.count -= other.count
+        self.total -= other.total
+        used = [index for index, bucket_count in enumerate(counts) if bucket_count]
+        if used:
+            self.min = max(self.min, self._bucket_bounds(used[0])[0])
+            self.max = min(self.max, self._bucket_bounds(used[-1])[1])
+        else:
+            self.min = self.max = 0
+
+    def copy(self) -> "LatencyHistogram":
+        """Return an independent copy of the histogram.
+
+        The count is taken from the copied buckets, so a copy made while
+        another thread records stays consistent.
+
+        Returns:
+            The copy
+        """
+        histogram = LatencyHistogram(self.sub_bucket_bits, self.max_value)
+        histogram.counts = self.counts[:]
+        histogram.count = sum(histogram.counts)
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def reset(self) -> None:
+        """Remove all recorded values."""
+        self.counts = array("Q")
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+
+class StatsSnapshot:
+    """Counters and histograms of a run or target at one point in time.
+
+    Attributes:
+        transmitted: Number of requests sent
+        received: Number of responses received
+        errors: Number of failed requests by error class
+        failures: Time histograms of failed requests and of 4xx and 5xx
+            responses by failure class, in ns
+        rtt: Histogram of round trip times in ns
+        lag: Histogram of send lags behind the schedule in ns
+        first_byte: Histogram of times to the first body byte in ns
+        cold: Round trip times of requests that opened a new connection
+        warm: Round trip times of requests over a reused connection
+        phases: Histograms of the request phase durations by phase
+        rate: Current rate of the adaptive controller, if any
+        rate_increases: Number of rate increases of the adaptive controller
+        rate_decreases: Number of rate decreases of the adaptive controller
+        targets: Per-target statistics of multi-target runs
+    """
+
+    __slots__ = (
+        "transmitted",
+        "received",
+        "errors",
+        "failures",
+        "rtt",
+        "lag",
+        "first_byte",
+        "cold",
+        "warm",
+        "phases",
+        "rate",
+        "rate_increases",
+        "rate_decreases",
+        "targets",
+    )
+
+    def __init__(self) -> None:
+        """Create empty statistics."""
+        self.transmitted = 0
+        self.received = 0
+        self.errors: Dict[str, int] = {}
+        self.failures: Dict[str, LatencyHistogram] = {}
+        self.rtt = LatencyHistogram()
+        self.lag = LatencyHistogram()
+        self.first_byte = LatencyHistogram()
+        self.cold = LatencyHistogram()
+        self.warm = LatencyHistogram()
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.rate: Optional[float] = None
+        self.rate_increases = 0
+        self.rate_decreases = 0
+        self.targets: Dict[str, "StatsSnapshot"] = {}
+
+    def record(self, result: ProbeResult) -> None:
+        """Record the outcome of one request.
+
+        Args:
+            result: The probe result
+        """
+        if result.lag_ns is not None:
+            self.lag.record(result.lag_ns)
+        if result.rate is not None:
+            if self.rate is not None and result.rate < self.rate:
+                self.rate_decreases += 1
+            else:
+                self.rate_increases += 1
+            self.rate = result.rate
+        failure = failure_class(result)
+        if failure is not None:
+            histogram = self.failures.get(failure)
+            if histogram is None:
+                histogram = self.failures[failure] = LatencyHistogram()
+            histogram.record(result.elapsed_ns)
+        if result.error is not None:
+            self.errors[result.error] = self.errors.get(result.error, 0) + 1
+            return
+        self.received += 1
+        self.rtt.record(result.elapsed_ns)
+        if result.first_byte_ns is not None:
+            self.first_byte.record(result.first_byte_ns)
+        if result.reused is not None:
+            (self.warm if result.reused else self.cold).record(result.elapsed_ns)
+        phases = self.phases
+        for phase, elapsed in result.phases.items():
+            histogram = phases.get(phase)
+            if histogram is None:
+                histogram = phases[phase] = LatencyHistogram()
+            histogram.record(elapsed)
+
+    def merge(self, other: "StatsSnapshot") -> None:
+        """Add the counters and histograms of other statistics to these.
+
+        Per-target statistics are not merged.
+
+        Args:
+            other: Statistics to add
+        """
+        self.transmitted += other.transmitted
+        self.received += other.received
+        for error_class, errors in other.errors.items():
+            self.errors[error_class] = self.errors.get(error_class, 0) + errors
+        for failure, histogram in other.failures.items():
+            if failure not in self.failures:
+                self.failures[failure] = LatencyHistogram()
+            self.failures[failure].merge(histogram)
+        self.rtt.merge(other.rtt)
+        self.lag.merge(other.lag)
+        self.first_byte.merge(other.first_byte)
+        self.cold.merge(other.cold)
+        self.warm.merge(other.warm)
+        for phase, histogram in other.phases.items():
+            if phase not in self.phases:
+                self.phases[phase] = LatencyHistogram()
+            self.phases[phase].merge(histogram)
+        # Rates of targets or workers that are probed side by side add up
+        if other.rate is not None:
+            self.rate = (self.rate or 0.0) + other.rate
+        self.rate_increases += other.rate_increases
+        self.rate_decreases += other.rate_decreases
+
+    def copy(self) -> "StatsSnapshot":
+        """Return an independent copy, including the per-target statistics.
+
+        Dictionaries are copied in one step before they are walked, so a
+        copy can be taken while another thread adds to them.
+
+        Returns:
+            The copy
+        """
+        copy = StatsSnapshot()
+        copy.transmitted = self.transmitted
+        copy.received = self.received
+        copy.errors = dict(self.errors)
+        copy.failures = {
+            failure: histogram.copy()
+            for failure, histogram in list(self.failures.items())
+        }
+        copy.rtt = self.rtt.copy()
+        copy.lag = self.lag.copy()
+        copy.first_byte = self.first_byte.copy()
+        copy.cold = self.cold.copy()
+        copy.warm = self.warm.copy()
+        copy.phases = {
+            phase: histogram.copy() for phase, histogram in list(self.phases.items())
+        }
+        copy.rate = self.rate
+        copy.rate_increases = self.rate_increases
+        copy.rate_decreases = self.rate_decreases
+        copy.targets = {
+            name: target.copy() for name, target in list(self.targets.items())
+        }
+        return copy
+
+    def total(self) -> "StatsSnapshot":
+        """Return the statistics of a run including all of its targets.
+
+        Returns:
+            The statistics itself for single-target runs, else new
+            statistics with the targets merged
+        """
+        if not self.targets:
+            return self
+        total = StatsSnapshot()
+        total.merge(self)
+        for target in self.targets.values():
+            total.merge(target)
+        return total
+
+
+def failure_class(result: ProbeResult) -> Optional[str]:
+    """Return the failure class of a result, if it failed.
+
+    Requests without a valid response fail with their error class.
+    Responses with a 4xx or 5xx status fail as "http_4xx" or "http_5xx",
+    although they still count as received.
+
+    Args:
+        result: The probe result
+
+    Returns:
+        The failure class, or None for a successful request
+    """
+    if result.error is not None:
+        return result.error
+    if result.status is not None and result.status >= 400:
+        return "http_5xx" if result.status >= 500 else "http_4xx"
+    return None
+
+
+# Times a reader copies a shard before it settles for a copy that may hold
+# a half-recorded result
+_READ_ATTEMPTS = 100
+
+
+class _Shard(StatsSnapshot):
+    """Statistics that only a single writer records into.
+
+    The writer makes the version odd while it records and even again when
+    it is done, so a reader can tell whether its copy holds a half-recorded
+    result. A reset only marks the shard; the writer clears it on its next
+    write, and readers take a marked shard as empty meanwhile.
+    """
+
+    __slots__ = ("version", "reset_pending")
+
+    def __init__(self) -> None:
+        """Create an empty shard."""
+        super().__init__()
+        self.version = 0
+        self.reset_pending = False
+
+    def begin(self) -> None:
+        """Start a write, clearing the shard first if it was reset."""
+        self.version += 1
+        if self.reset_pending:
+            self.reset_pending = False
+            self._clear()
+
+    def end(self) -> None:
+        """Finish a write."""
+        self.version += 1
+
+    def _clear(self) -> None:
+        """Clear all counters and histograms but the rate."""
+        rate = self.rate
+        StatsSnapshot.__init__(self)
+        # The adaptive rate is a setting in use, not a counter
+        self.rate = rate
+
+    def _copy(self) -> StatsSnapshot:
+        """Return a copy of the shard, taking a pending reset into account."""
+        if not self.reset_pending:
+            return self.copy()
+        copy = StatsSnapshot()
+        copy.rate = self.rate
+        return copy
+
+    def read(self) -> StatsSnapshot:
+        """Return a copy of the shard without any half-recorded result.
+
+        The copy is taken again while the writer is busy. A signal handler
+        that interrupted the writer in the same thread cannot wait for it,
+        so after a number of attempts the last copy is returned as it is.
+
+        Returns:
+            The copy
+        """
+        for _ in range(_READ_ATTEMPTS):
+            version = self.version
+            if not version & 1:
+                copy = self._copy()
+                if self.version == version:
+                    return copy
+            # Let the writer finish in its thread
+            time.sleep(0)
+        return self._copy()
+
+
+class Stats:
+    """Statistics of a run or target that are being recorded.
+
+    Every writer records into a shard of its own: each thread into the one
+    of its thread id, and the parent of worker processes loads the
+    snapshots of every worker into one keyed by the worker. Recording takes
+    no lock, so concurrent probes never wait for each other or for readers.
+    Readers merge the shards into a :class:`StatsSnapshot`.
+
+    Attributes:
+        targets: Per-target statistics of multi-target runs
+    """
+
+    __slots__ = ("targets", "_shards")
+
+    def __init__(self) -> None:
+        """Create empty statistics."""
+        self.targets: Dict[str, Stats] = {}
+        self._shards: Dict[Hashable, _Shard] = {}
+
+    def _shard(self, key: Optional[Hashable] = None) -> _Shard:
+        """Return the shard of a writer, by default of the current thread."""
+        if key is None:
+            key = threading.get_ident()
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = self._shards.setdefault(key, _Shard())
+        return shard
+
+    def record(self, result: ProbeResult) -> None:
+        """Record the outcome of one request.
+
+        Args:
+            result: The probe result
+        """
+        shard = self._shard()
+        shard.begin()
+        try:
+            shard.record(result)
+        finally:
+            shard.end()
+
+    def record_transmitted(self, count: int = 1) -> None:
+        """Count requests as sent.
+
+        Args:
+            count: Number of requests
+        """
+        shard = self._shard()
+        shard.begin()
+        shard.transmitted += count
+        shard.end()
+
+    def set_rate(self, rate: float) -> None:
+        """Set the current rate of the adaptive controller.
+
+        Args:
+            rate: Rate in requests per second
+        """
+        shard = self._shard()
+        shard.begin()
+        shard.rate = rate
+        shard.end()
+
+    def target(self, name: str) -> "Stats":
+        """Return the statistics of a target, adding them if needed.
+
+        Args:
+            name: Name of the target, such as its URL
+
+        Returns:
+            The target statistics
+        """
+        target = self.targets.get(name)
+        if target is None:
+            target = self.targets.setdefault(name, Stats())
+        return target
+
+    def load(self, key: Hashable, snapshot: StatsSnapshot) -> None:
+        """Replace the shard of a writer with its latest snapshot.
+
+        Used for writers that record elsewhere, such as worker processes.
+        The snapshot is taken over, including its per-target statistics.
+
+        Args:
+            key: Key of the writer
+            snapshot: Complete statistics of the writer so far
+        """
+        shard = self._shard(key)
+        shard.begin()
+        try:
+            for name in StatsSnapshot.__slots__:
+                if name != "targets":
+                    setattr(shard, name, getattr(snapshot, name))
+        finally:
+            shard.end()
+        for name, target in snapshot.targets.items():
+            self.target(name).load(key, target)
+
+    def snapshot(self) -> StatsSnapshot:
+        """Return a consistent copy of the statistics so far.
+
+        Every shard is copied without half-recorded results, so counters
+        and histograms always agree with each other.
+
+        Returns:
+            The shards merged into new statistics, including the targets
+        """
+        snapshot = StatsSnapshot()
+        for shard in list(self._shards.values()):
+            snapshot.merge(shard.read())
+        for name, target in list(self.targets.items()):
+            snapshot.targets[name] = target.snapshot()
+        return snapshot
+
+    def reset(self) -> None:
+        """Clear all counters and histograms, keeping targets and rates.
+
+        Probes keep recording into the same statistics; what they record
+        from their next result on counts towards the new statistics.
+        """
+        for shard in list(self._shards.values()):
+            shard.reset_pending = True
+        for target in list(self.targets.values()):
+            target.reset()
+
+
+def reset_stats(stats: Stats) -> None:
+    """Clear the statistics of a running probe and call the reset hooks.
+
+    Args:
+        stats: Statistics to clear
+    """
+    with reset_lock:
+        for hook in list(reset_hooks):
+            hook()
+        stats.reset()
+
+
+def _packet_loss(stats: StatsSnapshot) -> float:
+    """Return the percentage of requests without a response."""
+    transmitted = stats.transmitted
+    # Requests in flight during a reset may be received but not transmitted
+    received = min(stats.received, transmitted)
+    return ((transmitted - received) / transmitted) * 100 if transmitted > 0 else 0
+
 
 # Summary statistics
-stats: Dict[str, Any] = {"transmitted": 0, "received": 0, "rtt_times": []}
+stats = Stats()
 
+# Called before the summary is printed, e.g. to flush buffered output
+summary_hooks: List[Callable[[], None]] = []
 
-def signal_handler(sig: Any, frame: Any) -> None:
-    """Handler for SIGINT (Ctrl+C) to display statistics."""
-    print("\n--- hping statistics ---")
-    transmitted = stats["transmitted"]
-    received = stats["received"]
-    packet_loss = (
-        ((transmitted - received) / transmitted) * 100 if transmitted > 0 else 0
+# Add lines to the end of the summary, e.g. a protocol comparison
+summary_sections: List[Callable[[StatsSnapshot], Optional[str]]] = []
+
+# Called when the statistics are reset, before they are cleared
+reset_hooks: List[Callable[[], None]] = []
+
+# Held while the statistics are reset, so readers that compare snapshots
+# over time can take theirs either before or after a reset, never during
+reset_lock = threading.Lock()
+
+# Requests of the dump and reset signals, served by a background thread
+_signal_requests: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+_signal_thread: Optional[threading.Thread] = None
+
+# Text stream for the summary and dumps, set by setup_signal_handler
+_info_stream: Optional[IO[str]] = None
+
+
+def format_latency(histogram: LatencyHistogram, name: str = "rtt") -> Optional[str]:
+    """Format min/avg/max and percentile lines for a histogram.
+
+    Args:
+        histogram: Histogram of values in nanoseconds
+        name: Label for the lines
+
+    Returns:
+        The formatted lines, or None if nothing was recorded
+    """
+    if histogram.count == 0:
+        return None
+    min_ms = histogram.min / NS_PER_MS
+    avg_ms = histogram.mean / NS_PER_MS
+    max_ms = histogram.max / NS_PER_MS
+    labels = "/".join(f"p{p:g}" for p in SUMMARY_PERCENTILES)
+    values = "/".join(
+        f"{histogram.percentile(p) / NS_PER_MS:.3f}" for p in SUMMARY_PERCENTILES
     )
+    return (
+        f"{name} min/avg/max = {min_ms:.3f}/{avg_ms:.3f}/{max_ms:.3f} ms\n"
+        f"{name} {labels} = {values} ms"
+    )
+
+
+def format_phase_summary(phases: Dict[str, LatencyHistogram]) -> Optional[str]:
+    """Format the average and p99 duration of each request phase.
+
+    Args:
+        phases: Histograms of phase durations in nanoseconds
+
+    Returns:
+        The formatted line, or None if no phases were recorded
+    """
+    parts = [
+        f"{phase}={phases[phase].mean / NS_PER_MS:.3f}/"
+        f"{phases[phase].percentile(99) / NS_PER_MS:.3f}"
+        for phase in PHASES
+        if phase in phases and phases[phase].count
+    ]
+    if not parts:
+        return None
+    return f"phases avg/p99 {' '.join(parts)} ms"
+
+
+def format_connections(cold: LatencyHistogram, warm: LatencyHistogram) -> Optional[str]:
+    """Format connection reuse and the cold and warm round trip times.
+
+    Args:
+        cold: Round trip times of requests that opened a new connection
+        warm: Round trip times of requests over a reused connection
+
+    Returns:
+        The formatted lines, or None if no connection use was recorded
+    """
+    total = cold.count + warm.count
+    if not total:
+        return None
+    lines = [
+        f"connections {cold.count} new, {warm.count} reused "
+        f"({warm.count / total * 100:.1f}% reuse)"
+    ]
+    parts = [
+        f"{name} = {histogram.mean / NS_PER_MS:.3f}/"
+        f"{histogram.percentile(99) / NS_PER_MS:.3f}"
+        for name, histogram in (("cold", cold), ("warm", warm))
+        if histogram.count
+    ]
+    lines.append(f"rtt avg/p99 {' '.join(parts)} ms")
+    return "\n".join(lines)
+
 
-    print(
-        f"{transmitted} packets transmitted, {received} received, "
-        f"{packet_loss:.0f}% packet loss"
+def format_failures(
+    failures: Dict[str, LatencyHistogram], transmitted: int
+) -> Optional[str]:
+    """Format the count and time of each failure class, most frequent first.
+
+    Args:
+        failures: Times of failed requests in nanoseconds by failure class
+        transmitted: Number of requests sent
+
+    Returns:
+        One line per failure class, or None if nothing failed
+    """
+    lines = []
+    for failure, histogram in sorted(
+        failures.items(), key=lambda item: (-item[1].count, item[0])
+    ):
+        if not histogram.count:
+            continue
+        share = histogram.count / transmitted * 100 if transmitted else 0.0
+        lines.append(
+            f"{failure}: {histogram.count} failed ({share:.1f}%), time avg/p99 = "
+            f"{histogram.mean / NS_PER_MS:.3f}/"
+            f"{histogram.percentile(99) / NS_PER_MS:.3f} ms"
+        )
+    return "\n".join(lines) if lines else None
+
+
+def format_target(url: str, stats: StatsSnapshot) -> str:
+    """Format the one-line summary of a single target.
+
+    Args:
+        url: The target URL
+        stats: Statistics of the target
+
+    Returns:
+        The formatted line
+    """
+    line = (
+        f"{url}: {stats.transmitted} transmitted, {stats.received} received, "
+        f"{_packet_loss(stats):.0f}% loss"
+    )
+    rtt = stats.rtt
+    if rtt.count:
+        line += (
+            f", rtt min/avg/max/p99 = {rtt.min / NS_PER_MS:.3f}/"
+            f"{rtt.mean / NS_PER_MS:.3f}/{rtt.max / NS_PER_MS:.3f}/"
+            f"{rtt.percentile(99) / NS_PER_MS:.3f} ms"
+        )
+    return line
+
+
+def format_comparison(stats: StatsSnapshot) -> Optional[str]:
+    """Format the round trip times of all targets side by side.
+
+    Args:
+        stats: Statistics of the run
+
+    Returns:
+        A table with one row per target, or None without targets
+    """
+    targets = stats.targets
+    if not targets:
+        return None
+    width = max(len(name) for name in list(targets) + ["target"])
+    columns = ["min", "avg"] + [f"p{p:g}" for p in SUMMARY_PERCENTILES] + ["max"]
+    lines = [
+        f"{'target':<{width}} {'sent':>8} {'recv':>8} {'loss':>5} "
+        + " ".join(f"{column:>9}" for column in columns)
+        + " (ms)"
+    ]
+    for name, target in targets.items():
+        rtt = target.rtt
+        values = [rtt.min, rtt.mean]
+        values += [rtt.percentile(p) for p in SUMMARY_PERCENTILES]
+        values.append(rtt.max)
+        cells = (
+            " ".join(f"{value / NS_PER_MS:>9.3f}" for value in values)
+            if rtt.count
+            else " ".join(f"{'-':>9}" for _ in values)
+        )
+        lines.append(
+            f"{name:<{width}} {target.transmitted:>8} {target.received:>8} "
+            f"{_packet_loss(target):>4.0f}% {cells}"
+        )
+    return "\n".join(lines)
+
+
+def format_summary(stats: StatsSnapshot) -> str:
+    """Format the summary of a run.
+
+    Args:
+        stats: Statistics of the run
+
+    Returns:
+        The summary lines
+    """
+    lines = ["", "--- hping statistics ---"]
+    for url, target in stats.targets.items():
+        lines.append(format_target(url, target))
+
+    total = stats.total()
+    lines.append(
+        f"{total.transmitted} packets transmitted, {total.received} received, "
+        f"{_packet_loss(total):.0f}% packet loss"
     )
+    failures = format_failures(total.failures, total.transmitted)
+    if failures:
+        lines.append(failures)
+
+    rtt = format_latency(total.rtt)
+    if rtt:
+        lines.append(rtt)
+
+    first_byte = format_latency(total.first_byte, "first byte")
+    if first_byte:
+        lines.append(first_byte)
+
+    connections = format_connections(total.cold, total.warm)
+    if connections:
+        lines.append(connections)
+
+    phases = format_phase_summary(total.phases)
+    if phases:
+        lines.append(phases)
 
-    if stats["rtt_times"]:
-        min_rtt = min(stats["rtt_times"])
-        avg_rtt = sum(stats["rtt_times"]) / len(stats["rtt_times"])
-        max_rtt = max(stats["rtt_times"])
-        print(f"rtt min/avg/max = {min_rtt:.3f}/{avg_rtt:.3f}/{max_rtt:.3f} ms")
+    lag = total.lag
+    if lag.count:
+        lines.append(
+            f"send lag avg/max = {lag.mean / NS_PER_MS:.3f}/"
+            f"{lag.max / NS_PER_MS:.3f} ms"
+        )
+
+    if total.rate is not None:
+        lines.append(
+            f"adaptive rate {total.rate:.2f} req/s, "
+            f"{total.rate_increases} increases, "
+            f"{total.rate_decreases} decreases"
+        )
+
+    for section in summary_sections:
+        text = section(stats)
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def signal_handler(sig: Any, frame: Any) -> None:
+    """Handler for SIGINT (Ctrl+C) to display statistics.
+
+    The summary goes to the same stream as the dumps, so it never mixes
+    with JSON or CSV results on stdout.
+    """
+    for hook in list(summary_hooks):
+        hook()
+
+    output = _info_stream if _info_stream is not None else sys.stdout
+    output.write(format_summary(stats.snapshot()) + "\n")
+    output.flush()
 
     sys.exit(0)
 
 
-def setup_signal_handler() -> None:
-    """Setup signal handler for graceful shutdown."""
+def dump_handler(sig: Any, frame: Any) -> None:
+    """Handler for SIGQUIT (Ctrl+\\) and SIGUSR1 to display statistics.
+
+    The summary is printed by a background thread once no result is being
+    recorded, and probing continues.
+    """
+    _signal_requests.put("dump")
+
+
+def reset_handler(sig: Any, frame: Any) -> None:
+    """Handler for SIGUSR2 to reset the statistics without stopping."""
+    _signal_requests.put("reset")
+
+
+def serve_signal_request(request: str, stream: Optional[IO[str]] = None) -> None:
+    """Print or reset the statistics as asked for by a signal.
+
+    Args:
+        request: "dump" or "reset"
+        stream: Text stream to print to (default is stdout)
+    """
+    output = stream if stream is not None else sys.stdout
+    if request == "dump":
+        output.write(format_summary(stats.snapshot()) + "\n")
+    else:
+        reset_stats(stats)
+        output.write("--- hping statistics reset ---\n")
+    output.flush()
+
+
+def _serve_signal_requests() -> None:
+    """Serve the requests of the dump and reset signals until exit."""
+    while True:
+        serve_signal_request(_signal_requests.get(), _info_stream)
+
+
+def setup_signal_handler(stream: Optional[IO[str]] = None) -> None:
+    """Setup signal handlers for the summary, dumps and resets.
+
+    SIGINT prints the summary and exits. SIGQUIT and SIGUSR1 print the
+    summary so far and SIGUSR2 resets the statistics, both without stopping
+    the run (on platforms that have these signals).
+
+    Args:
+        stream: Text stream for the summary and dumps (default is stdout)
+    """
+    global _info_stream, _signal_thread
+    _info_stream = stream
     signal.signal(signal.SIGINT, signal_handler)
+    for name, handler in (
+        ("SIGQUIT", dump_handler),
+        ("SIGUSR1", dump_handler),
+        ("SIGUSR2", reset_handler),
+    ):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
+    if _signal_thread is None:
+        _signal_thread = threading.Thread(target=_serve_signal_requests, daemon=True)
+        _signal_thread.start()
@@ -0,0 +1,257 @@
+# hping/workers.py
+
+import asyncio
+import math
+import multiprocessing
+import signal
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from .async_client import async_hping, async_hping_multi
+from .body import validate_hash_algorithm
+from .client import prepare_request
+from .clock import default_clock
+from .output import create_output
+from .stats import Stats, reset_hooks
+
+# Seconds between statistics snapshots sent by each worker
+SNAPSHOT_INTERVAL = 1.0
+
+
+def shard_count(count: Optional[int], workers: int, index: int) -> Optional[int]:
+    """Return the number of requests one worker sends.
+
+    Args:
+        count: Optional limit on the total number of requests
+        workers: Number of workers
+        index: Index of the worker
+
+    Returns:
+        The worker's share of ``count``, or None without a limit
+    """
+    if count is None:
+        return None
+    return count // workers + (1 if index < count % workers else 0)
+
+
+async def _run_worker(
+    urls: List[str],
+    stop: Any,
+    generation: Any,
+    conn: Connection,
+    stats: Stats,
+    options: Dict[str, Any],
+) -> None:
+    """Probe until done or stopped, sending statistics snapshots meanwhile.
+
+    Snapshots are tagged with the reset generation they belong to; the
+    statistics are cleared whenever the parent starts a new one.
+    """
+    all_addresses = options.pop("all_addresses", False)
+    if len(urls) > 1 or all_addresses:
+        run = asyncio.create_task(
+            async_hping_multi(urls, stats=stats, all_addresses=all_addresses, **options)
+        )
+    else:
+        run = asyncio.create_task(async_hping(urls[0], stats=stats, **options))
+
+    loop = asyncio.get_running_loop()
+    next_snapshot = loop.time() + SNAPSHOT_INTERVAL
+    current = generation.value
+    while not run.done():
+        await asyncio.wait({run}, timeout=0.05)
+        if stop.is_set():
+            run.cancel()
+            break
+        if generation.value != current:
+            current = generation.value
+            stats.reset()
+        if loop.time() >= next_snapshot:
+            conn.send(("snapshot", (current, stats.snapshot())))
+            next_snapshot += SNAPSHOT_INTERVAL
+    try:
+        await run
+    except asyncio.CancelledError:
+        pass
+    if generation.value != current:
+        stats.reset()
+
+
+def _worker(
+    index: int,
+    urls: List[str],
+    start_delay: float,
+    stop: Any,
+    generation: Any,
+    conn: Connection,
+    options: Dict[str, Any],
+) -> None:
+    """Entry point of a worker process."""
+    # Ctrl+C and Ctrl+\ reach the whole process group; the parent stops,
+    # dumps and resets the statistics for the workers
+    for name in ("SIGINT", "SIGQUIT", "SIGUSR1", "SIGUSR2"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_IGN)
+    stats = Stats()
+    try:
+        output = create_output(
+            options.pop("output_format"),
+            options["http2"],
+            options.pop("timing"),
+            len(urls) > 1,
+            clock=options["clock"],
+            header=index == 0,
+            results_log=options.pop("results_log", None),
+        )
+        if not stop.wait(start_delay):
+            asyncio.run(
+                _run_worker(
+                    urls, stop, generation, conn, stats, dict(options, output=output)
+                )
+            )
+        conn.send(("done", (generation.value, stats.snapshot())))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_workers(
+    urls: List[str],
+    interval: float,
+    count: Optional[int] = None,
+    workers: int = 2,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    stats: Optional[Stats] = None,
+    **kwargs: Any,
+) -> None:
+    """Shard the probe schedule over a pool of worker processes.
+
+    Every worker has its own event loop and client and runs every
+    ``workers``-th request of the schedule: at ``rate / workers`` or every
+    ``interval * workers`` seconds, started with an offset so together they
+    keep the requested pace. Adaptive runs give every worker its own
+    controller with the same share of the rates. Sequence numbers stay
+    unique across workers.
+
+    Workers send statistics snapshots every second, which replace their
+    shard of ``stats`` so exported metrics stay current, and their final
+    statistics when they are done. On Ctrl+C the workers are stopped, their final
+    statistics are merged and SIGINT is raised again so the summary shows
+    the complete run. Resetting the statistics (SIGUSR2) also resets the
+    workers; snapshots taken before the reset are dropped.
+
+    Args:
+        urls: The target URLs to ping
+        interval: Time in seconds between request starts per target
+        count: Optional limit on the total number of requests per target
+        workers: Number of worker processes
+        concurrency: Maximum number of requests in flight per target,
+            shared out between the workers
+        rate: Optional total request rate per target in requests per second
+        stats: Statistics to update with the statistics of the workers
+        **kwargs: Further options of :func:`hping.async_client.async_hping`
+
+    Raises:
+        ValueError: If an option is invalid
+        RuntimeError: If a worker fails
+    """
+    # Fail early on invalid options instead of once per worker
+    if workers < 1:
+        raise ValueError("Workers must be at least 1")
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    if rate is not None and rate <= 0:
+        raise ValueError("Rate must be greater than 0")
+    validate_hash_algorithm(kwargs.get("hash_algorithm"))
+    prepare_request(
+        kwargs.get("method", "GET"), kwargs.get("headers"), kwargs.get("data")
+    )
+    if stats is None:
+        stats = Stats()
+
+    urls = list(dict.fromkeys(urls))
+    period = 1 / rate if rate is not None else interval
+    min_rate = kwargs.pop("min_rate", None)
+    # Spawned rather than forked, as the parent may run threads (metrics)
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    generation = context.Value("i", 0)
+    interrupted = False
+
+    def _interrupt(sig: Any, frame: Any) -> None:
+        nonlocal interrupted
+        interrupted = True
+        stop.set()
+
+    processes: List[Any] = []
+    connections: Dict[Connection, int] = {}
+    errors: List[Tuple[int, str]] = []
+
+    def _reset_workers() -> None:
+        # Snapshots are only loaded with the generation lock held, so none
+        # taken before the reset is loaded after it
+        with generation.get_lock():
+            generation.value += 1
+
+    previous_handler = signal.signal(signal.SIGINT, _interrupt)
+    reset_hooks.append(_reset_workers)
+    try:
+        for index in range(workers):
+            options = dict(
+                kwargs,
+                interval=interval * workers,
+                count=shard_count(count, workers, index),
+                concurrency=math.ceil(concurrency / workers),
+                rate=rate / workers if rate is not None else None,
+                min_rate=min_rate / workers if min_rate is not None else None,
+                seq_start=index + 1,
+                seq_step=workers,
+            )
+            options.setdefault("http2", False)
+            options.setdefault("timing", False)
+            options.setdefault("output_format", "text")
+            options.setdefault("clock", default_clock)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_worker,
+                args=(index, urls, period * index, stop, generation, sender, options),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            processes.append(process)
+            connections[receiver] = index
+
+        while connections:
+            for ready in wait(list(connections)):
+                conn = cast(Connection, ready)
+                index = connections[conn]
+                try:
+                    kind, payload = conn.recv()
+                except EOFError:
+                    kind, payload = "done", None
+                if kind == "error":
+                    errors.append((index, payload))
+                    stop.set()
+                elif payload is not None:
+                    snapshot_generation, snapshot = payload
+                    with generation.get_lock():
+                        if snapshot_generation == generation.value:
+                            stats.load(("worker", index), snapshot)
+                if kind != "snapshot":
+                    del connections[conn]
+                    conn.close()
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+        reset_hooks.remove(_reset_workers)
+        signal.signal(signal.SIGINT, previous_handler)
+
+    if errors:
+        index, message = errors[0]
+        raise RuntimeError(f"Worker {index} failed: {message}")
+    if interrupted:
+        signal.raise_signal(signal.SIGINT)
@@ -0,0 +1,21 @@
+class FakeClock:
+    """Deterministic nanosecond clock for timing tests.
+
+    Every call returns the current time and then moves it forward by
+    ``step`` nanoseconds; ``advance`` moves it explicitly.
+    """
+
+    def __init__(self, start=0, step=0):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def advance(self, ns):
+        self.now += ns
+
+    def set_ms(self, ms):
+        self.now = round(ms * 1_000_000)
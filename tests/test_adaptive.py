@@ -0,0 +1,109 @@
+import unittest
+
+from hping.adaptive import SPIKE_FACTOR, AdaptiveRate
+from hping.clock import NS_PER_MS, NS_PER_SECOND
+from hping.output import ProbeResult
+from tests.clock import FakeClock
+
+
+def _ok(elapsed_ms=10.0, status=200):
+    return ProbeResult(
+        seq=1, url="", elapsed_ns=round(elapsed_ms * NS_PER_MS), status=status
+    )
+
+
+def _error():
+    return ProbeResult(seq=1, url="", elapsed_ns=0, error="timeout")
+
+
+class TestAdaptiveRate(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = AdaptiveRate(100, 10, increase=20, clock=self.clock)
+
+    def test_ramps_up_once_per_healthy_window(self):
+        self.assertEqual(self.controller.rate, 10)
+        self.assertFalse(self.controller.observe(_ok()))
+
+        self.clock.advance(NS_PER_SECOND // 2)
+        self.assertFalse(self.controller.observe(_ok()))
+        self.clock.advance(NS_PER_SECOND // 2)
+        self.assertTrue(self.controller.observe(_ok()))
+        self.assertEqual(self.controller.rate, 30)
+        self.assertAlmostEqual(self.controller.period, 1 / 30)
+
+        for _ in range(10):
+            self.clock.advance(NS_PER_SECOND)
+            self.controller.observe(_ok())
+        self.assertEqual(self.controller.rate, 100)
+
+    def test_backs_off_once_per_window(self):
+        self.controller.rate = 80
+
+        self.assertTrue(self.controller.observe(_error()))
+        self.assertEqual(self.controller.rate, 40)
+        # Responses to requests sent at the old rate do not cut it again
+        self.assertFalse(self.controller.observe(_error()))
+        self.assertEqual(self.controller.rate, 40)
+
+        self.clock.advance(NS_PER_SECOND)
+        self.assertTrue(self.controller.observe(_ok(status=503)))
+        self.assertEqual(self.controller.rate, 20)
+        self.clock.advance(NS_PER_SECOND)
+        self.controller.observe(_ok(status=429))
+        self.clock.advance(NS_PER_SECOND)
+        self.controller.observe(_error())
+        self.assertEqual(self.controller.rate, 10)
+
+    def test_bad_response_restarts_healthy_window(self):
+        self.controller.observe(_ok())
+        self.clock.advance(NS_PER_SECOND // 2)
+        self.controller.observe(_error())
+        self.clock.advance(NS_PER_SECOND // 2)
+
+        self.assertFalse(self.controller.observe(_ok()))
+        self.clock.advance(NS_PER_SECOND // 2)
+        self.assertTrue(self.controller.observe(_ok()))
+
+    def test_latency_spike(self):
+        self.controller.rate = 80
+        for _ in range(10):
+            self.controller.observe(_ok(10.0))
+
+        self.assertFalse(self.controller.observe(_ok(10.0 * SPIKE_FACTOR - 1)))
+        self.assertTrue(self.controller.observe(_ok(10.0 * SPIKE_FACTOR * 2)))
+        self.assertEqual(self.controller.rate, 40)
+
+    def test_slow_threshold(self):
+        controller = AdaptiveRate(100, 10, slow_threshold=0.2, clock=self.clock)
+        controller.rate = 40
+
+        self.assertFalse(controller.observe(_ok(200.0)))
+        self.assertTrue(controller.observe(_ok(200.1)))
+        self.assertEqual(controller.rate, 20)
+
+    def test_never_below_min_rate(self):
+        self.assertFalse(self.controller.observe(_error()))
+        self.assertEqual(self.controller.rate, 10)
+
+    def test_defaults(self):
+        controller = AdaptiveRate(200)
+
+        self.assertEqual(controller.rate, 2)
+        self.assertEqual(controller.increase, 20)
+
+    def test_invalid_options(self):
+        for kwargs in (
+            dict(max_rate=0),
+            dict(max_rate=10, min_rate=20),
+            dict(max_rate=10, min_rate=0),
+            dict(max_rate=10, decrease=1),
+            dict(max_rate=10, slow_threshold=0),
+        ):
+            with self.subTest(**kwargs):
+                with self.assertRaises(ValueError):
+                    AdaptiveRate(**kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
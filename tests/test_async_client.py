@@ -0,0 +1,489 @@
+import asyncio
+import io
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from hping.async_client import (
+    async_hping,
+    async_hping_compare,
+    hping_compare,
+    hping_concurrent,
+    hping_multi,
+    hping_scenario,
+)
+from hping.expect import parse_expectations
+from hping.resolver import DnsCache
+from hping.scenario import Scenario, Step
+from hping.stats import NS_PER_MS, Stats
+from tests.clock import FakeClock
+
+
+def _mock_async_client(mock_client_class, send):
+    mock_client = MagicMock()
+    mock_client.build_request.side_effect = lambda method, url, **kwargs: (
+        httpx.Request(method, url, **kwargs)
+    )
+    mock_client.send = send
+    mock_client_class.return_value.__aenter__ = AsyncMock(return_value=mock_client)
+    mock_client_class.return_value.__aexit__ = AsyncMock(return_value=False)
+    return mock_client
+
+
+def _mock_response():
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.content = b'{"foo": "bar"}'
+    mock_response.http_version = "1.1"
+    mock_response.history = []
+    return mock_response
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        self.stats = Stats()
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_success(self, mock_client_class):
+        _mock_async_client(mock_client_class, AsyncMock(return_value=_mock_response()))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_concurrent(
+                "http://example.com", 0, 3, concurrency=2, stats=self.stats
+            )
+
+        output = mock_stdout.getvalue()
+        for seq in range(1, 4):
+            self.assertIn(f"http_seq={seq} ", output)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 3)
+        self.assertEqual(snapshot.received, 3)
+        self.assertEqual(snapshot.rtt.count, 3)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_limits_in_flight(self, mock_client_class):
+        in_flight = 0
+        peak = 0
+
+        async def slow_request(request, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, slow_request)
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping_concurrent(
+                "http://example.com", 0, 10, concurrency=3, stats=self.stats
+            )
+
+        self.assertEqual(peak, 3)
+        self.assertEqual(self.stats.snapshot().received, 10)
+        limits = mock_client_class.call_args[1]["limits"]
+        self.assertEqual(limits.max_connections, 3)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_failure(self, mock_client_class):
+        _mock_async_client(
+            mock_client_class,
+            AsyncMock(side_effect=httpx.TimeoutException("Request timeout")),
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_concurrent(
+                "http://example.com", 0, 2, concurrency=2, stats=self.stats
+            )
+
+        self.assertIn("Request timeout", mock_stdout.getvalue())
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 2)
+        self.assertEqual(snapshot.received, 0)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_rate_corrects_coordinated_omission(self, mock_client_class):
+        async def slow_request(request, **kwargs):
+            await asyncio.sleep(0.05)
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, slow_request)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_concurrent(
+                "http://example.com",
+                1.0,
+                4,
+                concurrency=1,
+                rate=100,
+                stats=self.stats,
+            )
+
+        self.assertIn("lag=", mock_stdout.getvalue())
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.received, 4)
+        self.assertEqual(snapshot.lag.count, 4)
+        # Requests queue behind the slow ones, and that wait counts as latency
+        self.assertGreater(snapshot.lag.max, 100 * NS_PER_MS)
+        self.assertGreater(snapshot.rtt.max, 150 * NS_PER_MS)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_rate_ignores_interval(self, mock_client_class):
+        _mock_async_client(mock_client_class, AsyncMock(return_value=_mock_response()))
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            with patch("hping.async_client.asyncio.sleep") as mock_sleep:
+                mock_sleep.side_effect = AsyncMock()
+                hping_concurrent(
+                    "http://example.com", 60.0, 3, rate=1000, stats=self.stats
+                )
+
+        for call in mock_sleep.call_args_list:
+            self.assertLess(call[0][0], 1.0)
+        self.assertEqual(self.stats.snapshot().transmitted, 3)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_hping_multi_per_target_stats(self, mock_client_class):
+        async def request(request, **kwargs):
+            if "down" in str(request.url):
+                raise httpx.ConnectError("Connection refused")
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, request)
+        urls = ["http://up.example", "http://down.example", "http://up.example"]
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_multi(urls, 0, 2, stats=self.stats)
+
+        output = mock_stdout.getvalue()
+        self.assertIn("Request failed from http://down.example: http_seq=2", output)
+        self.assertEqual(mock_client_class.call_count, 1)
+        targets = self.stats.snapshot().targets
+        self.assertEqual(list(targets), ["http://up.example", "http://down.example"])
+        self.assertEqual(targets["http://up.example"].transmitted, 2)
+        self.assertEqual(targets["http://up.example"].received, 2)
+        self.assertEqual(targets["http://down.example"].transmitted, 2)
+        self.assertEqual(targets["http://down.example"].received, 0)
+        self.assertEqual(self.stats.snapshot().transmitted, 0)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_hping_multi_all_addresses(self, mock_client_class):
+        async def request(request, **kwargs):
+            if request.url.host == "10.0.0.2":
+                raise httpx.ConnectError("Connection refused")
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, request)
+        resolver = DnsCache(overrides={("example.com", 80): ["10.0.0.1", "10.0.0.2"]})
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_multi(
+                ["http://example.com/"],
+                0,
+                2,
+                stats=self.stats,
+                resolver=resolver,
+                all_addresses=True,
+            )
+
+        output = mock_stdout.getvalue()
+        self.assertIn("Connection refused address=10.0.0.2", output)
+        targets = self.stats.snapshot().targets
+        self.assertEqual(
+            list(targets),
+            ["http://example.com/ (10.0.0.1)", "http://example.com/ (10.0.0.2)"],
+        )
+        self.assertEqual(targets["http://example.com/ (10.0.0.1)"].received, 2)
+        self.assertEqual(targets["http://example.com/ (10.0.0.2)"].received, 0)
+        sent = mock_client_class.return_value.__aenter__.return_value
+        hosts = {
+            call[1]["headers"]["Host"] for call in sent.build_request.call_args_list
+        }
+        self.assertEqual(hosts, {"example.com"})
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_resolves_before_timing(self, mock_client_class):
+        clock = FakeClock()
+
+        async def lookup(host, port):
+            clock.advance(50 * NS_PER_MS)
+            return ["10.0.0.1"]
+
+        async def request(request, **kwargs):
+            clock.advance(2 * NS_PER_MS)
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, request)
+        resolver = MagicMock(spec=DnsCache)
+        resolver.alookup.side_effect = lookup
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_concurrent(
+                "http://example.com",
+                0,
+                1,
+                stats=self.stats,
+                clock=clock,
+                resolver=resolver,
+            )
+
+        self.assertIn(
+            "time=2.00 ms conn=reused address=10.0.0.1", mock_stdout.getvalue()
+        )
+        resolver.alookup.assert_called_once_with("example.com", 80)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_expect_streamed(self, mock_client_class):
+        bodies = iter([b"status: ok", b"status: degraded"])
+
+        async def request(request, **kwargs):
+            return httpx.Response(
+                200, headers={"X-Cache": "HIT"}, content=next(bodies), request=request
+            )
+
+        _mock_async_client(mock_client_class, request)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_concurrent(
+                "http://example.com",
+                0,
+                2,
+                stats=self.stats,
+                stream=True,
+                expect=parse_expectations(
+                    headers=["X-Cache: HIT"], bodies=["status: ok$"]
+                ),
+            )
+
+        output = mock_stdout.getvalue()
+        self.assertIn("10 bytes from http://example.com http_seq=1", output)
+        self.assertIn("body does not match 'status: ok$'", output)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.received, 1)
+        self.assertEqual(snapshot.errors, {"assertion": 1})
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_hping_scenario_sequence(self, mock_client_class):
+        async def request(request, **kwargs):
+            response = _mock_response()
+            if request.url.path == "/search" and request.headers["X-Query"] == "bad":
+                response.status_code = 500
+            return response
+
+        mock_client = _mock_async_client(mock_client_class, request)
+        mock_client.cookies = httpx.Cookies()
+        scenario = Scenario(
+            "scenario.toml",
+            [
+                Step("login", "http://example.com/login", "POST", data="{}"),
+                Step("search", "http://example.com/search", headers=["X-Query: bad"]),
+                Step("logout", "http://example.com/logout"),
+            ],
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_scenario(scenario, 0, 2, stats=self.stats)
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].endswith(" step=login"))
+        self.assertIn("status=500", lines[1])
+        targets = self.stats.snapshot().targets
+        self.assertEqual(list(targets), ["login", "search", "logout"])
+        self.assertEqual(targets["login"].transmitted, 2)
+        self.assertEqual(targets["search"].received, 2)
+        # The failed search ends every iteration before the logout
+        self.assertEqual(targets["logout"].transmitted, 0)
+        self.assertEqual(self.stats.snapshot().transmitted, 0)
+        # Every step's request is built once
+        methods = [call[0][0] for call in mock_client.build_request.call_args_list]
+        self.assertEqual(methods, ["POST", "GET"])
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_hping_scenario_weighted(self, mock_client_class):
+        _mock_async_client(mock_client_class, AsyncMock(return_value=_mock_response()))
+        heavy = Step("heavy", "http://example.com/heavy", weight=3)
+        light = Step("light", "http://example.com/light")
+        scenario = Scenario("scenario.toml", [heavy, light], mode="weighted")
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping_scenario(scenario, 0, 8, stats=self.stats)
+
+        targets = self.stats.snapshot().targets
+        self.assertEqual(targets["heavy"].received, 6)
+        self.assertEqual(targets["light"].received, 2)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_hping_compare_protocol_variants(self, mock_client_class):
+        _mock_async_client(mock_client_class, AsyncMock(return_value=_mock_response()))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping_compare("http://example.com", 0, 5, concurrency=2, stats=self.stats)
+
+        clients = [
+            (call[1]["http1"], call[1]["http2"], call[1]["limits"].max_connections)
+            for call in mock_client_class.call_args_list
+        ]
+        # http1 pool, one h2 client per stream, one multiplexed h2 connection
+        self.assertEqual(
+            clients,
+            [(True, False, 2), (False, True, 1), (False, True, 1), (False, True, 1)],
+        )
+        targets = self.stats.snapshot().targets
+        self.assertEqual(list(targets), ["http1", "h2", "h2-mux"])
+        for variant in targets.values():
+            self.assertEqual(variant.transmitted, 5)
+            self.assertEqual(variant.received, 5)
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertTrue(
+            any(
+                line.endswith("protocol=HTTP/1.1 conn=reused variant=h2-mux")
+                for line in lines
+            )
+        )
+        h2_seqs = sorted(
+            int(line.split("http_seq=")[1].split()[0])
+            for line in lines
+            if line.endswith("variant=h2")
+        )
+        self.assertEqual(h2_seqs, [1, 2, 3, 4, 5])
+
+    def test_hping_compare_unknown_variant(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                async_hping_compare(
+                    "http://example.com", 0, 1, variants=["h3"], stats=self.stats
+                )
+            )
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_rate_fake_clock(self, mock_client_class):
+        # 100 requests/s over one connection with 25 ms responses: every
+        # request waits behind the previous one and that wait is latency
+        clock = FakeClock()
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(delay):
+            target = clock.now + round(delay * 1e9)
+            await real_sleep(0)
+            clock.now = max(clock.now, target)
+
+        async def request(request, **kwargs):
+            await fake_sleep(0.025)
+            return _mock_response()
+
+        _mock_async_client(mock_client_class, request)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            with patch("hping.async_client.asyncio.sleep", side_effect=fake_sleep):
+                hping_concurrent(
+                    "http://example.com",
+                    1.0,
+                    3,
+                    concurrency=1,
+                    rate=100,
+                    stats=self.stats,
+                    clock=clock,
+                )
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertTrue(
+            lines[0].endswith(
+                "http_seq=1 status=200 time=25.00 ms conn=reused lag=0.00 ms"
+            )
+        )
+        self.assertTrue(
+            lines[1].endswith(
+                "http_seq=2 status=200 time=40.00 ms conn=reused lag=15.00 ms"
+            )
+        )
+        self.assertTrue(
+            lines[2].endswith(
+                "http_seq=3 status=200 time=55.00 ms conn=reused lag=30.00 ms"
+            )
+        )
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.rtt.max, 55_000_000)
+        self.assertEqual(snapshot.lag.max, 30_000_000)
+
+    @patch("hping.async_client.httpx.AsyncClient")
+    def test_async_hping_adaptive_rate(self, mock_client_class):
+        # A second of healthy responses at 10/s raises the rate to 20/s, then
+        # a 503 halves it again
+        clock = FakeClock()
+        real_sleep = asyncio.sleep
+        calls = 0
+
+        async def fake_sleep(delay):
+            target = clock.now + round(delay * 1e9)
+            await real_sleep(0)
+            clock.now = max(clock.now, target)
+
+        async def request(request, **kwargs):
+            nonlocal calls
+            calls += 1
+            response = _mock_response()
+            if calls == 25:
+                response.status_code = 503
+            return response
+
+        _mock_async_client(mock_client_class, request)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            with patch("hping.async_client.asyncio.sleep", side_effect=fake_sleep):
+                hping_concurrent(
+                    "http://example.com",
+                    1.0,
+                    30,
+                    rate=100,
+                    adaptive=True,
+                    min_rate=10,
+                    stats=self.stats,
+                    clock=clock,
+                )
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertTrue(lines[10].endswith("lag=0.00 ms rate=20.00/s"))
+        self.assertTrue(
+            lines[24].endswith(
+                "status=503 time=0.00 ms conn=reused lag=0.00 ms rate=10.00/s"
+            )
+        )
+        self.assertEqual(sum("rate=" in line for line in lines), 2)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.rate, 10)
+        self.assertEqual(snapshot.rate_increases, 1)
+        self.assertEqual(snapshot.rate_decreases, 1)
+
+    def test_invalid_adaptive_options(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                async_hping(
+                    "http://example.com",
+                    0,
+                    1,
+                    adaptive=True,
+                    min_rate=5,
+                    rate=1,
+                    stats=self.stats,
+                )
+            )
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                async_hping("http://example.com", 0, 1, rate=0, stats=self.stats)
+            )
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                async_hping("http://example.com", 0, 1, concurrency=0, stats=self.stats)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import sys
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from hping.bench import BenchResult, LocalServer, bench_main, format_result, run_bench
+from hping.main import main
+
+
+class TestLocalServer(unittest.TestCase):
+    def test_http1(self):
+        with LocalServer("http1", body_size=10) as server:
+            response = httpx.get(server.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.http_version, "HTTP/1.1")
+        self.assertEqual(response.content, b"x" * 10)
+
+    def test_h2(self):
+        with LocalServer("h2", body_size=100_000) as server:
+            with httpx.Client(http1=False, http2=True) as client:
+                response = client.get(server.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.http_version, "HTTP/2")
+        self.assertEqual(len(response.content), 100_000)
+
+    def test_unknown_protocol(self):
+        with self.assertRaises(ValueError):
+            LocalServer("h3")
+
+
+class TestRunBench(unittest.TestCase):
+    def test_sync(self):
+        result = run_bench("http1", count=20, concurrency=1, memory=False)
+        self.assertEqual(result.requests, 20)
+        self.assertEqual(result.received, 20)
+        self.assertGreater(result.rate, 0)
+        self.assertGreater(result.overhead_ns, 0)
+        self.assertIsNone(result.memory_per_million)
+
+    def test_async_with_memory(self):
+        result = run_bench("h2", count=20, concurrency=5)
+        self.assertEqual(result.received, 20)
+        self.assertIsNotNone(result.memory_per_million)
+
+    def test_format_result(self):
+        result = BenchResult(
+            protocol="h2",
+            requests=1000,
+            received=990,
+            elapsed_ns=500_000_000,
+            cpu_ns=250_000_000,
+            rtt_p50_ns=1_000_000,
+            rtt_p99_ns=4_500_000,
+            memory_per_probe=2.0,
+        )
+        self.assertEqual(
+            format_result(result),
+            "h2: 1000 requests in 0.50 s, 2000 req/s, client CPU 250.0 us/request, "
+            "rtt p50/p99 = 1.000/4.500 ms, 10 failed, memory 1.9 MiB per 1M probes",
+        )
+
+
+class TestBenchMain(unittest.TestCase):
+    @patch("hping.bench.run_bench")
+    def test_all_protocols(self, mock_run):
+        mock_run.return_value = BenchResult("http1", 10, 10, 1, 1, 0, 0)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            bench_main(["-c", "10", "--no-memory"])
+
+        self.assertEqual(
+            [call.args[0] for call in mock_run.call_args_list], ["http1", "h2"]
+        )
+        self.assertEqual(mock_run.call_args[1]["count"], 10)
+        self.assertFalse(mock_run.call_args[1]["memory"])
+        self.assertEqual(len(mock_stdout.getvalue().splitlines()), 2)
+
+    @patch("hping.main.setup_signal_handler")
+    @patch("hping.bench.bench_main")
+    def test_main_dispatches_subcommand(self, mock_bench, mock_setup):
+        with patch.object(sys, "argv", ["hping", "bench", "--protocol", "h2"]):
+            main()
+
+        mock_bench.assert_called_once_with(["--protocol", "h2"])
+        mock_setup.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import unittest
+
+import httpx
+
+from hping.body import BodyReader, validate_hash_algorithm
+from tests.clock import FakeClock
+
+
+class TestBodyReader(unittest.TestCase):
+    def test_feed_counts_and_hashes(self):
+        clock = FakeClock(start=100, step=10)
+        reader = BodyReader(clock, "sha256")
+        reader.feed(b"hello ")
+        reader.feed(b"world")
+
+        self.assertEqual(reader.size, 11)
+        self.assertEqual(reader.first_byte_at, 100)
+        self.assertEqual(
+            reader.digest, "sha256=" + hashlib.sha256(b"hello world").hexdigest()
+        )
+
+    def test_read_sync_stream(self):
+        response = httpx.Response(200, content=iter([b"a" * 1000, b"b" * 24]))
+        reader = BodyReader(FakeClock())
+        reader.read(response)
+
+        self.assertEqual(reader.size, 1024)
+
+    def test_read_async_stream(self):
+        async def chunks():
+            yield b"abc"
+            yield b"de"
+
+        response = httpx.Response(200, content=chunks())
+        reader = BodyReader(FakeClock(), "md5")
+        asyncio.run(reader.aread(response))
+
+        self.assertEqual(reader.size, 5)
+        self.assertEqual(reader.digest, "md5=" + hashlib.md5(b"abcde").hexdigest())
+
+    def test_empty_body(self):
+        reader = BodyReader(FakeClock())
+        self.assertIsNone(reader.first_byte_at)
+        self.assertIsNone(reader.digest)
+
+    def test_validate_hash_algorithm(self):
+        validate_hash_algorithm(None)
+        validate_hash_algorithm("sha256")
+        with self.assertRaises(ValueError):
+            validate_hash_algorithm("nope")
+
+
+if __name__ == "__main__":
+    unittest.main()
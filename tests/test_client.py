@@ -1,15 +1,30 @@
 import io
+import os
+import socket
+import ssl
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
 import httpx
 
-from hping.client import hping
+from hping.client import (
+    classify_error,
+    hping,
+    pool_limits,
+    request_template,
+    response_result,
+)
+from hping.expect import parse_expectations
+from hping.payload import FileData
+from hping.resolver import DnsCache
+from hping.stats import Stats
+from tests.clock import FakeClock
 
 
 class TestClient(unittest.TestCase):
     def setUp(self):
-        self.stats = {"transmitted": 0, "received": 0, "rtt_times": []}
+        self.stats = Stats()
 
     @patch("hping.client.httpx.Client")
     def test_hping_success(self, mock_client_class):
@@ -21,29 +36,31 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"foo": "bar"}'
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO):
             hping("http://example.com", 0.1, 1, stats=self.stats)
 
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 1)
-        self.assertEqual(len(self.stats["rtt_times"]), 1)
-        self.assertGreater(self.stats["rtt_times"][0], 0)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 1)
+        self.assertEqual(snapshot.rtt.count, 1)
+        self.assertGreater(snapshot.rtt.max, 0)
         mock_client.close.assert_called_once()
 
     @patch("hping.client.httpx.Client")
     def test_hping_failure(self, mock_client_class):
         mock_client = MagicMock()
         mock_client_class.return_value = mock_client
-        mock_client.request.side_effect = httpx.RequestError("Connection failed")
+        mock_client.send.side_effect = httpx.RequestError("Connection failed")
 
         with patch("sys.stdout", new_callable=io.StringIO):
             hping("http://example.com", 0.1, 1, stats=self.stats)
 
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 0)
-        self.assertEqual(len(self.stats["rtt_times"]), 0)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 0)
+        self.assertEqual(snapshot.rtt.count, 0)
         mock_client.close.assert_called_once()
 
     @patch("hping.client.httpx.Client")
@@ -56,16 +73,17 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO):
             hping("http://example.com", 0.1, 1, method="POST", stats=self.stats)
 
-        mock_client.request.assert_called_once()
-        call_args = mock_client.request.call_args
-        self.assertEqual(call_args[1]["method"], "POST")
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 1)
+        mock_client.send.assert_called_once()
+        call_args = mock_client.build_request.call_args
+        self.assertEqual(call_args[0][0], "POST")
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 1)
 
     @patch("hping.client.httpx.Client")
     def test_hping_custom_headers(self, mock_client_class):
@@ -77,7 +95,7 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO):
             hping(
@@ -91,8 +109,8 @@ class TestClient(unittest.TestCase):
                 stats=self.stats,
             )
 
-        mock_client.request.assert_called_once()
-        call_args = mock_client.request.call_args
+        mock_client.send.assert_called_once()
+        call_args = mock_client.build_request.call_args
         self.assertEqual(call_args[1]["headers"]["Authorization"], "Bearer token")
         self.assertEqual(call_args[1]["headers"]["Content-Type"], "application/json")
 
@@ -106,45 +124,69 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO):
             hping(
                 "http://example.com", 0.1, 1, data='{"key": "value"}', stats=self.stats
             )
 
-        mock_client.request.assert_called_once()
-        call_args = mock_client.request.call_args
+        mock_client.send.assert_called_once()
+        call_args = mock_client.build_request.call_args
         self.assertEqual(call_args[1]["content"], '{"key": "value"}')
         self.assertEqual(call_args[1]["headers"]["Content-Type"], "application/json")
 
+    @patch("hping.client.httpx.Client")
+    def test_hping_data_file(self, mock_client_class):
+        with tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False) as f:
+            f.write(b'{"items": [' + b"1, " * 1000 + b"1]}")
+        self.addCleanup(os.unlink, f.name)
+        data = FileData(f.name)
+        self.addCleanup(data.close)
+        mock_client = mock_client_class.return_value
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"", http_version="HTTP/1.1", history=[]
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping(
+                "http://example.com", 0, 1, method="POST", data=data, stats=self.stats
+            )
+
+        call_args = mock_client.build_request.call_args
+        self.assertIs(call_args[1]["content"], data)
+        self.assertEqual(call_args[1]["headers"]["Content-Type"], "application/json")
+        self.assertEqual(call_args[1]["headers"]["Content-Length"], str(len(data)))
+
     @patch("hping.client.httpx.Client")
     def test_hping_timeout(self, mock_client_class):
         mock_client = MagicMock()
         mock_client_class.return_value = mock_client
-        mock_client.request.side_effect = httpx.TimeoutException("Request timeout")
+        mock_client.send.side_effect = httpx.TimeoutException("Request timeout")
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping("http://example.com", 0.1, 1, timeout=5.0, stats=self.stats)
 
         output = mock_stdout.getvalue()
         self.assertIn("Request timeout", output)
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 0)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 0)
 
     @patch("hping.client.httpx.Client")
     def test_hping_too_many_redirects(self, mock_client_class):
         mock_client = MagicMock()
         mock_client_class.return_value = mock_client
-        mock_client.request.side_effect = httpx.TooManyRedirects("Too many redirects")
+        mock_client.send.side_effect = httpx.TooManyRedirects("Too many redirects")
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping("http://example.com", 0.1, 1, stats=self.stats)
 
         output = mock_stdout.getvalue()
         self.assertIn("Too many redirects", output)
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 0)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 0)
 
     @patch("hping.client.httpx.Client")
     def test_hping_head_method(self, mock_client_class):
@@ -156,15 +198,16 @@ class TestClient(unittest.TestCase):
         mock_response.content = b"Some content"
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping("http://example.com", 0.1, 1, method="HEAD", stats=self.stats)
 
         output = mock_stdout.getvalue()
         self.assertIn("0 bytes from", output)  # HEAD should show 0 bytes
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 1)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 1)
 
     @patch("hping.client.httpx.Client")
     def test_hping_http2(self, mock_client_class):
@@ -176,7 +219,7 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "2.0"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping("http://example.com", 0.1, 1, http2=True, stats=self.stats)
@@ -189,10 +232,199 @@ class TestClient(unittest.TestCase):
         call_args = mock_client_class.call_args
         self.assertTrue(call_args[1]["http2"])
 
-        mock_client.request.assert_called_once()
+        mock_client.send.assert_called_once()
         mock_client.close.assert_called_once()
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 1)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 1)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_new_connection_per_request(self, mock_client_class):
+        mock_client_class.return_value.send.side_effect = httpx.ConnectError("x")
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping(
+                "http://example.com",
+                0,
+                1,
+                max_connections=3,
+                keepalive_expiry=1.5,
+                new_connection_per_request=True,
+                stats=self.stats,
+            )
+
+        limits = mock_client_class.call_args[1]["limits"]
+        self.assertEqual(limits.max_connections, 3)
+        self.assertEqual(limits.max_keepalive_connections, 0)
+        self.assertEqual(limits.keepalive_expiry, 1.5)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_builds_request_once(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"ok", http_version="HTTP/1.1", history=[]
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping("http://example.com", 0, 3, stats=self.stats)
+
+        mock_client.build_request.assert_called_once()
+        self.assertEqual(mock_client.send.call_count, 3)
+        for call in mock_client.send.call_args_list:
+            self.assertIs(call[0][0], mock_client.build_request.return_value)
+
+    @patch("hping.client.time.sleep")
+    @patch("hping.client.httpx.Client")
+    def test_hping_no_sleep_after_last_request(self, mock_client_class, mock_sleep):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"ok", http_version="HTTP/1.1", history=[]
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping("http://example.com", 1, 3, stats=self.stats)
+
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("hping.client.time.sleep")
+    @patch("hping.client.httpx.Client")
+    def test_hping_flushes_batched_lines_before_sleeping(
+        self, mock_client_class, mock_sleep
+    ):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"ok", http_version="HTTP/1.1", history=[]
+        )
+        written = []
+
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            mock_sleep.side_effect = lambda interval: written.append(
+                stdout.getvalue().count("\n")
+            )
+            hping("http://example.com", 1, 3, stats=self.stats, output_format="json")
+
+        self.assertEqual(written, [1, 2])
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_rebuilds_request_with_cookies(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies({"session": "1"})
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"ok", http_version="HTTP/1.1", history=[]
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            hping("http://example.com", 0, 3, stats=self.stats)
+
+        self.assertEqual(mock_client.build_request.call_count, 3)
+
+    def test_request_template_pinned_address(self):
+        with httpx.Client() as client:
+            request = request_template(
+                client, "GET", "https://example.com:8443/x", {}, None, print, "::1"
+            )
+            custom_host = request_template(
+                client,
+                "GET",
+                "http://example.com/",
+                {"host": "other.example"},
+                None,
+                print,
+                "10.0.0.1",
+            )
+
+        self.assertEqual(str(request.url), "https://[::1]:8443/x")
+        self.assertEqual(request.headers["Host"], "example.com:8443")
+        self.assertEqual(request.extensions["sni_hostname"], "example.com")
+        self.assertEqual(str(custom_host.url), "http://10.0.0.1/")
+        self.assertEqual(custom_host.headers["Host"], "other.example")
+        self.assertNotIn("sni_hostname", custom_host.extensions)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_resolver(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        mock_client.send.return_value = MagicMock(
+            status_code=200, content=b"ok", http_version="HTTP/1.1", history=[]
+        )
+        resolver = MagicMock(spec=DnsCache)
+        resolver.lookup.side_effect = [
+            ["10.0.0.1", "10.0.0.2"],
+            ["10.0.0.1"],
+            httpx.ConnectError("Cannot resolve example.com: failure"),
+            ["10.0.0.3"],
+        ]
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping("http://example.com", 0, 4, stats=self.stats, resolver=resolver)
+
+        resolver.lookup.assert_called_with("example.com", 80)
+        # Rebuilt only when the address changes
+        self.assertEqual(mock_client.build_request.call_count, 2)
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].endswith(" address=10.0.0.1"))
+        self.assertIn("Cannot resolve example.com", lines[2])
+        self.assertTrue(lines[3].endswith(" address=10.0.0.3"))
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.received, 3)
+        self.assertEqual(snapshot.errors, {"request_error": 1})
+
+    def test_pool_limits_keep_every_connection_alive(self):
+        limits = pool_limits(50)
+        self.assertEqual(limits.max_connections, 50)
+        self.assertEqual(limits.max_keepalive_connections, 50)
+
+    def test_response_result_protocol(self):
+        response = MagicMock(status_code=200, http_version="HTTP/2", history=[])
+
+        result = response_result("http://example.com", 1, response, 0, 1)
+
+        self.assertEqual(result.protocol, "HTTP/2")
+
+    def test_classify_error(self):
+        def connect_error(*chain):
+            # httpx raises from httpcore, which raises from the OS error
+            error = httpx.ConnectError(str(chain[-1]))
+            cause = error
+            for link in chain:
+                cause.__cause__ = link
+                cause = link
+            return error
+
+        refused = ConnectionRefusedError(111, "Connect call failed")
+        for error, error_class in (
+            (httpx.ConnectTimeout("timed out"), "timeout"),
+            (httpx.TooManyRedirects("loop"), "too_many_redirects"),
+            (connect_error(socket.gaierror(-2, "Name unknown")), "dns"),
+            (
+                connect_error(OSError("All connection attempts failed"), refused),
+                "connect_refused",
+            ),
+            (connect_error(ssl.SSLCertVerificationError(1, "expired")), "tls"),
+            (connect_error(OSError("Network is unreachable")), "request_error"),
+            (httpx.ReadError("reset"), "request_error"),
+            (RuntimeError("bug"), "unexpected"),
+        ):
+            with self.subTest(error_class=error_class):
+                self.assertEqual(classify_error(error), error_class)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_dns_failure(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        error = httpx.ConnectError("[Errno -2] Name or service not known")
+        error.__cause__ = socket.gaierror(-2, "Name or service not known")
+        mock_client.send.side_effect = error
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping("http://nonexistent.invalid", 0, 1, stats=self.stats)
+
+        self.assertTrue(mock_stdout.getvalue().startswith("DNS lookup failed: "))
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.errors, {"dns": 1})
+        self.assertEqual(snapshot.failures["dns"].count, 1)
 
     @patch("hping.client.httpx.Client")
     def test_hping_redirects_info(self, mock_client_class):
@@ -204,15 +436,16 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "1.1"
         mock_response.history = [MagicMock(), MagicMock()]  # 2 redirects
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping("http://example.com", 0.1, 1, stats=self.stats)
 
         output = mock_stdout.getvalue()
         self.assertIn("redirects=2", output)
-        self.assertEqual(self.stats["transmitted"], 1)
-        self.assertEqual(self.stats["received"], 1)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.received, 1)
 
     def test_invalid_http_method(self):
         with self.assertRaises(ValueError) as context:
@@ -230,7 +463,7 @@ class TestClient(unittest.TestCase):
         mock_response.content = b'{"success": true}'
         mock_response.http_version = "1.1"
         mock_response.history = []
-        mock_client.request.return_value = mock_response
+        mock_client.send.return_value = mock_response
 
         with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             hping(
@@ -244,6 +477,163 @@ class TestClient(unittest.TestCase):
         output = mock_stdout.getvalue()
         self.assertIn("Invalid header format", output)
 
+    @patch("hping.client.httpx.Client")
+    def test_hping_timing(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b"ok"
+        mock_response.http_version = "1.1"
+        mock_response.history = []
+
+        def request(request, **kwargs):
+            trace = mock_client.build_request.call_args[1]["extensions"]["trace"]
+            trace("http11.send_request_body.complete", {})
+            trace("http11.receive_response_headers.complete", {})
+            return mock_response
+
+        mock_client.send.side_effect = request
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping("http://example.com", 0.1, 1, stats=self.stats, timing=True)
+
+        self.assertIn(" ttfb=", mock_stdout.getvalue())
+        self.assertEqual(self.stats.snapshot().phases["ttfb"].count, 1)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_fake_clock(self, mock_client_class):
+        clock = FakeClock(start=10**12)
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b"ok"
+        mock_response.http_version = "1.1"
+        mock_response.history = []
+
+        def request(request, **kwargs):
+            clock.advance(250_000)  # 0.25 ms, below wall-clock resolution
+            return mock_response
+
+        mock_client.send.side_effect = request
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping("http://example.com", 0, 2, stats=self.stats, clock=clock)
+
+        self.assertIn("http_seq=2 status=200 time=0.25 ms", mock_stdout.getvalue())
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.rtt.min, 250_000)
+        self.assertEqual(snapshot.rtt.max, 250_000)
+        self.assertIsInstance(snapshot.rtt.total, int)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_fake_clock_error(self, mock_client_class):
+        clock = FakeClock()
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        def request(request, **kwargs):
+            clock.advance(5_000_000_000)
+            raise httpx.ConnectTimeout("timed out")
+
+        mock_client.send.side_effect = request
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping("http://example.com", 0, 1, stats=self.stats, clock=clock)
+
+        self.assertIn(
+            "Request timeout: http_seq=1 time=5000.00 ms", mock_stdout.getvalue()
+        )
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_stream(self, mock_client_class):
+        clock = FakeClock(step=1_000_000)
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.http_version = "1.1"
+        mock_response.history = []
+        mock_response.iter_bytes.return_value = iter([b"x" * 4096, b"y" * 4096])
+        mock_client.send.return_value = mock_response
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping(
+                "http://example.com",
+                0,
+                1,
+                stats=self.stats,
+                clock=clock,
+                stream=True,
+                hash_algorithm="sha1",
+            )
+
+        output = mock_stdout.getvalue()
+        self.assertIn("8192 bytes from http://example.com", output)
+        self.assertIn("first_byte=1.00 ms sha1=", output)
+        self.assertTrue(mock_client.send.call_args[1]["stream"])
+        mock_response.close.assert_called_once()
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.first_byte.max, 1_000_000)
+        self.assertEqual(snapshot.received, 1)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_expect_streamed_body(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        bodies = iter([[b"<h1>Mainte", b"nance</h1>"], [b"<h1>Welcome</h1>"]])
+        mock_response = MagicMock(status_code=200, http_version="1.1", history=[])
+        mock_response.iter_bytes.side_effect = lambda: iter(next(bodies))
+        mock_client.send.return_value = mock_response
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping(
+                "http://example.com",
+                0,
+                2,
+                stats=self.stats,
+                stream=True,
+                expect=parse_expectations(bodies=["Welcome"]),
+            )
+
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Assertion failed: http_seq=1 time="))
+        self.assertTrue(lines[0].endswith(" ms - body does not match 'Welcome'"))
+        self.assertIn("16 bytes from http://example.com http_seq=2", lines[1])
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.errors, {"assertion": 1})
+        self.assertEqual(snapshot.received, 1)
+
+    @patch("hping.client.httpx.Client")
+    def test_hping_expect_status(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.cookies = httpx.Cookies()
+        mock_client.send.return_value = MagicMock(
+            status_code=503, content=b"down", http_version="1.1", history=[]
+        )
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            hping(
+                "http://example.com",
+                0,
+                1,
+                stats=self.stats,
+                expect=parse_expectations(statuses=["2xx"]),
+            )
+
+        self.assertIn("- status 503 is not 2xx", mock_stdout.getvalue())
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.errors, {"assertion": 1})
+        self.assertEqual(snapshot.rtt.count, 0)
+
+    def test_invalid_hash_algorithm(self):
+        with self.assertRaises(ValueError):
+            hping("http://example.com", 0, 1, stream=True, hash_algorithm="nope")
+
 
 if __name__ == "__main__":
     unittest.main()
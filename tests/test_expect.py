@@ -0,0 +1,137 @@
+import hashlib
+import unittest
+
+import httpx
+
+from hping.expect import MAX_MATCH_SIZE, BodyCheck, parse_expectations, parse_status
+
+
+def _response(status=200, headers=None, content=b""):
+    return httpx.Response(status, headers=headers, content=content)
+
+
+class TestParse(unittest.TestCase):
+    def test_parse_status(self):
+        self.assertEqual(
+            parse_status("200, 3xx,404-410"), [(200, 200), (300, 399), (404, 410)]
+        )
+
+    def test_invalid(self):
+        for options, message in (
+            ({"statuses": ["2x"]}, "Invalid --expect-status"),
+            ({"statuses": ["200-"]}, "Invalid --expect-status"),
+            ({"headers": [": x"]}, "Invalid --expect-header"),
+            ({"headers": ["X: ("]}, "Invalid --expect-header pattern"),
+            ({"bodies": ["[a"]}, "Invalid --expect-body pattern"),
+            ({"sha256": "abc"}, "Invalid --expect-sha256"),
+        ):
+            with self.subTest(options=options):
+                with self.assertRaises(ValueError) as raised:
+                    parse_expectations(**options)
+                self.assertIn(message, str(raised.exception))
+
+    def test_nothing_to_check(self):
+        self.assertIsNone(parse_expectations())
+
+
+class TestExpectations(unittest.TestCase):
+    def test_status(self):
+        expect = parse_expectations(statuses=["2xx", "304"])
+
+        self.assertIsNone(expect.failure(_response(204)))
+        self.assertIsNone(expect.failure(_response(304)))
+        self.assertEqual(expect.failure(_response(500)), "status 500 is not 2xx,304")
+        self.assertFalse(expect.needs_body)
+
+    def test_headers(self):
+        expect = parse_expectations(headers=["X-Cache", "content-type: ^text/"])
+        headers = {"X-Cache": "HIT", "Content-Type": "text/html; charset=utf-8"}
+
+        self.assertIsNone(expect.failure(_response(headers=headers)))
+        self.assertEqual(
+            expect.failure(_response(headers={"Content-Type": "text/html"})),
+            "header X-Cache is missing",
+        )
+        self.assertEqual(
+            expect.failure(_response(headers={**headers, "Content-Type": "a/b"})),
+            "header content-type 'a/b' does not match '^text/'",
+        )
+
+    def test_buffered_body(self):
+        content = b'{"status": "ok"}'
+        expect = parse_expectations(
+            bodies=['"status": "ok"'], sha256=hashlib.sha256(content).hexdigest()
+        )
+
+        self.assertTrue(expect.needs_body)
+        self.assertIsNone(expect.failure(_response(content=content)))
+        self.assertEqual(
+            expect.failure(_response(content=b'{"status": "down"}')),
+            'body does not match \'"status": "ok"\'',
+        )
+
+    def test_sha256_mismatch(self):
+        expect = parse_expectations(sha256="0" * 64)
+
+        failure = expect.failure(_response(content=b"x"))
+
+        self.assertEqual(failure, f"body sha256 is {hashlib.sha256(b'x').hexdigest()}")
+
+
+class TestBodyCheck(unittest.TestCase):
+    def _check(self, pattern, chunks):
+        check = BodyCheck(parse_expectations(bodies=[pattern]).body, None)
+        for chunk in chunks:
+            check.feed(chunk)
+        return check
+
+    def test_match_across_chunks(self):
+        check = self._check("healthy", [b"x" * 100 + b"hea", b"lt", b"hy" + b"y" * 50])
+
+        self.assertIsNone(check.failure())
+
+    def test_substring_keeps_only_its_length(self):
+        check = BodyCheck(parse_expectations(bodies=["needle"]).body, None)
+        check.feed(b"x" * 100_000)
+
+        self.assertEqual(len(check._tail), len("needle"))
+        self.assertIsNotNone(check.failure())
+
+    def test_regex_window(self):
+        check = self._check(r"<title>.*</title>", [b"<title>", b"a" * 100, b"</title>"])
+        self.assertIsNone(check.failure())
+
+        check = BodyCheck(parse_expectations(bodies=["b.c"]).body, None)
+        check.feed(b"a" * MAX_MATCH_SIZE * 4)
+        self.assertEqual(len(check._tail), MAX_MATCH_SIZE)
+
+    def test_anchor_matches_start_of_body_only(self):
+        self.assertIsNone(self._check("^ok", [b"ok", b"x" * 100]).failure())
+        self.assertIsNotNone(self._check("^ok", [b"x" * 100, b"ok"]).failure())
+        self.assertIsNotNone(
+            self._check("^ok", [b"x" * MAX_MATCH_SIZE * 2, b"ok"]).failure()
+        )
+
+    def test_end_anchor_matches_end_of_body_only(self):
+        self.assertIsNotNone(self._check("}$", [b'{"a": {}', b', "b": 1']).failure())
+        self.assertIsNone(self._check("}$", [b'{"a": 1', b"}"]).failure())
+        self.assertIsNone(
+            self._check("}$", [b"{", b"x" * MAX_MATCH_SIZE * 2, b"}\n"]).failure()
+        )
+
+    def test_lookaround_sees_across_chunks(self):
+        self.assertIsNotNone(self._check(r"\bfoo\b", [b"foo", b"bar"]).failure())
+        self.assertIsNone(self._check(r"\bfoo\b", [b"a foo", b" bar"]).failure())
+        self.assertIsNotNone(self._check("foo(?!bar)", [b"foo", b"bar"]).failure())
+        self.assertIsNotNone(self._check("(?<!x)foo", [b"x", b"foo"]).failure())
+        self.assertIsNone(self._check("(?<=x)foo", [b"x", b"foo"]).failure())
+
+    def test_escaped_dollar_is_searched_per_chunk(self):
+        check = self._check(r"\$5", [b"costs $", b"5", b"x" * MAX_MATCH_SIZE * 2])
+
+        self.assertIsNone(check.failure())
+        self.assertEqual(check._tail, b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,20 @@
 import io
+import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import patch
 
+from hping.clock import NS_PER_SECOND
 from hping.main import main
+from hping.output import ProbeResult
+from hping.payload import FileData
+from hping.results import ResultsLog, analyze
+from hping.stats import stats
 
 
 class TestMain(unittest.TestCase):
-    @patch("hping.main.hping")
+    @patch("hping.client.hping")
     @patch("hping.main.setup_signal_handler")
     def test_main_basic_args(self, mock_setup, mock_hping):
         test_args = ["hping", "http://example.com"]
@@ -29,7 +36,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(call_args[1]["max_redirects"], 5)
         self.assertEqual(call_args[1]["http2"], False)
 
-    @patch("hping.main.hping")
+    @patch("hping.client.hping")
     @patch("hping.main.setup_signal_handler")
     def test_main_with_options(self, mock_setup, mock_hping):
         test_args = [
@@ -75,7 +82,7 @@ class TestMain(unittest.TestCase):
         self.assertEqual(call_args[1]["max_redirects"], 10)
         self.assertEqual(call_args[1]["http2"], True)
 
-    @patch("hping.main.hping")
+    @patch("hping.client.hping")
     @patch("hping.main.setup_signal_handler")
     def test_main_invalid_method(self, mock_setup, mock_hping):
         test_args = ["hping", "http://example.com", "-X", "INVALID"]
@@ -90,7 +97,7 @@ class TestMain(unittest.TestCase):
         mock_setup.assert_called_once()
         mock_hping.assert_not_called()
 
-    @patch("hping.main.hping")
+    @patch("hping.client.hping")
     @patch("hping.main.setup_signal_handler")
     def test_main_case_insensitive_method(self, mock_setup, mock_hping):
         test_args = ["hping", "http://example.com", "-X", "post"]
@@ -103,6 +110,519 @@ class TestMain(unittest.TestCase):
         call_args = mock_hping.call_args
         self.assertEqual(call_args[1]["method"], "POST")
 
+    @patch("hping.async_client.hping_concurrent")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_concurrency(self, mock_setup, mock_hping, mock_concurrent):
+        test_args = ["hping", "http://example.com", "--concurrency", "4"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        mock_concurrent.assert_called_once()
+        call_args = mock_concurrent.call_args
+        self.assertEqual(call_args[0][0], "http://example.com")
+        self.assertEqual(call_args[1]["concurrency"], 4)
+
+    @patch("hping.async_client.hping_concurrent")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_rate(self, mock_setup, mock_hping, mock_concurrent):
+        test_args = ["hping", "http://example.com", "--rate", "50"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_concurrent.call_args
+        self.assertEqual(call_args[1]["rate"], 50.0)
+        self.assertEqual(call_args[1]["concurrency"], 100)
+
+    @patch("hping.async_client.hping_concurrent")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_concurrency(self, mock_setup, mock_concurrent):
+        test_args = ["hping", "http://example.com", "--concurrency", "0"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO):
+                with self.assertRaises(SystemExit):
+                    main()
+
+        mock_concurrent.assert_not_called()
+
+    @patch("hping.async_client.hping_multi")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_multiple_targets(self, mock_setup, mock_hping, mock_multi):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# monitored endpoints\nhttp://b.example\n\n  http://c.example\n")
+        self.addCleanup(os.unlink, f.name)
+        test_args = ["hping", "http://a.example", "--targets-file", f.name]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_multi.call_args
+        self.assertEqual(
+            call_args[0][0],
+            ["http://a.example", "http://b.example", "http://c.example"],
+        )
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_data_file(self, mock_setup, mock_hping):
+        with tempfile.NamedTemporaryFile("wb", suffix=".bin", delete=False) as f:
+            f.write(b"payload")
+        self.addCleanup(os.unlink, f.name)
+        test_args = ["hping", "http://example.com", "-X", "PUT", "--data-file", f.name]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        data = mock_hping.call_args[1]["data"]
+        self.addCleanup(data.close)
+        self.assertIsInstance(data, FileData)
+        self.assertEqual(data.path, f.name)
+        self.assertEqual(len(data), 7)
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_data_file_errors(self, mock_setup, mock_hping):
+        missing = os.path.join(tempfile.gettempdir(), "hping-missing-file")
+        for extra_args, message in (
+            (["--data-file", missing], "Cannot read data file"),
+            (["-d", "x", "--data-file", missing], "cannot be combined"),
+        ):
+            with self.subTest(args=extra_args):
+                test_args = ["hping", "http://example.com"] + extra_args
+                with patch.object(sys, "argv", test_args):
+                    with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                        with self.assertRaises(SystemExit):
+                            main()
+
+                self.assertIn(message, mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_results_file(self, mock_setup, mock_hping):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "results.bin")
+        test_args = ["hping", "http://example.com", "--results-file", path]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        results_log = mock_hping.call_args[1]["results_log"]
+        self.assertIsInstance(results_log, ResultsLog)
+        self.assertEqual(results_log.path, path)
+        self.assertTrue(os.path.exists(path))
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_closes_results_file(self, mock_setup, mock_hping):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "results.bin")
+        test_args = ["hping", "http://example.com", "--results-file", path]
+
+        def interrupted_run(*args, results_log, **kwargs):
+            results_log.write(ProbeResult(seq=1, url=args[0], elapsed_ns=1))
+            raise SystemExit(0)
+
+        mock_hping.side_effect = interrupted_run
+        with patch.object(sys, "argv", test_args):
+            with self.assertRaises(SystemExit):
+                main()
+
+        self.assertEqual(mock_hping.call_args[1]["results_log"]._fd, -1)
+        self.assertEqual(analyze(path).records, 1)
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_results_file(self, mock_setup, mock_hping):
+        with tempfile.NamedTemporaryFile("wb", delete=False) as f:
+            f.write(b"not a results file")
+        self.addCleanup(os.unlink, f.name)
+        test_args = ["hping", "http://example.com", "--results-file", f.name]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                with self.assertRaises(SystemExit):
+                    main()
+
+        self.assertIn("Cannot open results file", mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_hash_implies_stream(self, mock_setup, mock_hping):
+        test_args = ["hping", "http://example.com", "--hash", "sha256"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        call_args = mock_hping.call_args
+        self.assertTrue(call_args[1]["stream"])
+        self.assertEqual(call_args[1]["hash_algorithm"], "sha256")
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_expect_body_implies_stream(self, mock_setup, mock_hping):
+        test_args = [
+            "hping",
+            "http://example.com",
+            "--expect-status",
+            "2xx",
+            "--expect-body",
+            "ok",
+        ]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        call_args = mock_hping.call_args
+        self.assertTrue(call_args[1]["stream"])
+        self.assertEqual(call_args[1]["expect"].statuses, [(200, 299)])
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_expect(self, mock_setup, mock_hping):
+        test_args = ["hping", "http://example.com", "--expect-status", "ok"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                with self.assertRaises(SystemExit):
+                    main()
+
+        self.assertIn("Error: Invalid --expect-status 'ok'", mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_hash(self, mock_setup, mock_hping):
+        test_args = ["hping", "http://example.com", "--hash", "nope"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                with self.assertRaises(SystemExit):
+                    main()
+
+        self.assertIn("Unsupported hash algorithm", mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_output_format(self, mock_setup, mock_hping):
+        test_args = ["hping", "http://example.com", "-o", "json"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        self.assertEqual(mock_hping.call_args[1]["output_format"], "json")
+        # The summary must not mix with the JSON lines on stdout
+        mock_setup.assert_called_once_with(sys.stderr)
+
+    @patch("hping.metrics.start_metrics_server")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_metrics_port(self, mock_setup, mock_hping, mock_server):
+        test_args = ["hping", "http://example.com", "--metrics-port", "9100"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_server.assert_called_once()
+        self.assertEqual(mock_server.call_args[0][0], 9100)
+        mock_hping.assert_called_once()
+
+    @patch("hping.metrics.start_metrics_server", side_effect=OSError("in use"))
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_metrics_port_in_use(self, mock_setup, mock_hping, mock_server):
+        test_args = ["hping", "http://example.com", "--metrics-port", "9100"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                with self.assertRaises(SystemExit):
+                    main()
+
+        self.assertIn("Cannot start metrics server", mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_pool_options(self, mock_setup, mock_hping):
+        test_args = [
+            "hping",
+            "http://example.com",
+            "--max-connections",
+            "8",
+            "--keepalive-expiry",
+            "30",
+            "--new-connection-per-request",
+        ]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        call_args = mock_hping.call_args
+        self.assertEqual(call_args[1]["max_connections"], 8)
+        self.assertEqual(call_args[1]["keepalive_expiry"], 30.0)
+        self.assertTrue(call_args[1]["new_connection_per_request"])
+
+    @patch("hping.async_client.hping_concurrent")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_adaptive(self, mock_setup, mock_hping, mock_concurrent):
+        test_args = [
+            "hping",
+            "http://example.com",
+            "--adaptive",
+            "--rate",
+            "50",
+            "--min-rate",
+            "2",
+            "--slow-threshold",
+            "0.5",
+        ]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_concurrent.call_args
+        self.assertEqual(call_args[1]["rate"], 50.0)
+        self.assertEqual(call_args[1]["concurrency"], 100)
+        self.assertTrue(call_args[1]["adaptive"])
+        self.assertEqual(call_args[1]["min_rate"], 2.0)
+        self.assertEqual(call_args[1]["slow_threshold"], 0.5)
+
+    @patch("hping.async_client.hping_concurrent")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_adaptive_options(self, mock_setup, mock_concurrent):
+        for extra_args, message in (
+            (["--min-rate", "1"], "require --adaptive"),
+            (["--adaptive", "-i", "0"], "requires --rate"),
+            (["--adaptive", "--rate", "1", "--min-rate", "5"], "Minimum rate"),
+        ):
+            with self.subTest(args=extra_args):
+                test_args = ["hping", "http://example.com"] + extra_args
+                with patch.object(sys, "argv", test_args):
+                    with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                        with self.assertRaises(SystemExit):
+                            main()
+
+                self.assertIn(message, mock_stdout.getvalue())
+        mock_concurrent.assert_not_called()
+
+    @patch("hping.main.start_reporter")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_report_every(self, mock_setup, mock_hping, mock_reporter):
+        for output_format, stream in (("text", "stdout"), ("json", "stderr")):
+            with self.subTest(output_format=output_format):
+                test_args = [
+                    "hping",
+                    "http://example.com",
+                    "--report-every",
+                    "5",
+                    "--report-window",
+                    "30",
+                    "-o",
+                    output_format,
+                ]
+
+                with patch.object(sys, "argv", test_args):
+                    main()
+
+                call_args = mock_reporter.call_args[0]
+                self.assertEqual(call_args[1:3], (5.0, 30.0))
+                self.assertIs(call_args[3], getattr(sys, stream))
+
+    @patch("hping.main.start_reporter")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_report_every(self, mock_setup, mock_hping, mock_reporter):
+        test_args = ["hping", "http://example.com", "--report-every", "0"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                with self.assertRaises(SystemExit):
+                    main()
+
+        self.assertIn("--report-every must be greater than 0", mock_stdout.getvalue())
+        mock_reporter.assert_not_called()
+        mock_hping.assert_not_called()
+
+    @patch("hping.workers.run_workers")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_workers(self, mock_setup, mock_hping, mock_workers):
+        test_args = ["hping", "http://example.com", "--workers", "4", "-c", "100"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_workers.call_args
+        self.assertEqual(call_args[0][0], ["http://example.com"])
+        self.assertEqual(call_args[0][2], 100)
+        self.assertEqual(call_args[1]["workers"], 4)
+        self.assertEqual(call_args[1]["concurrency"], 1)
+
+    @patch("hping.async_client.hping_compare")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_compare(self, mock_setup, mock_hping, mock_compare):
+        mock_compare.side_effect = lambda *args, **kwargs: kwargs["stats"].target(
+            "http1"
+        )
+        self.addCleanup(stats.targets.clear)
+        test_args = ["hping", "http://example.com", "--compare", "--rate", "50"]
+
+        with patch.object(sys, "argv", test_args):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_compare.call_args
+        self.assertEqual(call_args[0][0], "http://example.com")
+        self.assertEqual(call_args[1]["rate"], 50)
+        self.assertEqual(call_args[1]["concurrency"], 100)
+        self.assertIn("target", mock_stdout.getvalue())
+
+    @patch("hping.async_client.hping_compare")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_compare_options(self, mock_setup, mock_compare):
+        for extra_args, message in (
+            (["http://b.example"], "single URL"),
+            (["--http2"], "cannot be combined"),
+            (["--workers", "2"], "cannot be combined"),
+        ):
+            with self.subTest(args=extra_args):
+                test_args = ["hping", "http://a.example"] + extra_args + ["--compare"]
+                with patch.object(sys, "argv", test_args):
+                    with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                        with self.assertRaises(SystemExit):
+                            main()
+
+                self.assertIn(message, mock_stdout.getvalue())
+        mock_compare.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_dns_options(self, mock_setup, mock_hping):
+        test_args = [
+            "hping",
+            "https://example.com",
+            "--dns-ttl",
+            "30",
+            "--resolve",
+            "example.com:443:192.0.2.1",
+        ]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        resolver = mock_hping.call_args[1]["resolver"]
+        self.assertEqual(resolver.ttl_ns, 30 * NS_PER_SECOND)
+        self.assertEqual(resolver.lookup("example.com", 443), ["192.0.2.1"])
+
+        with patch.object(sys, "argv", ["hping", "http://example.com"]):
+            main()
+
+        self.assertIsNone(mock_hping.call_args[1]["resolver"])
+
+    @patch("hping.async_client.hping_multi")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_all_addresses(self, mock_setup, mock_hping, mock_multi):
+        test_args = [
+            "hping",
+            "http://example.com",
+            "--all-addresses",
+            "--resolve",
+            "example.com:80:192.0.2.1,192.0.2.2",
+        ]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        call_args = mock_multi.call_args
+        self.assertEqual(call_args[0][0], ["http://example.com"])
+        self.assertIs(call_args[1]["all_addresses"], True)
+        self.assertEqual(call_args[1]["resolver"].ttl_ns, 60 * NS_PER_SECOND)
+
+    @patch("hping.async_client.hping_multi")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_dns_options(self, mock_setup, mock_hping, mock_multi):
+        for extra_args, message in (
+            (["--resolve", "example.com:443"], "Invalid --resolve"),
+            (["--dns-ttl", "0"], "greater than 0"),
+            (["--all-addresses"], "Cannot resolve nonexistent.invalid"),
+        ):
+            with self.subTest(args=extra_args):
+                test_args = ["hping", "http://nonexistent.invalid"] + extra_args
+                with patch.object(sys, "argv", test_args):
+                    with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                        with self.assertRaises(SystemExit):
+                            main()
+
+                self.assertIn(message, mock_stdout.getvalue())
+        mock_hping.assert_not_called()
+        mock_multi.assert_not_called()
+
+    @patch("hping.async_client.hping_scenario")
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_scenario(self, mock_setup, mock_hping, mock_scenario):
+        with tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False) as f:
+            f.write('[[steps]]\nname = "home"\nurl = "http://example.com/"\n')
+        self.addCleanup(os.unlink, f.name)
+        test_args = ["hping", "--scenario", f.name, "-H", "X-Run: 1", "--rate", "5"]
+
+        with patch.object(sys, "argv", test_args):
+            main()
+
+        mock_hping.assert_not_called()
+        scenario = mock_scenario.call_args[0][0]
+        self.assertEqual(scenario.steps[0].name, "home")
+        self.assertEqual(scenario.steps[0].headers, ["X-Run: 1"])
+        self.assertEqual(mock_scenario.call_args[1]["rate"], 5)
+
+    @patch("hping.async_client.hping_scenario")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_invalid_scenario(self, mock_setup, mock_scenario):
+        missing = os.path.join(tempfile.gettempdir(), "hping-missing.toml")
+        for test_args, message in (
+            (["--scenario", missing], "Cannot load scenario"),
+            (["--scenario", missing, "http://example.com"], "cannot be combined"),
+        ):
+            with self.subTest(args=test_args):
+                with patch.object(sys, "argv", ["hping"] + test_args):
+                    with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                        with self.assertRaises(SystemExit):
+                            main()
+
+                self.assertIn(message, mock_stdout.getvalue())
+        mock_scenario.assert_not_called()
+
+    @patch("hping.client.hping")
+    @patch("hping.main.setup_signal_handler")
+    def test_main_requires_url(self, mock_setup, mock_hping):
+        with patch.object(sys, "argv", ["hping"]):
+            with patch("sys.stderr", new_callable=io.StringIO):
+                with self.assertRaises(SystemExit):
+                    main()
+
+        mock_hping.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
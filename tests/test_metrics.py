@@ -0,0 +1,99 @@
+import unittest
+import urllib.error
+import urllib.request
+
+from hping.metrics import CONTENT_TYPE, render_metrics, start_metrics_server
+from hping.output import ProbeResult
+from hping.stats import NS_PER_MS, Stats
+
+
+def _stats():
+    stats = Stats()
+    for seq, elapsed_ms in enumerate([0.5, 3.0, 30.0, 20_000.0], 1):
+        stats.record_transmitted()
+        stats.record(
+            ProbeResult(seq=seq, url="", elapsed_ns=round(elapsed_ms * NS_PER_MS))
+        )
+    stats.record_transmitted(2)
+    for seq, error in ((5, "timeout"), (6, "request_error")):
+        stats.record(ProbeResult(seq=seq, url="", elapsed_ns=0, error=error))
+    return stats
+
+
+class TestRenderMetrics(unittest.TestCase):
+    def test_counters(self):
+        text = render_metrics(_stats().snapshot())
+
+        self.assertIn("# TYPE hping_requests_total counter", text)
+        self.assertIn("hping_requests_total 6\n", text)
+        self.assertIn("hping_responses_total 4\n", text)
+        self.assertIn('hping_errors_total{class="timeout"} 1\n', text)
+        self.assertIn('hping_errors_total{class="request_error"} 1\n', text)
+        self.assertIn('hping_failures_total{class="timeout"} 1\n', text)
+
+    def test_histogram(self):
+        text = render_metrics(_stats().snapshot())
+
+        self.assertIn("# TYPE hping_rtt_seconds histogram", text)
+        self.assertIn('hping_rtt_seconds_bucket{le="0.001"} 1\n', text)
+        self.assertIn('hping_rtt_seconds_bucket{le="0.005"} 2\n', text)
+        self.assertIn('hping_rtt_seconds_bucket{le="0.05"} 3\n', text)
+        self.assertIn('hping_rtt_seconds_bucket{le="10"} 3\n', text)
+        self.assertIn('hping_rtt_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn("hping_rtt_seconds_count 4\n", text)
+        self.assertIn("hping_rtt_seconds_sum 20.0335\n", text)
+
+    def test_empty(self):
+        text = render_metrics(Stats().snapshot())
+
+        self.assertIn("hping_requests_total 0\n", text)
+        self.assertIn('hping_rtt_seconds_bucket{le="+Inf"} 0\n', text)
+
+    def test_adaptive_rate(self):
+        stats = _stats()
+        self.assertNotIn("\nhping_adaptive_rate ", render_metrics(stats.snapshot()))
+
+        stats.set_rate(12.5)
+        self.assertIn("hping_adaptive_rate 12.5\n", render_metrics(stats.snapshot()))
+
+    def test_targets_are_labelled(self):
+        stats = Stats()
+        stats.targets['http://a.example/"x"'] = _stats()
+
+        text = render_metrics(stats.snapshot())
+
+        self.assertIn('hping_requests_total{target="http://a.example/\\"x\\""} 6', text)
+        self.assertIn(
+            'hping_errors_total{target="http://a.example/\\"x\\"",class="timeout"} 1',
+            text,
+        )
+
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self):
+        self.stats = _stats()
+        self.server = start_metrics_server(0, self.stats, "127.0.0.1")
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_scrape(self):
+        with urllib.request.urlopen(f"{self.base}/metrics") as response:
+            self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+            first = response.read().decode()
+        self.assertIn("hping_requests_total 6\n", first)
+
+        self.stats.record_transmitted()
+        with urllib.request.urlopen(f"{self.base}/metrics") as response:
+            self.assertIn("hping_requests_total 7\n", response.read().decode())
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f"{self.base}/")
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
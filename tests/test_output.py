@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+import unittest
+from unittest.mock import Mock
+
+from hping.output import (
+    CSV_FIELDS,
+    Formatter,
+    OutputWriter,
+    ProbeResult,
+    TextFormatter,
+    create_output,
+)
+from tests.clock import FakeClock
+
+
+def _reply(**kwargs):
+    values = dict(
+        seq=1,
+        url="http://example.com",
+        elapsed_ns=12_345_678,
+        status=200,
+        size=42,
+        protocol="HTTP/1.1",
+    )
+    values.update(kwargs)
+    return ProbeResult(**values)
+
+
+def _failure(**kwargs):
+    values = dict(
+        seq=2,
+        url="http://example.com",
+        elapsed_ns=1_500_000,
+        error="request_error",
+        message="Connection refused",
+    )
+    values.update(kwargs)
+    return ProbeResult(**values)
+
+
+class TestTextFormatter(unittest.TestCase):
+    def test_reply(self):
+        self.assertEqual(
+            TextFormatter().format(_reply(redirects=2)),
+            "42 bytes from http://example.com http_seq=1 status=200 "
+            "time=12.35 ms redirects=2",
+        )
+
+    def test_reply_with_details(self):
+        line = TextFormatter(show_protocol=True, show_phases=True).format(
+            _reply(
+                protocol="HTTP/2",
+                first_byte_ns=2_000_000,
+                digest="sha256=abc",
+                phases={"ttfb": 1_000_000},
+                lag_ns=500_000,
+            )
+        )
+        self.assertEqual(
+            line,
+            "42 bytes from http://example.com http_seq=1 status=200 "
+            "time=12.35 ms protocol=HTTP/2 first_byte=2.00 ms sha256=abc "
+            "ttfb=1.00 ms lag=0.50 ms",
+        )
+
+    def test_connection_reuse(self):
+        formatter = TextFormatter()
+        self.assertTrue(formatter.format(_reply(reused=True)).endswith(" conn=reused"))
+        self.assertTrue(formatter.format(_reply(reused=False)).endswith(" conn=new"))
+        self.assertNotIn("conn=", formatter.format(_reply()))
+
+    def test_adaptive_rate(self):
+        self.assertTrue(
+            TextFormatter().format(_reply(rate=12.5)).endswith(" rate=12.50/s")
+        )
+        self.assertTrue(
+            TextFormatter().format(_failure(rate=5.0)).endswith(" rate=5.00/s")
+        )
+
+    def test_address(self):
+        self.assertTrue(
+            TextFormatter()
+            .format(_reply(step="login", address="10.0.0.1", variant="h2"))
+            .endswith(" step=login address=10.0.0.1 variant=h2")
+        )
+        self.assertTrue(
+            TextFormatter()
+            .format(_failure(address="::1"))
+            .endswith("Connection refused address=::1")
+        )
+
+    def test_errors(self):
+        formatter = TextFormatter()
+        self.assertEqual(
+            formatter.format(_failure()),
+            "Request failed: http_seq=2 time=1.50 ms - Connection refused",
+        )
+        self.assertEqual(
+            formatter.format(_failure(error="timeout", message="")),
+            "Request timeout: http_seq=2 time=1.50 ms",
+        )
+        self.assertEqual(
+            formatter.format(
+                _failure(error="assertion", message="status 500 is not 2xx")
+            ),
+            "Assertion failed: http_seq=2 time=1.50 ms - status 500 is not 2xx",
+        )
+
+    def test_error_with_url(self):
+        line = TextFormatter(label_errors=True).format(
+            _failure(error="timeout", message="")
+        )
+        self.assertEqual(
+            line, "Request timeout from http://example.com: http_seq=2 time=1.50 ms"
+        )
+
+
+class TestMachineReadableOutput(unittest.TestCase):
+    def test_json_lines(self):
+        stream = io.StringIO()
+        output = create_output("json", stream=stream)
+        output.emit(_reply(phases={"connect": 1_000_000}, reused=False))
+        output.emit(_failure(rate=2.5, variant="h2"))
+        output.close()
+
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(first["seq"], 1)
+        self.assertEqual(first["status"], 200)
+        self.assertEqual(first["time_ms"], 12.346)
+        self.assertEqual(first["bytes"], 42)
+        self.assertEqual(first["protocol"], "HTTP/1.1")
+        self.assertEqual(first["redirects"], 0)
+        self.assertIsNone(first["error"])
+        self.assertIs(first["reused"], False)
+        self.assertEqual(first["phases_ms"], {"connect": 1.0})
+        self.assertNotIn("rate", first)
+        self.assertEqual(second["rate"], 2.5)
+        self.assertEqual(second["variant"], "h2")
+        self.assertNotIn("variant", first)
+        self.assertNotIn("address", first)
+        self.assertNotIn("step", first)
+        self.assertEqual(second["error"], "request_error")
+        self.assertEqual(second["message"], "Connection refused")
+        self.assertIsNone(second["status"])
+
+    def test_csv(self):
+        stream = io.StringIO()
+        output = create_output("csv", stream=stream)
+        output.emit(_reply(url="http://example.com/?a=1,2"))
+        output.emit(_failure(error="timeout"))
+        output.close()
+
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(tuple(rows[0]), CSV_FIELDS)
+        self.assertEqual(rows[0]["url"], "http://example.com/?a=1,2")
+        self.assertEqual(rows[0]["time_ms"], "12.346")
+        self.assertEqual(rows[1]["error"], "timeout")
+        self.assertEqual(rows[1]["status"], "")
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            create_output("xml")
+
+    def test_results_log(self):
+        results_log = Mock()
+        output = create_output("text", stream=io.StringIO(), results_log=results_log)
+        result = _reply()
+
+        output.emit(result)
+        output.close()
+
+        results_log.write.assert_called_once_with(result)
+        results_log.flush.assert_called_once_with()
+
+
+class TestOutputWriter(unittest.TestCase):
+    def test_batches_lines_within_flush_interval(self):
+        stream = io.StringIO()
+        clock = FakeClock()
+        writer = OutputWriter(stream, flush_interval=1.0, clock=clock)
+
+        writer.write("first")
+        self.assertEqual(stream.getvalue(), "first\n")
+
+        clock.advance(100_000_000)
+        writer.write("second")
+        writer.write("third")
+        self.assertEqual(stream.getvalue(), "first\n")
+
+        clock.advance(1_000_000_000)
+        writer.write("fourth")
+        self.assertEqual(stream.getvalue(), "first\nsecond\nthird\nfourth\n")
+
+    def test_flushes_when_full(self):
+        stream = io.StringIO()
+        writer = OutputWriter(stream, max_lines=2, clock=FakeClock())
+        for line in ("a", "b", "c"):
+            writer.write(line)
+        self.assertEqual(stream.getvalue(), "a\nb\nc\n")
+
+    def test_flush_writes_remaining_lines(self):
+        stream = io.StringIO()
+        writer = OutputWriter(stream, clock=FakeClock())
+        writer.write("a")
+        writer.write("b")
+        writer.flush()
+        self.assertEqual(stream.getvalue(), "a\nb\n")
+
+    def test_idle_flushes_lines_a_wait_would_hold_back(self):
+        stream = io.StringIO()
+        clock = FakeClock()
+        writer = OutputWriter(stream, flush_interval=1.0, clock=clock)
+        writer.write("first")
+        clock.advance(100_000_000)
+        writer.write("second")
+
+        writer.idle(100_000_000)
+        self.assertEqual(stream.getvalue(), "first\n")
+
+        writer.idle(900_000_000)
+        self.assertEqual(stream.getvalue(), "first\nsecond\n")
+
+
+class TestFormatter(unittest.TestCase):
+    def test_format_is_abstract(self):
+        class Incomplete(Formatter):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import unittest
+
+import httpx
+
+from hping.payload import FileData
+
+
+class TestFileData(unittest.TestCase):
+    def _file(self, content):
+        with tempfile.NamedTemporaryFile("wb", delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def _data(self, content, **kwargs):
+        data = FileData(self._file(content), **kwargs)
+        self.addCleanup(data.close)
+        return data
+
+    def test_iterates_in_chunks_repeatedly(self):
+        data = self._data(b"0123456789", chunk_size=4)
+
+        self.assertEqual(len(data), 10)
+        for _ in range(2):
+            chunks = [bytes(chunk) for chunk in data]
+            self.assertEqual(chunks, [b"0123", b"4567", b"89"])
+
+    def test_chunks_are_views_of_the_mapping(self):
+        data = self._data(b"x" * 100, chunk_size=64)
+
+        self.assertTrue(all(isinstance(chunk, memoryview) for chunk in data))
+
+    def test_async_chunks(self):
+        data = self._data(b"abcdef", chunk_size=4)
+
+        async def collect():
+            return [bytes(chunk) async for chunk in data.async_chunks()]
+
+        self.assertEqual(asyncio.run(collect()), [b"abcd", b"ef"])
+
+    def test_empty_file(self):
+        data = self._data(b"")
+
+        self.assertEqual(len(data), 0)
+        self.assertEqual(list(data), [])
+        self.assertFalse(data.looks_like_json())
+
+    def test_looks_like_json(self):
+        self.assertTrue(self._data(b' \n{"a": 1}\n').looks_like_json())
+        self.assertTrue(self._data(b"[" + b"1," * 1000 + b"1]").looks_like_json())
+        self.assertFalse(self._data(b"name=value").looks_like_json())
+        self.assertFalse(self._data(b'{"a": 1').looks_like_json())
+
+    def test_pickle_reopens_file(self):
+        data = self._data(b"payload")
+
+        copy = pickle.loads(pickle.dumps(data))
+        self.addCleanup(copy.close)
+        self.assertEqual(copy.path, data.path)
+        self.assertEqual(b"".join(copy), b"payload")
+
+    def test_missing_file(self):
+        with self.assertRaises(OSError):
+            FileData(os.path.join(tempfile.gettempdir(), "hping-missing-file"))
+
+    def test_sent_as_request_body(self):
+        data = self._data(b"x" * 200_000)
+        request = httpx.Request(
+            "POST",
+            "http://example.com",
+            headers={"Content-Length": str(len(data))},
+            content=data,
+        )
+
+        self.assertNotIn("Transfer-Encoding", request.headers)
+        self.assertEqual(len(request.read()), 200_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+
+from hping.phases import PhaseTimer, atrace_current, format_phases, trace_current
+from tests.clock import FakeClock
+
+# Events of a fresh HTTPS request as emitted by httpcore, with time in ms
+HTTPS_EVENTS = [
+    ("connection.connect_tcp.started", 0),
+    ("connection.connect_tcp.complete", 10),
+    ("connection.start_tls.started", 10),
+    ("connection.start_tls.complete", 30),
+    ("http11.send_request_headers.started", 30),
+    ("http11.send_request_headers.complete", 31),
+    ("http11.send_request_body.started", 31),
+    ("http11.send_request_body.complete", 32),
+    ("http11.receive_response_headers.started", 32),
+    ("http11.receive_response_headers.complete", 82),
+    ("http11.receive_response_body.started", 82),
+    ("http11.receive_response_body.complete", 92),
+    ("http11.response_closed.started", 92),
+    ("http11.response_closed.complete", 92),
+]
+
+
+def _replay(events, timer=None, use_async=False):
+    clock = timer._clock if timer else FakeClock()
+    timer = timer or PhaseTimer(clock)
+    callback = timer.atrace if use_async else timer.trace
+    for name, at in events:
+        clock.set_ms(at)
+        result = callback(name, {})
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+    return timer
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_fresh_connection(self):
+        timer = _replay(HTTPS_EVENTS)
+
+        self.assertEqual(
+            timer.durations,
+            {
+                "connect": 10_000_000,
+                "tls": 20_000_000,
+                "send": 2_000_000,
+                "ttfb": 50_000_000,
+                "download": 10_000_000,
+            },
+        )
+
+    def test_reused_connection_has_no_connect_phase(self):
+        timer = _replay(HTTPS_EVENTS[4:])
+
+        self.assertNotIn("connect", timer.durations)
+        self.assertNotIn("tls", timer.durations)
+        self.assertEqual(timer.durations["ttfb"], 50_000_000)
+        self.assertFalse(timer.new_connection)
+
+    def test_new_connection(self):
+        self.assertTrue(_replay(HTTPS_EVENTS).new_connection)
+
+    def test_redirect_hops_add_up(self):
+        timer = _replay(HTTPS_EVENTS[4:])
+        _replay([(name, at + 1000) for name, at in HTTPS_EVENTS[4:]], timer)
+
+        self.assertEqual(timer.durations["ttfb"], 100_000_000)
+
+    def test_http2_events(self):
+        events = [(name.replace("http11.", "http2."), at) for name, at in HTTPS_EVENTS]
+        timer = _replay(events, use_async=True)
+
+        self.assertEqual(timer.durations["download"], 10_000_000)
+
+    def test_trace_current_records_to_active_timer(self):
+        clock = FakeClock()
+        timer = PhaseTimer(clock)
+        timer.activate()
+        clock.set_ms(1)
+        trace_current("connection.connect_tcp.started", {})
+        clock.set_ms(3)
+        trace_current("connection.connect_tcp.complete", {})
+
+        self.assertEqual(timer.durations, {"connect": 2_000_000})
+
+    def test_concurrent_tasks_keep_their_own_timer(self):
+        async def probe(delay_ms):
+            clock = FakeClock()
+            timer = PhaseTimer(clock)
+            timer.activate()
+            await atrace_current("http11.send_request_body.complete", {})
+            await asyncio.sleep(0)
+            clock.now += delay_ms * 1_000_000
+            await atrace_current("http11.receive_response_headers.complete", {})
+            return timer.durations["ttfb"]
+
+        async def run():
+            return await asyncio.gather(probe(1), probe(5))
+
+        self.assertEqual(asyncio.run(run()), [1_000_000, 5_000_000])
+
+    def test_format_phases(self):
+        self.assertEqual(
+            format_phases({"ttfb": 1_500_000, "connect": 250_000}),
+            "connect=0.25 ms ttfb=1.50 ms",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import io
+import time
+import unittest
+
+from hping.output import ProbeResult
+from hping.report import RollingWindow, start_reporter
+from hping.stats import NS_PER_MS, Stats, reset_hooks, reset_stats
+
+SECOND = 1_000_000_000
+
+
+def _record(stats, rtts_ms=(), errors=0):
+    for rtt_ms in rtts_ms:
+        stats.record_transmitted()
+        stats.record(ProbeResult(seq=1, url="", elapsed_ns=round(rtt_ms * NS_PER_MS)))
+    for _ in range(errors):
+        stats.record_transmitted()
+        stats.record(ProbeResult(seq=1, url="", elapsed_ns=0, error="timeout"))
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_only_counts_requests_since_start(self):
+        stats = Stats()
+        _record(stats, [500.0])
+        window = RollingWindow(stats.snapshot(), 10.0, 0)
+
+        _record(stats, [1.0, 2.0, 3.0], errors=1)
+        window.update(stats.snapshot(), 2 * SECOND)
+
+        self.assertEqual(window.transmitted, 4)
+        self.assertEqual(window.received, 3)
+        self.assertEqual(window.errors, 1)
+        self.assertEqual(window.rtt.count, 3)
+        self.assertLess(window.rtt.max, 4 * NS_PER_MS)
+
+    def test_old_slices_expire(self):
+        stats = Stats()
+        window = RollingWindow(stats.snapshot(), 2.0, 0)
+        _record(stats, [100.0] * 4, errors=2)
+        window.update(stats.snapshot(), SECOND)
+        _record(stats, [1.0] * 2)
+        window.update(stats.snapshot(), 2 * SECOND)
+        _record(stats, [2.0] * 2)
+        window.update(stats.snapshot(), 3 * SECOND)
+
+        self.assertEqual(window.start, SECOND)
+        self.assertEqual(window.transmitted, 4)
+        self.assertEqual(window.errors, 0)
+        self.assertEqual(window.rtt.count, 4)
+        self.assertLess(window.rtt.percentile(100), 3 * NS_PER_MS)
+        self.assertEqual(
+            window.format(3 * SECOND),
+            "last 2s: 4 transmitted, 4 received, 2.00 req/s, 0.0% errors, "
+            "rtt p50/p90/p99/p99.9 = 1.004/2.007/2.007/2.007 ms",
+        )
+
+    def test_targets_are_combined(self):
+        stats = Stats()
+        stats.target("http://a.example")
+        window = RollingWindow(stats.snapshot(), 60.0, 0)
+        _record(stats.target("http://a.example"), [1.0], errors=1)
+        _record(stats.target("http://b.example"), [2.0])
+        window.update(stats.snapshot(), 4 * SECOND)
+
+        self.assertEqual(
+            window.format(4 * SECOND).split(", rtt")[0],
+            "last 4s: 3 transmitted, 2 received, 0.75 req/s, 33.3% errors",
+        )
+
+    def test_reset_empties_the_window(self):
+        stats = Stats()
+        window = RollingWindow(stats.snapshot(), 60.0, 0)
+        _record(stats, [100.0] * 10)
+        window.update(stats.snapshot(), SECOND)
+
+        stats.reset()
+        window.reset(SECOND)
+        # More requests than before the reset, at a different latency
+        _record(stats, [1.0] * 20)
+        window.update(stats.snapshot(), 3 * SECOND)
+
+        self.assertEqual(window.start, SECOND)
+        self.assertEqual(window.transmitted, 20)
+        self.assertEqual(window.received, 20)
+        self.assertEqual(window.rtt.count, 20)
+        self.assertLess(window.rtt.max, 2 * NS_PER_MS)
+
+    def test_empty(self):
+        window = RollingWindow(Stats().snapshot(), 60.0, 0)
+        window.update(Stats().snapshot(), SECOND)
+
+        self.assertEqual(
+            window.format(SECOND),
+            "last 1s: 0 transmitted, 0 received, 0.00 req/s, 0.0% errors",
+        )
+
+
+class TestReporter(unittest.TestCase):
+    def test_prints_periodically(self):
+        stats = Stats()
+        stream = io.StringIO()
+        stop = start_reporter(stats, 0.01, stream=stream)
+        _record(stats, [1.0])
+        deadline = time.monotonic() + 5
+        while stream.getvalue().count("\n") < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+
+        lines = stream.getvalue().splitlines()
+        self.assertGreaterEqual(len(lines), 2)
+        self.assertIn("1 received", lines[-1])
+
+    def _wait_for(self, stream, text):
+        deadline = time.monotonic() + 5
+        while text not in stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn(text, stream.getvalue())
+
+    def test_reset_empties_the_window(self):
+        stats = Stats()
+        stream = io.StringIO()
+        stop = start_reporter(stats, 0.01, stream=stream)
+        self.addCleanup(stop.set)
+        _record(stats, [100.0] * 10)
+        self._wait_for(stream, "10 received")
+
+        reset_stats(stats)
+        _record(stats, [1.0] * 20)
+        self._wait_for(stream, "20 received")
+
+        self.assertIn("20 transmitted", stream.getvalue().splitlines()[-1])
+        stop.set()
+        deadline = time.monotonic() + 5
+        while reset_hooks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(reset_hooks, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import pickle
+import socket
+import threading
+import unittest
+
+import httpx
+
+from hping.clock import NS_PER_SECOND
+from hping.resolver import DnsCache, parse_resolve, url_origin
+from tests.clock import FakeClock
+
+
+class FakeResolver:
+    """getaddrinfo replacement that counts lookups and can be made to fail."""
+
+    def __init__(self, *addresses):
+        self.addresses = list(addresses)
+        self.calls = 0
+        self.error = None
+
+    def __call__(self, host, port, type=0):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return [
+            (
+                socket.AF_INET6 if ":" in address else socket.AF_INET,
+                socket.SOCK_STREAM,
+                6,
+                "",
+                (address, port),
+            )
+            for address in self.addresses
+        ]
+
+
+class TestParseResolve(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_resolve("Example.com:443:10.0.0.1,[2001:db8::1]"),
+            (("example.com", 443), ["10.0.0.1", "2001:db8::1"]),
+        )
+
+    def test_invalid(self):
+        for spec in ("example.com", "example.com:https:10.0.0.1", "a:80:", "a:80:b"):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    parse_resolve(spec)
+
+    def test_url_origin(self):
+        self.assertEqual(url_origin("https://Example.com/x"), ("example.com", 443))
+        self.assertEqual(url_origin("http://example.com"), ("example.com", 80))
+        self.assertEqual(url_origin("http://[::1]:8080/"), ("::1", 8080))
+
+
+class TestDnsCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.resolver = FakeResolver("10.0.0.1", "10.0.0.2", "10.0.0.1", "::1")
+        self.cache = DnsCache(ttl=10, clock=self.clock, getaddrinfo=self.resolver)
+
+    def test_caches_until_expiry(self):
+        addresses = self.cache.lookup("example.com", 80)
+        self.clock.advance(9 * NS_PER_SECOND)
+        self.cache.lookup("example.com", 80)
+
+        self.assertEqual(addresses, ["10.0.0.1", "10.0.0.2", "::1"])
+        self.assertEqual(self.resolver.calls, 1)
+
+        self.clock.advance(NS_PER_SECOND)
+        self.resolver.addresses = ["10.0.0.3"]
+        self.assertEqual(self.cache.lookup("example.com", 80), ["10.0.0.3"])
+        self.assertEqual(self.resolver.calls, 2)
+
+    def test_keeps_stale_addresses_while_resolver_fails(self):
+        self.cache.lookup("example.com", 80)
+        self.clock.advance(10 * NS_PER_SECOND)
+        self.resolver.error = socket.gaierror(-3, "Temporary failure")
+
+        self.assertEqual(self.cache.lookup("example.com", 80)[0], "10.0.0.1")
+        self.assertEqual(self.cache.lookup("example.com", 80)[0], "10.0.0.1")
+        # Not asked again until the stale addresses expire once more
+        self.assertEqual(self.resolver.calls, 2)
+
+    def test_unresolvable_host(self):
+        self.resolver.error = socket.gaierror(-2, "Name or service not known")
+
+        with self.assertRaises(httpx.ConnectError) as raised:
+            self.cache.lookup("nonexistent.invalid", 80)
+
+        self.assertIn("Cannot resolve nonexistent.invalid", str(raised.exception))
+
+    def test_evicts_long_expired_entries(self):
+        self.cache.lookup("a.example", 80)
+        self.clock.advance(25 * NS_PER_SECOND)
+        self.cache.lookup("b.example", 80)
+
+        self.assertEqual(list(self.cache._entries), [("b.example", 80)])
+
+    def test_overrides_and_ip_addresses(self):
+        cache = DnsCache(
+            overrides={("example.com", 443): ["192.0.2.1"]},
+            getaddrinfo=self.resolver,
+        )
+
+        self.assertEqual(cache.lookup("example.com", 443), ["192.0.2.1"])
+        self.assertEqual(cache.lookup("192.0.2.7", 80), ["192.0.2.7"])
+        self.assertEqual(cache.lookup("example.com", 80)[0], "10.0.0.1")
+        self.assertEqual(self.resolver.calls, 1)
+
+    def test_invalid_ttl(self):
+        with self.assertRaises(ValueError):
+            DnsCache(ttl=0)
+
+    def test_concurrent_async_lookups_share_one_resolution(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_resolver(host, port, type=0):
+            started.set()
+            release.wait(5)
+            return self.resolver(host, port, type)
+
+        cache = DnsCache(clock=self.clock, getaddrinfo=slow_resolver)
+
+        async def lookups():
+            tasks = [
+                asyncio.create_task(cache.alookup("example.com", 80)) for _ in range(5)
+            ]
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        results = asyncio.run(lookups())
+
+        self.assertEqual(self.resolver.calls, 1)
+        self.assertEqual(results, [["10.0.0.1", "10.0.0.2", "::1"]] * 5)
+        self.assertEqual(cache._pending, {})
+
+    def test_pickle_keeps_entries(self):
+        self.cache.lookup("example.com", 80)
+
+        copy = pickle.loads(pickle.dumps(self.cache))
+
+        self.assertEqual(copy.lookup("example.com", 80)[0], "10.0.0.1")
+        self.assertEqual(copy.getaddrinfo.calls, 1)
+        self.assertEqual(copy._pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import io
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from hping.clock import NS_PER_MS, NS_PER_SECOND
+from hping.main import main
+from hping.output import ProbeResult
+from hping.results import ResultsLog, analyze, analyze_main, format_analysis, replay
+
+# 2023-11-14T22:13:20Z
+START_NS = 1_700_000_000 * NS_PER_SECOND
+
+
+class WallClock:
+    """Wall clock that moves 100 ms per reading."""
+
+    def __init__(self):
+        self.now = START_NS
+
+    def __call__(self):
+        self.now += 100 * NS_PER_MS
+        return self.now
+
+
+def _result(seq):
+    """Every tenth request times out and every seventh gets a 503."""
+    if seq % 10 == 0:
+        return ProbeResult(seq=seq, url="", elapsed_ns=5 * NS_PER_MS, error="timeout")
+    return ProbeResult(
+        seq=seq,
+        url="",
+        elapsed_ns=seq * NS_PER_MS,
+        status=503 if seq % 7 == 0 else 200,
+        size=100,
+    )
+
+
+class TestResultsLog(unittest.TestCase):
+    def _path(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return os.path.join(directory.name, "results.bin")
+
+    def _log(self, path, count, **kwargs):
+        log = ResultsLog(path, wall_clock=WallClock(), **kwargs)
+        for seq in range(1, count + 1):
+            log.write(_result(seq))
+        log.close()
+
+    def test_buffers_whole_records(self):
+        path = self._path()
+        log = ResultsLog(path, buffer_records=3, wall_clock=WallClock())
+        self.addCleanup(log.close)
+        header_size = os.path.getsize(path)
+
+        log.write(_result(1))
+        log.write(_result(2))
+        self.assertEqual(os.path.getsize(path), header_size)
+        log.write(_result(3))
+        self.assertEqual(os.path.getsize(path), header_size + 3 * 48)
+        log.write(_result(4))
+        log.flush()
+        self.assertEqual(os.path.getsize(path), header_size + 4 * 48)
+
+    def test_analyze(self):
+        path = self._path()
+        self._log(path, 50, buffer_records=7)
+
+        analysis = analyze(path, bucket=1.0)
+
+        self.assertEqual(analysis.records, 50)
+        self.assertEqual(analysis.start_ns, START_NS + 100 * NS_PER_MS)
+        self.assertEqual(analysis.end_ns, START_NS + 5 * NS_PER_SECOND)
+        self.assertEqual(analysis.size, 4500)
+        self.assertEqual(analysis.statuses, {200: 38, 503: 7})
+        self.assertEqual(analysis.errors, {"timeout": 5})
+        self.assertEqual(analysis.rtt.count, 45)
+        self.assertEqual(analysis.rtt.min, NS_PER_MS)
+        self.assertEqual(analysis.rtt.max, 49 * NS_PER_MS)
+        second = START_NS
+        self.assertEqual(
+            analysis.buckets,
+            {
+                second + n * NS_PER_SECOND: c
+                for n, c in enumerate([9, 10, 10, 10, 10, 1])
+            },
+        )
+        self.assertEqual(
+            analysis.bucket_errors,
+            {second + n * NS_PER_SECOND: 1 for n in range(1, 6)},
+        )
+
+    def test_chunks_give_the_same_analysis(self):
+        path = self._path()
+        self._log(path, 50)
+
+        whole = analyze(path, bucket=1.0)
+        chunked = analyze(path, bucket=1.0, chunk_records=3)
+
+        self.assertEqual(format_analysis(path, chunked), format_analysis(path, whole))
+        self.assertEqual(list(chunked.rtt.counts), list(whole.rtt.counts))
+
+    def test_records_out_of_time_order(self):
+        path = self._path()
+        times = iter([3, 1, 2, 1, 3])
+        log = ResultsLog(
+            path, wall_clock=lambda: START_NS + next(times) * NS_PER_SECOND
+        )
+        for seq in range(1, 6):
+            log.write(_result(seq))
+        log.close()
+
+        analysis = analyze(path, bucket=1.0)
+
+        self.assertEqual(analysis.start_ns, START_NS + NS_PER_SECOND)
+        self.assertEqual(analysis.end_ns, START_NS + 3 * NS_PER_SECOND)
+        self.assertEqual(
+            analysis.buckets,
+            {START_NS + n * NS_PER_SECOND: c for n, c in ((1, 2), (2, 1), (3, 2))},
+        )
+
+    def test_appends_and_skips_partial_record(self):
+        path = self._path()
+        self._log(path, 5)
+        self._log(path, 5)
+        with open(path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        self.assertEqual(analyze(path).records, 10)
+
+    def test_rejects_other_files(self):
+        path = self._path()
+        with open(path, "wb") as f:
+            f.write(b"not a results file")
+
+        with self.assertRaises(ValueError):
+            ResultsLog(path)
+        with self.assertRaises(ValueError):
+            analyze(path)
+
+    def test_empty_file(self):
+        path = self._path()
+        ResultsLog(path).close()
+
+        analysis = analyze(path)
+
+        self.assertEqual(analysis.records, 0)
+        self.assertEqual(format_analysis(path, analysis), f"--- {path} ---\n0 requests")
+
+    def test_pickle_reopens_file(self):
+        path = self._path()
+        log = ResultsLog(path, buffer_records=1)
+        self.addCleanup(log.close)
+
+        copy = pickle.loads(pickle.dumps(log))
+        self.addCleanup(copy.close)
+        copy.write(_result(1))
+
+        self.assertEqual(analyze(path).records, 1)
+
+    def test_format_analysis(self):
+        path = self._path()
+        self._log(path, 20)
+
+        lines = format_analysis(path, analyze(path, bucket=1.0)).splitlines()
+
+        self.assertEqual(
+            lines[1],
+            "20 requests from 2023-11-14T22:13:20Z to 2023-11-14T22:13:22Z, "
+            "18 responses, 2 errors (10.0%), 1800 bytes",
+        )
+        self.assertTrue(lines[2].startswith("rtt min/avg/max = 1.000/"))
+        self.assertEqual(lines[4], "status 200=16, 503=2")
+        self.assertEqual(lines[5], "errors timeout=2")
+        self.assertEqual(lines[6], "rate per 1s:")
+        self.assertEqual(
+            lines[7], "2023-11-14T22:13:20Z 9 requests, 9.00 req/s, 0 errors"
+        )
+        self.assertEqual(
+            lines[8], "2023-11-14T22:13:21Z 10 requests, 10.00 req/s, 1 errors"
+        )
+
+    def test_replay(self):
+        path = self._path()
+        self._log(path, 10)
+        stream = io.StringIO()
+
+        replay(path, stream)
+
+        rows = stream.getvalue().splitlines()
+        self.assertEqual(rows[0], "timestamp_ns,seq,status,time_ms,bytes,error")
+        self.assertEqual(rows[1], f"{START_NS + 100 * NS_PER_MS},1,200,1.0,100,")
+        self.assertEqual(rows[10], f"{START_NS + NS_PER_SECOND},10,,5.0,0,timeout")
+
+
+class TestAnalyzeMain(unittest.TestCase):
+    def test_missing_file(self):
+        missing = os.path.join(tempfile.gettempdir(), "hping-missing-results")
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            with self.assertRaises(SystemExit):
+                analyze_main([missing])
+
+        self.assertIn("Error:", mock_stdout.getvalue())
+
+    @patch("hping.results.os.dup2")
+    @patch("hping.results.replay", side_effect=BrokenPipeError)
+    def test_replay_into_closed_pipe(self, mock_replay, mock_dup2):
+        with patch("sys.stdout") as mock_stdout:
+            with self.assertRaises(SystemExit):
+                analyze_main(["results.bin", "--replay"])
+
+        mock_stdout.write.assert_not_called()
+        self.assertEqual(mock_dup2.call_args[0][1], mock_stdout.fileno.return_value)
+
+    @patch("hping.main.setup_signal_handler")
+    @patch("hping.results.analyze_main")
+    def test_main_dispatches_subcommand(self, mock_analyze, mock_setup):
+        with patch.object(sys, "argv", ["hping", "analyze", "results.bin"]):
+            main()
+
+        mock_analyze.assert_called_once_with(["results.bin"])
+        mock_setup.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from hping.payload import FileData
+from hping.scenario import Scenario, Step, load_scenario
+
+SCENARIO = """
+base_url = "https://api.example.com/v1/"
+
+[headers]
+Authorization = "Bearer ${TOKEN}"
+
+[[steps]]
+name = "login"
+method = "post"
+url = "login"
+body = '{"user": "${USER}"}'
+
+[[steps]]
+name = "search"
+url = "search?q=hping"
+headers = { Accept = "application/json" }
+
+[[steps]]
+url = "https://other.example.com/upload"
+method = "PUT"
+body_file = "payload.bin"
+"""
+
+
+class TestLoadScenario(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        with open(os.path.join(self.directory, "payload.bin"), "wb") as f:
+            f.write(b"payload")
+
+    def _load(self, content, **kwargs):
+        path = os.path.join(self.directory, "scenario.toml")
+        with open(path, "w") as f:
+            f.write(content)
+        kwargs.setdefault("variables", {"TOKEN": "secret", "USER": "probe"})
+        scenario = load_scenario(path, **kwargs)
+        self.addCleanup(scenario.close)
+        return scenario
+
+    def test_load(self):
+        scenario = self._load(SCENARIO, headers=["X-Run: 1"])
+
+        self.assertEqual(scenario.mode, "sequence")
+        login, search, upload = scenario.steps
+        self.assertEqual(login.method, "POST")
+        self.assertEqual(login.url, "https://api.example.com/v1/login")
+        self.assertEqual(login.data, '{"user": "probe"}')
+        self.assertEqual(login.headers, ["X-Run: 1", "Authorization: Bearer secret"])
+        self.assertEqual(search.url, "https://api.example.com/v1/search?q=hping")
+        self.assertEqual(search.headers[-1], "Accept: application/json")
+        self.assertEqual(upload.name, "https://other.example.com/upload")
+        self.assertIsInstance(upload.data, FileData)
+        self.assertEqual(len(upload.data), 7)
+        self.assertEqual(scenario.schedule(), [scenario.steps])
+
+    def test_invalid(self):
+        step = '[[steps]]\nname = "a"\nurl = "http://a.example"\n'
+        for content, message in (
+            ("mode = 'random'\n" + step, "mode must be one of"),
+            ("stepz = []\n", "Unknown keys: stepz"),
+            ("", "at least one [[steps]]"),
+            ("[[steps]]\nurl = '/relative'\n", "must be absolute"),
+            (step + "method = 'TRACE'\n", "Unsupported HTTP method"),
+            (step + "weight = 0\n", "weight of step 'a'"),
+            (step + "body = 'x'\nbody_file = 'payload.bin'\n", "both body"),
+            (step + "headers = { X = '${MISSING}' }\n", "Undefined variable"),
+            (step + step, "Step name 'a' is used more than once"),
+            (step + "urll = 'x'\n", "Unknown keys in step 1: urll"),
+            ("steps = [", "Invalid TOML"),
+        ):
+            with self.subTest(message=message):
+                with self.assertRaises(ValueError) as raised:
+                    self._load(content)
+                self.assertIn(message, str(raised.exception))
+
+    def test_missing_body_file(self):
+        with self.assertRaises(OSError):
+            self._load('[[steps]]\nurl = "http://a.example"\nbody_file = "nope"\n')
+
+
+class TestSchedule(unittest.TestCase):
+    def test_weighted_round_robin(self):
+        a, b, c = (Step(name, "http://example.com") for name in "abc")
+        a.weight, b.weight, c.weight = 10, 2, 2
+        scenario = Scenario("scenario.toml", [a, b, c], mode="weighted")
+
+        cycle = [iteration[0].name for iteration in scenario.schedule()]
+
+        # Weights are reduced to 5:1:1 and heavy steps spread out
+        self.assertEqual(cycle, ["a", "a", "b", "a", "c", "a", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Cumulative microseconds `import hping.main` may take, best of a few runs.
+# It takes about 40 ms on a laptop; the budget leaves room for slow CI
+# machines while still failing if httpx is imported eagerly again (+150 ms).
+STARTUP_BUDGET_US = 100_000
+
+# Modules the CLI must only import once the arguments are known to need them
+LAZY_MODULES = (
+    "httpx",
+    "httpcore",
+    "asyncio",
+    "multiprocessing",
+    "http.server",
+    "hping.client",
+    "hping.async_client",
+    "hping.workers",
+    "hping.bench",
+    "hping.metrics",
+    "hping.results",
+    "hping.resolver",
+    "hping.scenario",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(*args):
+    """Run Python with ``-X importtime`` and return the cumulative times.
+
+    Returns:
+        Cumulative import time in microseconds by module name
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_main_does_not_import_engines(self):
+        imported = import_times("-c", "import hping.main")
+
+        self.assertIn("hping.main", imported)
+        for module in LAZY_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, imported)
+
+    def test_help_does_not_import_httpx(self):
+        imported = import_times("-m", "hping", "--help")
+
+        self.assertNotIn("httpx", imported)
+
+    def test_startup_budget(self):
+        best = min(
+            import_times("-c", "import hping.main")["hping.main"] for _ in range(3)
+        )
+
+        self.assertLess(best, STARTUP_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
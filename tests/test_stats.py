@@ -1,22 +1,61 @@
 import io
+import math
+import random
 import signal as signal_module
+import threading
 import unittest
+from array import array
 from unittest.mock import patch
 
-from hping.stats import setup_signal_handler, signal_handler, stats
+from hping.output import ProbeResult
+from hping.stats import (
+    NS_PER_MS,
+    LatencyHistogram,
+    Stats,
+    StatsSnapshot,
+    dump_handler,
+    format_comparison,
+    format_summary,
+    format_target,
+    reset_handler,
+    reset_hooks,
+    serve_signal_request,
+    setup_signal_handler,
+    signal_handler,
+    summary_sections,
+)
+
+
+def _record_ms(histogram, values):
+    for value in values:
+        histogram.record(round(value * NS_PER_MS))
+
+
+def _probe_ms(stats, values, **fields):
+    for seq, value in enumerate(values, 1):
+        stats.record_transmitted()
+        stats.record(
+            ProbeResult(seq=seq, url="", elapsed_ns=round(value * NS_PER_MS), **fields)
+        )
+
+
+def _exact_percentile(values, percentile):
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
 
 
 class TestStats(unittest.TestCase):
     def setUp(self):
-        stats["transmitted"] = 0
-        stats["received"] = 0
-        stats["rtt_times"] = []
+        self.stats = Stats()
+        patcher = patch("hping.stats.stats", self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     @patch("sys.stdout", new_callable=io.StringIO)
     def test_signal_handler_with_stats(self, mock_stdout):
-        stats["transmitted"] = 10
-        stats["received"] = 8
-        stats["rtt_times"] = [1.0, 2.0, 3.0]
+        self.stats.record_transmitted(2)
+        _probe_ms(self.stats, [1.0, 2.0, 3.0, 2.0, 2.0, 2.0, 2.0, 2.0])
 
         with self.assertRaises(SystemExit):
             signal_handler(None, None)
@@ -26,13 +65,10 @@ class TestStats(unittest.TestCase):
         self.assertIn("8 received", output)
         self.assertIn("20% packet loss", output)
         self.assertIn("rtt min/avg/max = 1.000/2.000/3.000 ms", output)
+        self.assertIn("rtt p50/p90/p99/p99.9 = ", output)
 
     @patch("sys.stdout", new_callable=io.StringIO)
     def test_signal_handler_no_stats(self, mock_stdout):
-        stats["transmitted"] = 0
-        stats["received"] = 0
-        stats["rtt_times"] = []
-
         with self.assertRaises(SystemExit):
             signal_handler(None, None)
 
@@ -41,12 +77,11 @@ class TestStats(unittest.TestCase):
         self.assertIn("0 received", output)
         self.assertIn("0% packet loss", output)
         self.assertNotIn("rtt min/avg/max", output)
+        self.assertNotIn("p50", output)
 
     @patch("sys.stdout", new_callable=io.StringIO)
     def test_signal_handler_perfect_success(self, mock_stdout):
-        stats["transmitted"] = 5
-        stats["received"] = 5
-        stats["rtt_times"] = [10.0, 20.0, 30.0, 40.0, 50.0]
+        _probe_ms(self.stats, [10.0, 20.0, 30.0, 40.0, 50.0])
 
         with self.assertRaises(SystemExit):
             signal_handler(None, None)
@@ -57,10 +92,492 @@ class TestStats(unittest.TestCase):
         self.assertIn("0% packet loss", output)
         self.assertIn("rtt min/avg/max = 10.000/30.000/50.000 ms", output)
 
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_signal_handler_send_lag(self, mock_stdout):
+        _probe_ms(self.stats, [10.0], lag_ns=1 * NS_PER_MS)
+        _probe_ms(self.stats, [20.0], lag_ns=3 * NS_PER_MS)
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        self.assertIn("send lag avg/max = 2.000/3.000 ms", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_signal_handler_phases(self, mock_stdout):
+        _probe_ms(
+            self.stats, [10.0], phases={"connect": 2 * NS_PER_MS, "ttfb": 6 * NS_PER_MS}
+        )
+        _probe_ms(self.stats, [20.0], phases={"ttfb": 8 * NS_PER_MS})
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        self.assertIn(
+            "phases avg/p99 connect=2.000/2.000 ttfb=7.000/8.000 ms",
+            mock_stdout.getvalue(),
+        )
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_signal_handler_per_target(self, mock_stdout):
+        _probe_ms(self.stats.target("http://a.example"), [10.0, 30.0])
+        self.stats.target("http://b.example").record_transmitted(2)
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        output = mock_stdout.getvalue()
+        self.assertIn(
+            "http://a.example: 2 transmitted, 2 received, 0% loss, "
+            "rtt min/avg/max/p99 = 10.000/20.000/30.000/30.000 ms",
+            output,
+        )
+        self.assertIn("http://b.example: 2 transmitted, 0 received, 100% loss", output)
+        self.assertIn("4 packets transmitted, 2 received, 50% packet loss", output)
+        self.assertIn("rtt min/avg/max = 10.000/20.000/30.000 ms", output)
+
+    def test_errors_by_class(self):
+        other = StatsSnapshot()
+        for target, error in (
+            (self.stats, "timeout"),
+            (self.stats, "timeout"),
+            (other, "timeout"),
+        ):
+            target.record(ProbeResult(seq=1, url="", elapsed_ns=0, error=error))
+        other.record(ProbeResult(seq=2, url="", elapsed_ns=0, error="request_error"))
+
+        snapshot = self.stats.snapshot()
+        snapshot.merge(other)
+
+        self.assertEqual(snapshot.errors, {"timeout": 3, "request_error": 1})
+        self.assertEqual(snapshot.received, 0)
+        self.assertEqual(snapshot.failures["timeout"].count, 3)
+        self.assertEqual(snapshot.failures["request_error"].count, 1)
+
+    def test_failures_by_class(self):
+        self.stats.record_transmitted(5)
+        for seq, (elapsed_ms, status, error) in enumerate(
+            [
+                (1.0, 200, None),
+                (2.0, 404, None),
+                (4.0, 503, None),
+                (6.0, 502, None),
+                (5000.0, None, "timeout"),
+            ],
+            1,
+        ):
+            self.stats.record(
+                ProbeResult(
+                    seq=seq,
+                    url="",
+                    elapsed_ns=round(elapsed_ms * NS_PER_MS),
+                    status=status,
+                    error=error,
+                )
+            )
+
+        snapshot = self.stats.snapshot()
+        lines = format_summary(snapshot).splitlines()
+
+        # 4xx and 5xx responses fail but still count as received
+        self.assertIn("5 packets transmitted, 4 received, 20% packet loss", lines)
+        self.assertEqual(
+            lines[3:6],
+            [
+                "http_5xx: 2 failed (40.0%), time avg/p99 = 5.000/5.997 ms",
+                "http_4xx: 1 failed (20.0%), time avg/p99 = 2.000/2.000 ms",
+                "timeout: 1 failed (20.0%), time avg/p99 = 5000.000/5000.000 ms",
+            ],
+        )
+        self.assertEqual(snapshot.errors, {"timeout": 1})
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_signal_handler_connection_reuse(self, mock_stdout):
+        for seq, (elapsed_ms, reused) in enumerate(
+            [(10.0, False), (2.0, True), (4.0, True), (3.0, None)], 1
+        ):
+            self.stats.record_transmitted()
+            self.stats.record(
+                ProbeResult(
+                    seq=seq,
+                    url="",
+                    elapsed_ns=round(elapsed_ms * NS_PER_MS),
+                    reused=reused,
+                )
+            )
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        output = mock_stdout.getvalue()
+        self.assertIn("connections 1 new, 2 reused (66.7% reuse)", output)
+        self.assertIn("rtt avg/p99 cold = 10.000/10.000 warm = 3.000/4.000 ms", output)
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_signal_handler_adaptive_rate(self, mock_stdout):
+        self.stats.set_rate(10.0)
+        for seq, rate in enumerate([20.0, 30.0, 15.0, 25.0], 1):
+            self.stats.record(ProbeResult(seq=seq, url="", elapsed_ns=0, rate=rate))
+        # Rates of workers probing side by side add up
+        other = StatsSnapshot()
+        other.rate = 5.0
+        self.stats.load(("worker", 1), other)
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        self.assertIn(
+            "adaptive rate 30.00 req/s, 3 increases, 1 decreases",
+            mock_stdout.getvalue(),
+        )
+
+    def test_dump_continues(self):
+        self.stats.record_transmitted()
+        _probe_ms(self.stats, [2.0])
+        stream = io.StringIO()
+
+        serve_signal_request("dump", stream)
+
+        output = stream.getvalue()
+        self.assertIn("--- hping statistics ---", output)
+        self.assertIn("2 packets transmitted, 1 received, 50% packet loss", output)
+        self.assertIn("rtt p50/p90/p99/p99.9", output)
+        self.assertEqual(self.stats.snapshot().transmitted, 2)
+
+    def test_reset_keeps_targets_and_rate(self):
+        target = self.stats.target("http://a.example")
+        target.record_transmitted(3)
+        target.record(ProbeResult(seq=1, url="", elapsed_ns=1, rate=20.0))
+        calls = []
+        reset_hooks.append(lambda: calls.append(True))
+        self.addCleanup(reset_hooks.clear)
+        stream = io.StringIO()
+
+        serve_signal_request("reset", stream)
+
+        self.assertIs(self.stats.target("http://a.example"), target)
+        snapshot = target.snapshot()
+        self.assertEqual(snapshot.transmitted, 0)
+        self.assertEqual(snapshot.rtt.count, 0)
+        self.assertEqual(snapshot.rate_increases, 0)
+        self.assertEqual(snapshot.rate, 20.0)
+        self.assertEqual(calls, [True])
+        self.assertIn("statistics reset", stream.getvalue())
+
+        # Probes keep recording into the same statistics
+        _probe_ms(target, [1.0])
+        snapshot = target.snapshot()
+        self.assertEqual(snapshot.transmitted, 1)
+        self.assertEqual(snapshot.rtt.count, 1)
+        self.assertEqual(snapshot.rate, 20.0)
+
+    def test_format_comparison(self):
+        _probe_ms(self.stats.target("http1"), [1.0, 3.0])
+        self.stats.target("h2-mux").record_transmitted(2)
+        summary_sections.append(format_comparison)
+        self.addCleanup(summary_sections.clear)
+
+        lines = format_summary(self.stats.snapshot()).splitlines()[-3:]
+
+        self.assertEqual(
+            lines[0].split()[:5], ["target", "sent", "recv", "loss", "min"]
+        )
+        self.assertEqual(
+            lines[1].split(),
+            ["http1", "2", "2", "0%", "1.000", "2.000", "1.004"]
+            + ["2.998"] * 3
+            + ["3.000"],
+        )
+        self.assertEqual(lines[2].split(), ["h2-mux", "2", "0", "100%"] + ["-"] * 7)
+        self.assertIsNone(format_comparison(StatsSnapshot()))
+
+    def test_loss_after_reset_with_requests_in_flight(self):
+        snapshot = StatsSnapshot()
+        snapshot.transmitted = 1
+        snapshot.received = 2
+
+        self.assertEqual(
+            format_target("http://a.example", snapshot).split(", ")[2], "0% loss"
+        )
+
+    def test_snapshot_is_consistent_while_recording(self):
+        stop = threading.Event()
+        result = ProbeResult(seq=1, url="", elapsed_ns=NS_PER_MS, reused=True)
+
+        def record():
+            while not stop.is_set():
+                self.stats.record(result)
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        try:
+            for _ in range(200):
+                snapshot = self.stats.snapshot()
+                self.assertEqual(snapshot.received, snapshot.rtt.count)
+                self.assertEqual(snapshot.received, snapshot.warm.count)
+        finally:
+            stop.set()
+            thread.join()
+
+        received = self.stats.snapshot().received
+        snapshot.received += 1
+        snapshot.rtt.record(NS_PER_MS)
+        self.assertEqual(self.stats.snapshot().received, received)
+        self.assertEqual(self.stats.snapshot().rtt.count, received)
+
+    def test_threads_record_into_own_shards(self):
+        result = ProbeResult(seq=1, url="", elapsed_ns=NS_PER_MS)
+        # Keep all threads alive until the end, so none reuses the id of another
+        done = threading.Barrier(4)
+
+        def record():
+            for _ in range(1000):
+                self.stats.record_transmitted()
+                self.stats.record(result)
+            done.wait()
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = self.stats.snapshot()
+        self.assertEqual(len(self.stats._shards), 4)
+        self.assertEqual(snapshot.transmitted, 4000)
+        self.assertEqual(snapshot.received, 4000)
+        self.assertEqual(snapshot.rtt.count, 4000)
+
+    def test_load_replaces_the_shard_of_a_worker(self):
+        first = Stats()
+        _probe_ms(first.target("http://a.example"), [1.0, 2.0])
+        second = Stats()
+        _probe_ms(second.target("http://a.example"), [3.0])
+        second.target("http://b.example").record_transmitted()
+        expected = LatencyHistogram()
+        _record_ms(expected, [1.0, 2.0, 3.0])
+
+        self.stats.load(("worker", 0), first.snapshot())
+        self.stats.load(("worker", 1), second.snapshot())
+        # Later snapshots of a worker replace the earlier ones
+        self.stats.load(("worker", 1), second.snapshot())
+
+        targets = self.stats.snapshot().targets
+        target = targets["http://a.example"]
+        self.assertEqual(target.transmitted, 3)
+        self.assertEqual(target.received, 3)
+        self.assertEqual(list(target.rtt.counts), list(expected.counts))
+        self.assertEqual(target.rtt.total, expected.total)
+        self.assertEqual(targets["http://b.example"].transmitted, 1)
+
+    def test_snapshot_during_interrupted_write(self):
+        _probe_ms(self.stats, [1.0])
+        shard = self.stats._shard()
+        # As seen by a signal handler that interrupted the writer
+        shard.begin()
+        try:
+            with patch("hping.stats.time.sleep") as mock_sleep:
+                snapshot = self.stats.snapshot()
+        finally:
+            shard.end()
+
+        self.assertEqual(snapshot.received, 1)
+        self.assertTrue(mock_sleep.called)
+
+    @patch("signal.signal")
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_summary_goes_to_the_info_stream(self, mock_stdout, mock_signal):
+        self.addCleanup(setup_signal_handler)
+        stream = io.StringIO()
+        setup_signal_handler(stream)
+        _probe_ms(self.stats, [1.0])
+
+        with self.assertRaises(SystemExit):
+            signal_handler(None, None)
+
+        self.assertIn("1 packets transmitted", stream.getvalue())
+        self.assertEqual(mock_stdout.getvalue(), "")
+
     @patch("signal.signal")
     def test_setup_signal_handler(self, mock_signal):
         setup_signal_handler()
-        mock_signal.assert_called_once_with(signal_module.SIGINT, signal_handler)
+        mock_signal.assert_any_call(signal_module.SIGINT, signal_handler)
+        mock_signal.assert_any_call(signal_module.SIGQUIT, dump_handler)
+        mock_signal.assert_any_call(signal_module.SIGUSR1, dump_handler)
+        mock_signal.assert_any_call(signal_module.SIGUSR2, reset_handler)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def assertWithinBucketError(self, histogram, values, percentile):
+        # A bucket is never wider than 1/2**sub_bucket_bits of its values and
+        # the estimate is the bucket midpoint
+        expected = _exact_percentile(values, percentile)
+        actual = histogram.percentile(percentile)
+        tolerance = expected / histogram.sub_bucket_count / 2 + 1
+        self.assertLessEqual(abs(actual - expected), tolerance, f"p{percentile}")
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(histogram.mean, 0.0)
+        self.assertEqual(histogram.percentile(99), 0)
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        values = list(range(1, 2 * histogram.sub_bucket_count))
+        for value in values:
+            histogram.record(value)
+
+        for percentile in (1, 25, 50, 75, 99, 100):
+            self.assertEqual(
+                histogram.percentile(percentile),
+                _exact_percentile(values, percentile),
+            )
+
+    def test_exact_count_sum_min_max(self):
+        histogram = LatencyHistogram()
+        values = [5, 1_000_000, 123_456_789, 42]
+        for value in values:
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.total, sum(values))
+        self.assertEqual(histogram.min, 5)
+        self.assertEqual(histogram.max, 123_456_789)
+        self.assertEqual(histogram.mean, sum(values) / 4)
+
+    def test_percentile_error_bounds(self):
+        rng = random.Random(1234)
+        distributions = {
+            "uniform": lambda: rng.uniform(0.05, 500.0),
+            "lognormal": lambda: rng.lognormvariate(3.0, 1.0),
+            "exponential": lambda: rng.expovariate(1 / 20.0),
+            "bimodal": lambda: rng.choice([rng.gauss(5, 0.5), rng.gauss(900, 50)]),
+        }
+        for name, sample in distributions.items():
+            with self.subTest(distribution=name):
+                histogram = LatencyHistogram()
+                values = [max(0, round(sample() * NS_PER_MS)) for _ in range(20000)]
+                for value in values:
+                    histogram.record(value)
+
+                for percentile in (0.1, 10, 50, 90, 99, 99.9, 100):
+                    self.assertWithinBucketError(histogram, values, percentile)
+
+    def test_values_above_max_value_are_clamped(self):
+        histogram = LatencyHistogram(max_value=1 << 20)
+        histogram.record(1 << 30)
+        histogram.record(1 << 31)
+
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(histogram.max, 1 << 31)
+        self.assertLessEqual(histogram.percentile(50), 1 << 31)
+
+    def test_negative_values_record_as_zero(self):
+        histogram = LatencyHistogram()
+        histogram.record(-5)
+        self.assertEqual(histogram.min, 0)
+        self.assertEqual(histogram.percentile(50), 0)
+
+    def test_constant_memory(self):
+        histogram = LatencyHistogram()
+        for value in range(0, 10**12, 10**7):
+            histogram.record(value)
+        size = len(histogram.counts)
+        for value in range(0, 10**12, 10**7):
+            histogram.record(value)
+        self.assertEqual(len(histogram.counts), size)
+        self.assertLessEqual(size, histogram._index(histogram.max_value) + 1)
+
+    def test_empty_histogram_allocates_nothing(self):
+        self.assertEqual(len(LatencyHistogram().counts), 0)
+
+    def test_merge(self):
+        rng = random.Random(99)
+        left, right, combined = (LatencyHistogram() for _ in range(3))
+        values = [round(rng.lognormvariate(15, 1)) for _ in range(5000)]
+        for index, value in enumerate(values):
+            (left if index % 2 else right).record(value)
+            combined.record(value)
+
+        left.merge(right)
+
+        self.assertEqual(left.count, combined.count)
+        self.assertEqual(left.total, combined.total)
+        self.assertEqual(left.min, combined.min)
+        self.assertEqual(left.max, combined.max)
+        self.assertEqual(list(left.counts), list(combined.counts))
+
+    def test_merge_different_layout(self):
+        with self.assertRaises(ValueError):
+            LatencyHistogram().merge(LatencyHistogram(sub_bucket_bits=4))
+
+    def test_cumulative_counts(self):
+        histogram = LatencyHistogram()
+        for value in (1, 5, 100, 1_000, 1_000_000):
+            histogram.record(value)
+
+        self.assertEqual(
+            histogram.cumulative_counts([0, 5, 999, 1_000, 10**9]), [0, 2, 3, 4, 5]
+        )
+        self.assertEqual(LatencyHistogram().cumulative_counts([1, 2]), [0, 0])
+
+    def test_subtract(self):
+        values = [1.0, 5.0, 20.0, 40.0]
+        histogram = LatencyHistogram()
+        _record_ms(histogram, values)
+        earlier = histogram.copy()
+        _record_ms(histogram, [2.0, 3.0])
+
+        histogram.subtract(earlier)
+
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(histogram.total, 5 * NS_PER_MS)
+        self.assertLessEqual(histogram.min, 2 * NS_PER_MS)
+        self.assertGreaterEqual(histogram.max, 3 * NS_PER_MS)
+        self.assertLess(histogram.max, 4 * NS_PER_MS)
+        histogram.subtract(histogram.copy())
+        self.assertEqual((histogram.count, histogram.min, histogram.max), (0, 0, 0))
+
+    def test_copy_is_independent(self):
+        histogram = LatencyHistogram()
+        _record_ms(histogram, [1.0])
+        copy = histogram.copy()
+        _record_ms(histogram, [2.0])
+
+        self.assertEqual(copy.count, 1)
+        self.assertEqual(copy.max, NS_PER_MS)
+
+    def test_record_many_matches_record(self):
+        rng = random.Random(7)
+        for values in (
+            [rng.randrange(10**9) for _ in range(2000)],
+            [rng.randrange(10**6, 10**8) for _ in range(2000)],
+            [-5, 3, 1 << 50, 7000],
+        ):
+            with self.subTest(values=values[:3]):
+                one_by_one = LatencyHistogram()
+                for value in values:
+                    one_by_one.record(value)
+                batch = LatencyHistogram()
+                batch.record_many(array("q", values))
+
+                self.assertEqual(list(batch.counts), list(one_by_one.counts))
+                self.assertEqual(
+                    (batch.count, batch.total, batch.min, batch.max),
+                    (
+                        one_by_one.count,
+                        one_by_one.total,
+                        one_by_one.min,
+                        one_by_one.max,
+                    ),
+                )
+
+    def test_reset(self):
+        histogram = LatencyHistogram()
+        histogram.record(10)
+        histogram.reset()
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(sum(histogram.counts), 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import unittest
+
+from hping.bench import LocalServer
+from hping.stats import Stats
+from hping.workers import run_workers, shard_count
+
+
+class TestSharding(unittest.TestCase):
+    def test_shard_count(self):
+        self.assertEqual([shard_count(10, 3, index) for index in range(3)], [4, 3, 3])
+        self.assertEqual([shard_count(1, 2, index) for index in range(2)], [1, 0])
+        self.assertIsNone(shard_count(None, 4, 0))
+
+
+class TestRunWorkers(unittest.TestCase):
+    def test_requests_are_shared_out(self):
+        stats = Stats()
+        with LocalServer() as server:
+            run_workers(
+                [server.url], 0.01, 9, workers=3, stats=stats, output_format="json"
+            )
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot.transmitted, 9)
+        self.assertEqual(snapshot.received, 9)
+        self.assertEqual(snapshot.rtt.count, 9)
+
+    def test_multiple_targets(self):
+        stats = Stats()
+        with LocalServer() as first, LocalServer() as second:
+            run_workers(
+                [first.url, second.url],
+                0.01,
+                4,
+                workers=2,
+                stats=stats,
+                output_format="json",
+            )
+
+        targets = stats.snapshot().targets
+        for url in (first.url, second.url):
+            self.assertEqual(targets[url].received, 4)
+
+    def test_single_target_from_the_cli(self):
+        stats = Stats()
+        with LocalServer() as server:
+            run_workers(
+                [server.url],
+                0.01,
+                2,
+                workers=2,
+                stats=stats,
+                output_format="json",
+                all_addresses=False,
+            )
+
+        self.assertEqual(stats.snapshot().received, 2)
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            run_workers(["http://example.com"], 1.0, 1, workers=0)
+        with self.assertRaises(ValueError):
+            run_workers(["http://example.com"], 1.0, 1, rate=0)
+
+
+if __name__ == "__main__":
+    unittest.main()